@@ -1,12 +1,17 @@
 # agents/base_agent.py
 from __future__ import annotations
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Tuple, Protocol
+from typing import Any, Dict, Optional, Tuple, Protocol
+
+from core.prompt_format import prompt_tokens
+from core.telemetry import TELEMETRY
 
 class LLMProtocol(Protocol):
     """
     Minimal interface the agents need from the LLM wrapper.
-    Your LCTraderLLM in core/llm.py already implements this.
+    Your LCTraderLLM in core/llm.py already implements this, as do the
+    offline backends in core/llm_backends.py.
     """
     def vote_structured(
         self,
@@ -24,6 +29,48 @@ class BaseAgent(ABC):
         self.name = name
         self.llm = llm
         self.config = config or {}
+        self._tls = threading.local()
+
+    @property
+    def last_prompt_tokens(self) -> int:
+        """Prompt tokens of the LLM call made by this thread's last cast_vote() (0 if none)."""
+        return getattr(self._tls, "prompt_tokens", 0)
+
+    @property
+    def last_asked(self) -> bool:
+        """True when this thread's last cast_vote() got its answer from the LLM (not a placeholder HOLD)."""
+        return getattr(self._tls, "asked", False)
+
+    def cast_vote(self, snapshot: Dict[str, Any]) -> Tuple[str, float, str]:
+        """vote() with this thread's usage reset first, so last_prompt_tokens / last_asked describe this call."""
+        self._tls.prompt_tokens = 0
+        self._tls.asked = False
+        return self.vote(snapshot)
+
+    def _ask(self, system_msg: str, user_template: str, variables: Dict[str, Any]) -> Tuple[str, float, str]:
+        """
+        vote_structured() + prompt-size bookkeeping. Uses the LLM's measured
+        usage when it reports one (LCTraderLLM.last_usage), else an estimate.
+        """
+        self._tls.prompt_tokens = 0
+        self._tls.asked = False
+        with TELEMETRY.tag(agent=self.name):
+            out = self.llm.vote_structured(
+                system_msg=system_msg,
+                user_template=user_template,
+                variables=variables,
+            )
+        usage = getattr(self.llm, "last_usage", None)
+        self._tls.prompt_tokens = prompt_tokens(system_msg, user_template.format(**variables), usage)
+        self._tls.asked = True
+        return out
+
+    def context_key(self, snapshot: Dict[str, Any]) -> Optional[str]:
+        """
+        Digest of any non-bar input the vote depends on (e.g. news), folded into
+        the vote gate's features; None when the bars are all it sees.
+        """
+        return None
 
     @abstractmethod
     def vote(self, snapshot: Dict[str, Any]) -> Tuple[str, float, str]:
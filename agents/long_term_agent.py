@@ -1,7 +1,10 @@
 # agents/long_term_agent.py
 from __future__ import annotations
-from typing import Dict, Any, Tuple
+import hashlib, time
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
 from agents.base_agent import BaseAgent
+from core.prompt_format import compact_table
 
 SYSTEM_MSG = (
     "You are a LONG-TERM macro strategist. You analyze WEEKLY bars plus a short list of "
@@ -20,16 +23,54 @@ USER_TMPL = (
 
 REQ_COLS = ["close", "rsi", "macd", "macd_signal", "upper_band", "lower_band"]
 
+
+def _day(ts) -> str:
+    return f"[{datetime.fromtimestamp(float(ts)):%Y-%m-%d}] " if ts else ""
+
 class LongTermAgent(BaseAgent):
+    SNAPSHOT_KEY = 'long_term'
     MIN_ROWS = 200
     TAIL_N = 10
+    NEWS_LOOKBACK_DAYS = 30  # override via config["news_lookback_days"]
+    NEWS_KEY = 'long_term_news'  # snapshot slot for the news section (filled on first use)
 
     def __init__(self, name, llm, config, semantic_memory):
         super().__init__(name, llm, config)
         self.semantic_memory = semantic_memory  # may be None
 
+    def _news(self, ticker: str) -> str:
+        """The prompt's news section: semantic hits (robust)."""
+        if self.semantic_memory is None:
+            return "(semantic memory disabled)"
+        try:
+            days = float(self.config.get("news_lookback_days", self.NEWS_LOOKBACK_DAYS))
+            since = time.time() - days * 86400.0
+            # this ticker's items first; general market items only if it has none in the window
+            hits = self.semantic_memory.search_memory(f"{ticker} market sentiment", k=3, symbol=ticker, since=since) \
+                or self.semantic_memory.search_memory(f"{ticker} market sentiment", k=3, since=since)
+            if hits:
+                return "\n".join([f"- {_day(h.get('ts'))}{h['text']} (distance: {float(h.get('distance', 0)):.2f})"
+                                  for h in hits])
+            return "(no recent articles)"
+        except Exception:
+            return "(no recent articles)"
+
+    def _snapshot_news(self, snapshot: Dict[str, Any], ticker: str) -> str:
+        """The news section, searched once per snapshot and kept on it for the gate key and the vote."""
+        news = snapshot.get(self.NEWS_KEY)
+        if news is None:
+            news = snapshot[self.NEWS_KEY] = self._news(ticker)
+        return news
+
+    def context_key(self, snapshot: Dict[str, Any]) -> Optional[str]:
+        """Digest of the news section this vote would see, so new news invalidates a gated vote."""
+        df = snapshot.get(self.SNAPSHOT_KEY)
+        if df is None or df.empty or "ticker" not in df.columns:
+            return None
+        return hashlib.sha1(self._snapshot_news(snapshot, df["ticker"].iloc[-1]).encode("utf-8")).hexdigest()[:16]
+
     def vote(self, snapshot: Dict[str, Any]) -> Tuple[str, float, str]:
-        df = snapshot.get('long_term')
+        df = snapshot.get(self.SNAPSHOT_KEY)
         if df is None or df.empty:
             return "HOLD", 0.5, "(no long-term data)"
         if len(df) < self.MIN_ROWS:
@@ -44,22 +85,10 @@ class LongTermAgent(BaseAgent):
             return "HOLD", 0.5, "(NaNs in long-term tail window)"
 
         ticker = df['ticker'].iloc[-1]
-        table = tail.to_string(index=False)
-
-        # Semantic hits (robust)
-        if not self.semantic_memory:
-            news = "(semantic memory disabled)"
-        else:
-            try:
-                hits = self.semantic_memory.search_memory(f"{ticker} market sentiment", k=3)
-                if hits:
-                    news = "\n".join([f"- {h['text']} (distance: {float(h.get('distance', 0)):.2f})" for h in hits])
-                else:
-                    news = "(no recent articles)"
-            except Exception:
-                news = "(no recent articles)"
-
-        decision, conf, raw = self.llm.vote_structured(
+        table = compact_table(tail)
+        news = self._snapshot_news(snapshot, ticker)
+
+        decision, conf, raw = self._ask(
             system_msg=SYSTEM_MSG,
             user_template=USER_TMPL,
             variables={"ticker": ticker, "table": table, "news": news},
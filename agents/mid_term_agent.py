@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Dict, Any, Tuple
 from agents.base_agent import BaseAgent
+from core.prompt_format import compact_table
 
 SYSTEM_MSG = (
     "You are a MID-TERM (swing) trend analyst. You consider DAILY bars with "
@@ -12,20 +13,19 @@ SYSTEM_MSG = (
 USER_TMPL = (
     "Ticker: {ticker}\n"
     "Task: Decide BUY/SELL/HOLD with confidence in [0,1] using the daily context below.\n\n"
-    "Daily data (last 20 rows):\n{table}\n\n"
-    "5DMA (tail=5):\n{ma5}\n\n"
-    "20DMA (tail=5):\n{ma20}\n"
+    "Daily data (last 20 rows, ma5/ma20 = 5/20-day moving averages):\n{table}\n"
     "Return ONLY JSON as specified."
 )
 
 REQ_COLS = ["close", "rsi", "macd", "macd_signal", "upper_band", "lower_band"]
 
 class MidTermAgent(BaseAgent):
+    SNAPSHOT_KEY = 'mid_term'
     MIN_ROWS = 120
     TAIL_N = 20
 
     def vote(self, snapshot: Dict[str, Any]) -> Tuple[str, float, str]:
-        df = snapshot.get('mid_term')
+        df = snapshot.get(self.SNAPSHOT_KEY)
         if df is None or df.empty:
             return "HOLD", 0.5, "(no mid-term data)"
         if len(df) < self.MIN_ROWS:
@@ -40,14 +40,17 @@ class MidTermAgent(BaseAgent):
             return "HOLD", 0.5, "(NaNs in mid-term tail window)"
 
         ticker = df['ticker'].iloc[-1]
-        table = tail.to_string(index=False)
-        ma5 = df['close'].rolling(window=5).mean().tail(5).to_string(index=False)
-        ma20 = df['close'].rolling(window=20).mean().tail(5).to_string(index=False)
+        # MAs ride along as extra columns instead of two separately printed series
+        tail = tail.assign(
+            ma5=df['close'].rolling(window=5).mean().tail(self.TAIL_N),
+            ma20=df['close'].rolling(window=20).mean().tail(self.TAIL_N),
+        )
+        table = compact_table(tail)
 
-        decision, conf, raw = self.llm.vote_structured(
+        decision, conf, raw = self._ask(
             system_msg=SYSTEM_MSG,
             user_template=USER_TMPL,
-            variables={"ticker": ticker, "table": table, "ma5": ma5, "ma20": ma20},
+            variables={"ticker": ticker, "table": table},
         )
 
         try:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Dict, Any, Tuple
 from agents.base_agent import BaseAgent
+from core.prompt_format import compact_table
 
 SYSTEM_MSG = (
     "You are a SHORT-TERM momentum trader. You analyze recent 30-minute bars "
@@ -19,11 +20,12 @@ USER_TMPL = (
 REQ_COLS = ["close", "rsi", "macd", "macd_signal", "upper_band", "lower_band"]
 
 class ShortTermAgent(BaseAgent):
+    SNAPSHOT_KEY = 'short_term'
     MIN_ROWS = 60
     TAIL_N = 10
 
     def vote(self, snapshot: Dict[str, Any]) -> Tuple[str, float, str]:
-        df = snapshot.get('short_term')
+        df = snapshot.get(self.SNAPSHOT_KEY)
         if df is None or df.empty:
             return "HOLD", 0.5, "(no short-term data)"
         if len(df) < self.MIN_ROWS:
@@ -38,9 +40,9 @@ class ShortTermAgent(BaseAgent):
             return "HOLD", 0.5, "(NaNs in short-term tail window)"
 
         ticker = df['ticker'].iloc[-1]
-        table = tail.to_string(index=False)
+        table = compact_table(tail)
 
-        decision, conf, raw = self.llm.vote_structured(
+        decision, conf, raw = self._ask(
             system_msg=SYSTEM_MSG,
             user_template=USER_TMPL,
             variables={"ticker": ticker, "table": table},
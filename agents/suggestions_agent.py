@@ -1,6 +1,30 @@
 # agents/suggestions_agent.py
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple
+import bisect, queue, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+_REC_ORDER = {"BUY": 0, "HOLD": 1, "AVOID": 2}
+
+
+# analyze_universe() prints progress every this many results when no callback is given
+PROGRESS_EVERY = 25
+
+
+def _rank_key(r: Dict[str, Any]) -> Tuple[int, float, float]:
+    return (_REC_ORDER.get(r.get("recommendation"), 3),
+            -float(r.get("confidence") or 0.0),
+            -float(r.get("companyNewsScore") or 0.0))
+
+
+def rank_suggestions(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """BUY first, then HOLD, then AVOID; within each by confidence, then companyNewsScore."""
+    return sorted(results, key=_rank_key)
+
+
+def _print_progress(done: int, total: int, result: Dict[str, Any]) -> None:
+    if done % PROGRESS_EVERY == 0 or done == total:
+        print(f"[SuggestionsAgent] {done}/{total} analyzed")
 
 class SuggestionsAgent:
     """
@@ -73,9 +97,16 @@ class SuggestionsAgent:
           'raw': '<LLM raw text>'
         }
         """
+        sent, headlines = self._fetch(symbol)
+        return self._decide(symbol, sent, headlines)
+
+    def _fetch(self, symbol: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Finnhub inputs for one symbol (the client rate-limits and caches)."""
         sent = self.fh.news_sentiment(symbol) or {}
         headlines = self.fh.company_news_struct(symbol, days=14, max_items=12) or []
+        return sent, headlines
 
+    def _decide(self, symbol: str, sent: Dict[str, Any], headlines: List[Dict[str, Any]]) -> Dict[str, Any]:
         # Extract metrics with safe defaults
         buzz = (sent.get("buzz") or {})
         sentiment = (sent.get("sentiment") or {})
@@ -111,3 +142,93 @@ class SuggestionsAgent:
             "headlines": headlines[:8],
             "raw": raw,
         }
+
+    def analyze_universe(
+        self,
+        symbols: List[str],
+        fetch_workers: int = 8,
+        llm_workers: int = 4,
+        deadline_s: Optional[float] = None,
+        progress: Optional[Callable[[int, int, Dict[str, Any]], None]] = None,
+    ) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        analyze_symbol() over a whole universe, streamed: yields
+        (result, ranking) as each result is ready, where `ranking` is every
+        result so far in rank_suggestions() order (a new list each time, so the
+        caller may keep it). The last ranking yielded is the final one.
+
+        Two pools form a pipeline: fetch_workers pull Finnhub data (throughput is
+        bounded by the client's shared rate limiter, not the thread count) and
+        each finished fetch is handed straight to llm_workers, so LLM calls
+        overlap the remaining fetches. With deadline_s the whole run is bounded:
+        fetches and LLM calls not started by then are dropped, and results still
+        in flight when it passes are abandoned, so the run fits its scheduler slot.
+        progress(done, total, result) is called after every result (default:
+        a line every PROGRESS_EVERY results).
+        """
+        syms = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+        total = len(syms)
+        if not total:
+            return
+        progress = progress or _print_progress
+        t_end = time.monotonic() + deadline_s if deadline_s else None
+        done_q: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+        def _late() -> bool:
+            return t_end is not None and time.monotonic() > t_end
+
+        def _fetch_one(sym: str):
+            return None if _late() else self._fetch(sym)
+
+        def _decide_safe(sym: str, fetched) -> None:
+            if _late():
+                done_q.put({"symbol": sym, "skipped": "deadline"})
+                return
+            try:
+                done_q.put(self._decide(sym, *fetched))
+            except Exception as e:
+                done_q.put({"symbol": sym, "recommendation": "HOLD", "confidence": 0.0, "error": str(e)})
+
+        fpool = ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="sugg-fetch")
+        lpool = ThreadPoolExecutor(max_workers=max(1, llm_workers), thread_name_prefix="sugg-llm")
+
+        # every symbol ends in exactly one done_q message, whichever path it takes
+        def _on_fetched(sym: str, fut) -> None:
+            try:
+                fetched = fut.result()
+            except Exception as e:
+                done_q.put({"symbol": sym, "recommendation": "HOLD", "confidence": 0.0, "error": str(e)})
+                return
+            if fetched is None:
+                done_q.put({"symbol": sym, "skipped": "deadline"})
+                return
+            try:
+                lpool.submit(_decide_safe, sym, fetched)
+            except RuntimeError:
+                done_q.put({"symbol": sym, "skipped": "shutdown"})  # generator closed; pool already shut down
+
+        ranked: List[Dict[str, Any]] = []
+        keys: List[Tuple[int, float, float]] = []
+        try:
+            for sym in syms:
+                fpool.submit(_fetch_one, sym).add_done_callback(lambda f, s=sym: _on_fetched(s, f))
+            done = 0
+            for _ in range(total):
+                try:
+                    res = done_q.get(timeout=None if t_end is None else max(0.0, t_end - time.monotonic()))
+                except queue.Empty:
+                    print(f"[SuggestionsAgent] deadline passed; {done}/{total} analyzed, the rest dropped")
+                    return
+                if res.get("skipped"):
+                    continue
+                done += 1
+                k = _rank_key(res)
+                pos = bisect.bisect_right(keys, k)
+                keys.insert(pos, k)
+                ranked.insert(pos, res)
+                progress(done, total, res)
+                yield res, list(ranked)
+        finally:
+            # an abandoned generator must not keep burning quota
+            fpool.shutdown(wait=False, cancel_futures=True)
+            lpool.shutdown(wait=False, cancel_futures=True)
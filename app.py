@@ -10,7 +10,7 @@ from brokers import get_broker
 from core.data_manager import DataManager
 from core.finnhub_client import FinnhubClient
 from core.semantic_memory import SemanticMemory
-from core.llm import LCTraderLLM
+from core.llm_backends import get_llm
 from core.debate import Debate
 from core.screeners import run_screener
 from ui.automation_panel import render_automation_tab
@@ -41,7 +41,7 @@ def _agent_pack():
     dm = DataManager()
     sm = SemanticMemory()
     fh = FinnhubClient(api_key=finnhub_key) if finnhub_key else None
-    llm = LCTraderLLM(api_key=gemini_key)
+    llm = get_llm(api_key=gemini_key)
     debate = Debate()
     return dm, sm, fh, llm, debate
 
@@ -1,111 +1,416 @@
 # autonomous_runner.py
 from __future__ import annotations
-import os, json
+import os, threading, time
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List
 
 from config import settings
 from brokers import get_broker
 from core.data_manager import DataManager
+from core.cycle_planner import CyclePlanner, TIER_EXIT, TIER_NAMES
+from core.file_lock import FileLock
 from core.debate import Debate, summarize_reason_2lines
-from core.llm import LCTraderLLM
+from core.llm_backends import get_llm
+from core.portfolio import PortfolioSnapshot
+from core.run_index import RecentBuys
 from core.policy import (
     compute_allowed_notional, clamp_qty_by_share_caps,
     too_soon_since_last_buy, hit_daily_buy_limit
 )
-from core.positions import read_ledger, write_ledger, set_timebox_on_entry, merge_entry
+from core.positions import (
+    read_ledger, book_buy, remove_position, export_ledger_json, timebox_for
+)
 from core.semantic_memory import SemanticMemory
-from core.store import save_run_dict
+from core.timebox import TimeboxHeap, close_expired
+from core.run_writer import get_run_writer
+from core.telemetry import TELEMETRY, summarize
+from core.vote_gate import VoteGate, bar_features
+from core.work_queue import WorkQueue
 from agents.short_term_agent import ShortTermAgent
 from agents.mid_term_agent import MidTermAgent
 from agents.long_term_agent import LongTermAgent
 
 STATE_DIR = "state"
-RUN_LOG = os.path.join(STATE_DIR, "auto_runs.jsonl")
 os.makedirs(STATE_DIR, exist_ok=True)
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00","Z")
 
 def _append_run(line: Dict[str, Any]) -> None:
-    with open(RUN_LOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(line) + "\n")
-    try: save_run_dict(line)
-    except Exception: pass
+    # queued for the background writer (run log segments + bulk MySQL insert); no I/O on the order path
+    get_run_writer().write(line)
 
-def enforce_timeboxes(broker):
-    # (same as your current version, using read_ledger/close_position)
-    pass  # keep your existing implementation here
+def next_bar_close(bar_minutes: int = 30, now: float | None = None) -> float:
+    """Epoch seconds of the next bar boundary (bars aligned to the hour, e.g. :00/:30)."""
+    now = time.time() if now is None else now
+    step = max(1, int(bar_minutes)) * 60
+    return (int(now) // step + 1) * step
 
-def run_once(symbol: str, is_crypto: bool = False, trigger: str = "bar_close_30m") -> Dict[str, Any]:
-    sym = symbol.upper()
-    broker = get_broker()
-    dm = DataManager()
-    try: sm = SemanticMemory()
-    except Exception: sm = None
-    llm = LCTraderLLM(api_key=settings.gemini_key)
-    debate = Debate(enter_th=settings.mean_confidence_to_act, exit_th=settings.exit_confidence_to_act)
-
-    snap = dm.layered_snapshot_crypto(sym) if is_crypto else dm.layered_snapshot(sym)
-    short = ShortTermAgent("ShortTerm", llm, {})
-    mid   = MidTermAgent("MidTerm", llm, {})
-    long_ = LongTermAgent("LongTerm", llm, {}, sm)
-
-    votes = []
-    for ag in (short, mid, long_):
-        d, c, raw = ag.vote(snap)
-        votes.append({"agent": ag.name, "decision": d, "confidence": float(c), "raw": raw})
-    decision = debate.horizon_decide(votes)
-    reason = summarize_reason_2lines(votes, decision)
-
-    acct = broker.account_balances()
-    last = broker.last_price(sym) or 0.0
+_TIMEBOXES: TimeboxHeap | None = None
+_TIMEBOXES_LOCK = threading.Lock()
 
-    ledger = read_ledger()
-    held_qty_ledger = float((ledger.get(sym, {}) or {}).get("qty", 0.0))
+def timebox_heap() -> TimeboxHeap:
+    """Process-wide expiry heap over the ledger (built on first use)."""
+    global _TIMEBOXES
+    with _TIMEBOXES_LOCK:
+        if _TIMEBOXES is None:
+            _TIMEBOXES = TimeboxHeap()
+        return _TIMEBOXES
+
+def enforce_timeboxes(broker) -> List[Dict[str, Any]]:
+    """
+    Close positions whose timebox_until has passed (callers hold the order
+    lock). O(log n) per expiry via the heap; nothing due costs one peek.
+    """
+    return close_expired(timebox_heap(), broker, _append_run)
+
+class TradingEngine:
+    """
+    Long-lived owner of everything a trading run needs: broker, DataManager,
+    SemanticMemory, LLM backend, Debate, the three agents and the vote gate.
+    Built once per process (scheduler), so a run only pays for data, votes
+    and orders - not Kite client setup, model loading or genai configuration.
+
+      run_symbol(sym)      one symbol, same behaviour/log lines as run_once()
+      run_cycle(symbols)   a watchlist pass
+      health()             cheap liveness check of each component
+      reload(*parts)       rebuild some/all components (e.g. new Kite token)
+    """
+
+    PARTS = ("broker", "dm", "sm", "llm")
+
+    def __init__(self, lazy: bool = False):
+        self._lock = threading.RLock()
+        self.broker: Any = None
+        self.dm: Any = None
+        self.sm: Any = None
+        self.llm: Any = None
+        self.built_at: Dict[str, str] = {}
+        # serializes the order phase across threads *and* worker processes (ledger, cash, run log)
+        self._order_lock = FileLock(os.path.join(STATE_DIR, "orders.lock"))
+        if not lazy:
+            self.reload()
+
+    def _build(self, part: str) -> None:
+        if part == "broker":
+            self.broker = get_broker()
+        elif part == "dm":
+            self.dm = DataManager()
+        elif part == "sm":
+            try: self.sm = SemanticMemory()
+            except Exception: self.sm = None
+        elif part == "llm":
+            self.llm = get_llm(api_key=settings.gemini_key)
+        self.built_at[part] = _now_iso()
+
+    def reload(self, *parts: str) -> None:
+        """Rebuild the named components (all if none given) and the agents that hold them."""
+        with self._lock:
+            for part in parts or self.PARTS:
+                if part not in self.PARTS:
+                    raise ValueError(f"unknown engine part {part!r}; expected one of {self.PARTS}")
+                self._build(part)
+            self.debate = Debate(enter_th=settings.mean_confidence_to_act, exit_th=settings.exit_confidence_to_act)
+            self.agents = (
+                ShortTermAgent("ShortTerm", self.llm, {}),
+                MidTermAgent("MidTerm", self.llm, {}),
+                LongTermAgent("LongTerm", self.llm, {}, self.sm),
+            )
+            if not hasattr(self, "gate"):
+                self.gate = VoteGate()
+                self.planner = CyclePlanner()
+                self.recent_buys = RecentBuys()
+            print(f"[TradingEngine] built {', '.join(parts or self.PARTS)}")
+
+    def health(self) -> Dict[str, Any]:
+        """{'ok': bool, part: 'ok' | error string}; the broker is probed with a balances call."""
+        out: Dict[str, Any] = {}
+        try:
+            self.broker.account_balances()
+            out["broker"] = "ok"
+        except Exception as e:
+            out["broker"] = f"error: {e}"
+        out["dm"] = "ok" if self.dm is not None else "missing"
+        out["llm"] = "ok" if self.llm is not None else "missing"
+        out["sm"] = "disabled" if self.sm is None or self.sm.disabled else "ok"
+        out["ok"] = all(out[k] in ("ok", "disabled") for k in ("broker", "dm", "llm", "sm"))
+        return out
 
-    if decision["action"] == "SELL":
-        if held_qty_ledger > 0.0:
+    def ensure_healthy(self) -> Dict[str, Any]:
+        """health(), rebuilding the broker once if it fails (expired token, dropped session)."""
+        h = self.health()
+        if h["broker"] != "ok":
+            print(f"[TradingEngine] broker unhealthy ({h['broker']}); reloading.")
             try:
-                oid = broker.close_position(sym)
-                ledger.pop(sym, None); write_ledger(ledger)
+                self.reload("broker")
+            except Exception as e:
+                print(f"[TradingEngine] broker reload failed: {e}")
+            h = self.health()
+        return h
+
+    def enforce_timeboxes(self) -> List[Dict[str, Any]]:
+        """Batch-close expired timeboxes now; run_cycle calls this before planning."""
+        with self._lock:
+            broker = self.broker
+        with self._order_lock:
+            return enforce_timeboxes(broker)
+
+    def run_cycle(self, symbols: List[str], is_crypto: bool = False, trigger: str = "bar_close_30m",
+                  workers: int | None = None, deadline: float | None = None) -> List[Dict[str, Any]]:
+        """
+        One watchlist pass on a bounded thread pool (settings.cycle_workers).
+        Each symbol is isolated: its failure is logged and returned as ERROR.
+        The cycle deadline defaults to the next bar close minus
+        settings.cycle_deadline_margin_s.
+
+        The CyclePlanner orders symbols held / timebox-expiring first, then
+        recent signal changes, then the rest, and defers what its per-symbol
+        cost estimates say will not fit before the deadline (logged as
+        DEFERRED). Held names always run and are never expired; other
+        symbols not started by the deadline are logged as SKIPPED, and their
+        decisions reached after it as EXPIRED (see run_symbol).
+        Results come back in watchlist order, each tagged with its symbol.
+
+        Balances, ledger and prices are fetched once into a PortfolioSnapshot
+        shared by all symbols and updated as orders fill, so broker traffic per
+        cycle does not depend on the watchlist length.
+        """
+        syms = list(dict.fromkeys(s.upper() for s in symbols))
+        if not syms:
+            return []
+        if deadline is None:
+            deadline = next_bar_close(settings.bar_minutes) - settings.cycle_deadline_margin_s
+        workers = max(1, min(workers or settings.cycle_workers, len(syms)))
+        t0 = time.time()
+        try:
+            self.enforce_timeboxes()
+        except Exception as e:
+            print(f"[TradingEngine] timebox enforcement failed: {e}")
+        with self._lock:
+            broker = self.broker
+        try:
+            pf = PortfolioSnapshot.fetch(broker, syms)
+        except Exception as e:
+            print(f"[TradingEngine] portfolio snapshot failed ({e}); symbols will fetch their own.")
+            pf = None
+
+        plan = self.planner.plan(syms, pf.ledger if pf else read_ledger(), budget_s=deadline - t0, workers=workers,
+                                 horizon_s=2 * settings.bar_minutes * 60)
+        tiers = plan["tiers"]
+        results: Dict[str, Dict[str, Any]] = {}
+        with self._order_lock:
+            for sym in plan["deferred"]:
+                line = {"when": _now_iso(), "symbol": sym, "trigger": trigger, "action": "DEFERRED",
+                        "tier": TIER_NAMES[tiers[sym]], "est_s": round(self.planner.cost(sym), 1),
+                        "reason": f"projected cycle {plan['projected_s']}s of {plan['budget_s']}s budget"}
+                _append_run(line)
+                results[sym] = line
+
+        def _one(sym: str) -> Dict[str, Any]:
+            held = tiers[sym] == TIER_EXIT
+            if not held and time.time() > deadline:
+                line = {"when": _now_iso(), "symbol": sym, "trigger": trigger, "action": "SKIPPED",
+                        "reason": "cycle deadline reached before this symbol started"}
+                with self._order_lock:
+                    _append_run(line)
+                return line
+            t1 = time.time()
+            try:
+                res = {"symbol": sym, **self.run_symbol(sym, is_crypto=is_crypto, trigger=trigger,
+                                                        deadline=None if held else deadline, portfolio=pf)}
+            except Exception as e:
+                print(f"[TradingEngine] {sym} failed: {e}")
+                res = {"symbol": sym, "action": "ERROR", "error": str(e)}
+            self.planner.observe(sym, time.time() - t1, res.get("action"))
+            return res
+
+        # the pool is FIFO, so submitting in plan order starts exits first
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cycle") as ex:
+            for sym, res in zip(plan["run"], ex.map(_one, plan["run"])):
+                results[sym] = res
+        self.planner.save()
+        try:
+            export_ledger_json()  # positions.json stays current once per cycle, for external readers
+        except Exception as e:
+            print(f"[TradingEngine] ledger export failed: {e}")
+        out = [results[s] for s in syms]
+        late = sum(1 for r in out if r.get("action") in ("SKIPPED", "EXPIRED"))
+        print(f"[TradingEngine] cycle {trigger}: {len(plan['run'])}/{len(syms)} symbols run "
+              f"({len(plan['deferred'])} deferred, {late} skipped/expired), {workers} workers, "
+              f"{time.time() - t0:.1f}s (projected {plan['projected_s']}s)")
+        return out
+
+    def run_symbol(self, symbol: str, is_crypto: bool = False, trigger: str = "bar_close_30m",
+                   deadline: float | None = None, proceed: Callable[[], bool] | None = None,
+                   portfolio: PortfolioSnapshot | None = None) -> Dict[str, Any]:
+        """
+        Data + votes run unlocked (safe to call from many threads); the order
+        phase (balances, ledger, orders, run log) is serialized on _order_lock.
+        With `deadline` (epoch seconds), a decision reached after it is logged
+        as EXPIRED instead of being traded on a stale bar. `proceed` is checked
+        inside the lock right before trading (workers: "do I still hold the lease?").
+        `portfolio` is the cycle's shared snapshot; a standalone run fetches its own.
+        """
+        sym = symbol.upper()
+        with self._lock:  # a consistent set of components for this run, even if reload() races
+            broker, dm, debate, gate = self.broker, self.dm, self.debate, self.gate
+            agents = self.agents
+        decision, reason, ctx = self._analyze(sym, is_crypto, dm, debate, gate, agents)
+        with self._order_lock:
+            if deadline is not None and time.time() > deadline:
+                line = {"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision,
+                        "action": "EXPIRED", "reason": reason + " (past cycle deadline)"}
+                line.update(ctx)
+                _append_run(line)
+                return line
+            if proceed is not None and not proceed():
+                return {"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision,
+                        "action": "ABORTED", "reason": "lease lost before the order phase"}
+            pf = portfolio or PortfolioSnapshot.fetch(broker, [sym])
+            return self._execute(sym, trigger, broker, pf, decision, reason, ctx)
+
+    def _analyze(self, sym: str, is_crypto: bool, dm, debate, gate, agents):
+        snap = dm.layered_snapshot_crypto(sym) if is_crypto else dm.layered_snapshot(sym)
+        votes = []
+        with TELEMETRY.collect() as llm_calls:
+            for ag in agents:
+                feats = bar_features(snap.get(ag.SNAPSHOT_KEY))
+                if feats is not None:
+                    feats["context"] = ag.context_key(snap)  # e.g. the long-term agent's news
+                prev = gate.lookup(sym, ag.name, feats)
+                if prev:
+                    TELEMETRY.record({"agent": ag.name, "cache_hit": True, "latency_ms": 0.0, "parse_path": "reused"})
+                    votes.append({"agent": ag.name, "decision": prev["decision"], "confidence": float(prev["confidence"]),
+                                  "raw": prev.get("raw", ""), "prompt_tokens": 0, "reused": True})
+                    continue
+                d, c, raw = ag.cast_vote(snap)
+                v = {"agent": ag.name, "decision": d, "confidence": float(c), "raw": raw,
+                     "prompt_tokens": ag.last_prompt_tokens}
+                # only votes that actually came from the LLM on this call are worth reusing
+                if ag.last_asked and not str(raw).startswith("LLM unavailable"):
+                    gate.remember(sym, ag.name, feats, v)
+                votes.append(v)
+        gate.save()
+        TELEMETRY.export()
+        decision = debate.horizon_decide(votes)
+        reason = summarize_reason_2lines(votes, decision)
+
+        # per-run context merged into every run-log line below
+        ctx: Dict[str, Any] = {
+            "prompt_tokens": {v["agent"]: v["prompt_tokens"] for v in votes},
+            "reused": [v["agent"] for v in votes if v.get("reused")],
+            "llm": summarize(llm_calls),
+        }
+        return decision, reason, ctx
+
+    def _execute(self, sym: str, trigger: str, broker, pf: PortfolioSnapshot, decision: Dict[str, Any],
+                 reason: str, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        def _log(line: Dict[str, Any]) -> None:
+            line.update(ctx)
+            _append_run(line)
+            self.recent_buys.note(line)
+
+        last = pf.price(sym)
+        held_qty_ledger = pf.held_qty(sym)
+
+        if decision["action"] == "SELL":
+            if held_qty_ledger > 0.0:
+                try:
+                    oid = broker.close_position(sym)
+                except Exception as e:
+                    line = {"when": _now_iso(), "symbol": sym, "trigger": trigger,
+                            "decision": decision, "action": "SELL_FAILED", "error": str(e)}
+                    _log(line); return line
                 line = {"when": _now_iso(), "symbol": sym, "trigger": trigger,
                         "decision": decision, "action": "SELL", "order_id": oid, "reason": reason}
-                _append_run(line); return line
+                try:
+                    pf.apply_sell(sym); remove_position(sym)
+                    timebox_heap().note_exit(sym)
+                except Exception as e:  # the order went out: log it as a SELL regardless
+                    line["error"] = f"ledger update failed: {e}"
+                _log(line); return line
+            _log({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action":"SELL_NO_POSITION"}); 
+            return {"action": "SELL_NO_POSITION"}
+
+        if decision["action"] == "BUY":
+            if last <= 0: 
+                _log({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action":"SUGGEST_BUY", "reason":reason+" (no price)"})
+                return {"action":"SUGGEST_BUY"}
+
+            buys = self.recent_buys
+            buys.refresh()  # BUYs other processes logged since the last check
+            if hit_daily_buy_limit(sym, buys.buys_today(sym)) or too_soon_since_last_buy(sym, buys.last_buy(sym)):
+                _log({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (throttle)"})
+                return {"action":"SUGGEST_BUY"}
+
+            notional_allowed = compute_allowed_notional(decision.get("target_horizon"), pf.cash, pf.equity, pf.symbol_mv(sym))
+            if notional_allowed <= 0:
+                _log({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (caps)"})
+                return {"action":"SUGGEST_BUY"}
+
+            desired_qty = notional_allowed / last
+            desired_qty = clamp_qty_by_share_caps(desired_qty, held_qty_ledger)
+            if desired_qty <= 0:
+                _log({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (share cap)"})
+                return {"action":"SUGGEST_BUY"}
+
+            oid, filled_qty, avg_px = broker.market_buy_qty(sym, desired_qty)
+            line = {"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"BUY",
+                    "qty":filled_qty,"entry_price":avg_px,"order_id":oid,"reason":reason}
+            horizon = decision.get("target_horizon")
+            try:
+                pf.apply_buy(sym, horizon, filled_qty, avg_px)
+                # merged in the ledger itself, never written back from the snapshot; first entry starts the clock
+                row = book_buy(sym, filled_qty, avg_px, horizon, timebox_for(horizon or "mid"),
+                               merge=not getattr(broker, "books_ledger", False))
+                if row:
+                    pf.ledger[sym] = row
+                    timebox_heap().note_entry(sym, row.get("timebox_until"))
             except Exception as e:
-                line = {"when": _now_iso(), "symbol": sym, "trigger": trigger,
-                        "decision": decision, "action": "SELL_FAILED", "error": str(e)}
-                _append_run(line); return line
-        _append_run({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action":"SELL_NO_POSITION"}); 
-        return {"action": "SELL_NO_POSITION"}
-
-    if decision["action"] == "BUY":
-        if last <= 0: 
-            _append_run({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action":"SUGGEST_BUY", "reason":reason+" (no price)"})
-            return {"action":"SUGGEST_BUY"}
-
-        runs_for_symbol = []  # you can reuse your recent-run helper
-        if hit_daily_buy_limit(sym, runs_for_symbol) or too_soon_since_last_buy(sym, runs_for_symbol):
-            _append_run({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (throttle)"})
-            return {"action":"SUGGEST_BUY"}
-
-        notional_allowed = compute_allowed_notional(decision.get("target_horizon"), acct["cash"], acct["equity"], held_qty_ledger * last)
-        if notional_allowed <= 0:
-            _append_run({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (caps)"})
-            return {"action":"SUGGEST_BUY"}
-
-        desired_qty = notional_allowed / last
-        desired_qty = clamp_qty_by_share_caps(desired_qty, held_qty_ledger)
-        if desired_qty <= 0:
-            _append_run({"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"SUGGEST_BUY","reason":reason+" (share cap)"})
-            return {"action":"SUGGEST_BUY"}
-
-        oid, filled_qty, avg_px = broker.market_buy_qty(sym, desired_qty)
-        merge_entry(ledger, sym, decision.get("target_horizon"), filled_qty, avg_px, filled_qty*avg_px, reset_timebox=False)
-        write_ledger(ledger)
-        line = {"when":_now_iso(),"symbol":sym,"trigger":trigger,"decision":decision,"action":"BUY",
-                "qty":filled_qty,"entry_price":avg_px,"order_id":oid,"reason":reason}
-        _append_run(line); return line
-
-    _append_run({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action": "HOLD"})
-    return {"action":"HOLD"}
+                # filled: never raise from here (a retried job would buy again); the logged BUY
+                # still reaches the throttles
+                line["error"] = f"ledger update failed: {e}"
+            _log(line); return line
+
+        _log({"when": _now_iso(), "symbol": sym, "trigger": trigger, "decision": decision, "action": "HOLD"})
+        return {"action":"HOLD"}
+
+
+_ENGINE: TradingEngine | None = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine() -> TradingEngine:
+    """Process-wide engine, built on first use."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = TradingEngine()
+        return _ENGINE
+
+def run_once(symbol: str, is_crypto: bool = False, trigger: str = "bar_close_30m") -> Dict[str, Any]:
+    return get_engine().run_symbol(symbol, is_crypto=is_crypto, trigger=trigger)
+
+def enqueue_cycle(queue: WorkQueue, symbols: List[str], is_crypto: bool = False,
+                  trigger: str = "bar_close_30m", deadline: float | None = None) -> Dict[str, Any]:
+    """
+    Coordinator side of RUN_MODE=COORDINATOR: one queue job per symbol instead
+    of running it here. Held / expiring names get priority 0 and no deadline;
+    the rest expire unclaimed at `deadline` (default: the usual cycle deadline).
+    """
+    if deadline is None:
+        deadline = next_bar_close(settings.bar_minutes) - settings.cycle_deadline_margin_s
+    ledger = read_ledger()
+    planner = CyclePlanner()
+    ids, dups = [], 0
+    for s in symbols:
+        tier = planner.tier(s.upper(), ledger, 2 * settings.bar_minutes * 60)
+        jid = queue.enqueue(s, trigger, is_crypto=is_crypto, priority=tier,
+                            deadline=None if tier == TIER_EXIT else deadline,
+                            max_attempts=settings.job_max_attempts)
+        if jid is None:
+            dups += 1
+        else:
+            ids.append(jid)
+    print(f"[Coordinator] {trigger}: enqueued {len(ids)} job(s), {dups} already pending; queue {queue.stats()}")
+    return {"enqueued": ids, "duplicates": dups}
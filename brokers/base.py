@@ -1,20 +1,32 @@
 # brokers/base.py
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 
 class BaseBroker(ABC):
     """Common surface used by UI + automation."""
 
+    # True when the broker's fills already update the position ledger (paper)
+    books_ledger: bool = False
+
     @abstractmethod
     def account_balances(self) -> Dict[str, float]:
         """Return {'cash': float, 'equity': float, 'buying_power': float, 'portfolio_value': float}"""
         raise NotImplementedError
 
+    def account_balances_at(self, prices: Optional[Dict[str, Optional[float]]] = None,
+                            ledger: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """account_balances() for callers that already hold quotes; brokers that price positions themselves (paper) reuse them."""
+        return self.account_balances()
+
     @abstractmethod
     def last_price(self, symbol: str) -> Optional[float]:
         raise NotImplementedError
 
+    def last_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """Batch quote; brokers with a multi-instrument endpoint override this."""
+        return {s: self.last_price(s) for s in symbols}
+
     @abstractmethod
     def list_positions(self) -> List[Dict]:
         """Return list of {'symbol','qty','avg_entry_price','current_price','market_value','asset_class'}"""
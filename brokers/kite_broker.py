@@ -64,6 +64,25 @@ class KiteBroker:
             except Exception:
                 return None
 
+    def last_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        """One ltp call per 500 instruments instead of one per symbol."""
+        out: Dict[str, Optional[float]] = {}
+        syms = [(s or "").upper().strip() for s in symbols]
+        for k in range(0, len(syms), 500):
+            chunk = syms[k:k + 500]
+            ins = [_nse(s) for s in chunk]
+            if self.openalgo:
+                j = self._oa_get("/ltp", params={"i": ins})
+                quotes = {i: {"last_price": v} for i, v in (j.get("ltp") or {}).items()}
+            else:
+                quotes = self.kite.ltp(ins)
+            for s, i in zip(chunk, ins):
+                try:
+                    out[s] = float(quotes[i]["last_price"])
+                except Exception:
+                    out[s] = None
+        return out
+
     # ---- positions ----
     def list_positions(self) -> List[Dict]:
         if self.openalgo:
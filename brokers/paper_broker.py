@@ -1,27 +1,21 @@
 # brokers/paper_broker.py
 from __future__ import annotations
-import json, os, time
-from typing import Dict, List, Tuple, Optional
+import time
+from typing import Any, Dict, List, Tuple, Optional
 from config import settings
-from core.positions import read_ledger, write_ledger, merge_entry
+from core.positions import read_ledger
+from core.ledger_db import get_ledger_db
 from core.data_manager import DataManager
 # edited- latest
-ACC_PATH = os.path.join("state", "paper_account.json")
-os.makedirs("state", exist_ok=True)
-
-def _read_acc():
-    if not os.path.exists(ACC_PATH):
-        acc = {"cash": float(settings.paper_starting_equity)}
-        with open(ACC_PATH, "w") as f: json.dump(acc, f)
-        return acc
-    with open(ACC_PATH, "r") as f: return json.load(f)
-
-def _write_acc(acc): 
-    with open(ACC_PATH, "w") as f: json.dump(acc, f)
+# cash and positions live in state/ledger.db (core/ledger_db.py); each fill
+# updates both in one transaction. paper_account.json is imported once.
 
 class PaperBroker:
+    books_ledger = True  # buy()/sell() below merge the ledger row with the cash
+
     def __init__(self):
         self.dm = DataManager()
+        self.db = get_ledger_db()
 
     def _px(self, symbol: str) -> Optional[float]:
         # try intraday first, else daily
@@ -40,13 +34,18 @@ class PaperBroker:
         return None
 
     def account_balances(self) -> Dict[str, float]:
-        acc = _read_acc()
-        cash = float(acc.get("cash", 0.0))
+        return self.account_balances_at()
+
+    def account_balances_at(self, prices: Optional[Dict[str, Optional[float]]] = None,
+                            ledger: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """account_balances() valued at quotes the caller already has (symbols missing from `prices` are priced here)."""
+        cash = self.db.cash(settings.paper_starting_equity)
+        prices = {k.upper(): v for k, v in (prices or {}).items()}
         # equity = cash + market value of ledger
         mv = 0.0
-        led = read_ledger()
+        led = read_ledger() if ledger is None else ledger
         for sym, meta in led.items():
-            last = self._px(sym) or 0.0
+            last = (prices[sym.upper()] if sym.upper() in prices else self._px(sym)) or 0.0
             mv += last * float(meta.get("qty", 0))
         equity = cash + mv
         return {
@@ -57,6 +56,9 @@ class PaperBroker:
     def last_price(self, symbol: str) -> Optional[float]:
         return self._px(symbol)
 
+    def last_prices(self, symbols: List[str]) -> Dict[str, Optional[float]]:
+        return {s: self._px(s) for s in symbols}
+
     def list_positions(self) -> List[Dict]:
         out = []
         led = read_ledger()
@@ -74,50 +76,23 @@ class PaperBroker:
         return out
 
     def position_qty(self, symbol: str) -> float:
-        return float((read_ledger().get(symbol, {}) or {}).get("qty", 0))
+        return float((self.db.get(symbol) or {}).get("qty", 0))
 
     def market_buy(self, symbol: str, qty: float) -> str:
         return self.market_buy_qty(symbol, float(qty))[0]
 
     def market_sell(self, symbol: str, qty: float) -> str:
-        led = read_ledger()
-        qty = float(qty)
         px = self._px(symbol) or 0.0
         if px <= 0: raise RuntimeError("No price for paper sell.")
-        held = float((led.get(symbol, {}) or {}).get("qty", 0))
-        if qty > held: qty = held
-        # cash increases
-        acc = _read_acc()
-        acc["cash"] = float(acc.get("cash", 0.0)) + qty * px
-        _write_acc(acc)
-        # reduce ledger
-        if symbol in led:
-            new_qty = held - qty
-            if new_qty <= 1e-12:
-                led.pop(symbol, None)
-            else:
-                # keep same entry_price for remainder
-                led[symbol]["qty"] = new_qty
-                led[symbol]["notional"] = new_qty * float(led[symbol].get("entry_price", px))
-        write_ledger(led)
+        # sells at most what is held; cash credit + ledger reduction are one transaction
+        self.db.sell(symbol, float(qty), px, starting_cash=settings.paper_starting_equity)
         return f"paper-sell-{int(time.time())}"
 
     def market_buy_qty(self, symbol: str, qty: float) -> Tuple[str, float, float]:
-        qty = float(qty)
         px = self._px(symbol) or 0.0
         if px <= 0: raise RuntimeError("No price for paper buy.")
-        acc = _read_acc()
-        cost = qty * px
-        if cost > float(acc.get("cash", 0.0)):
-            # buy what we can
-            qty = float(acc.get("cash", 0.0)) / px
-            cost = qty * px
-        acc["cash"] = float(acc.get("cash", 0.0)) - cost
-        _write_acc(acc)
-        # ledger merge
-        led = read_ledger()
-        merge_entry(led, symbol, horizon="mid", add_qty=qty, add_price=px, add_notional=cost, reset_timebox=False)
-        write_ledger(led)
+        # buys what the cash allows; cash debit + ledger merge are one transaction
+        qty = self.db.buy(symbol, float(qty), px, horizon="mid", starting_cash=settings.paper_starting_equity)
         return (f"paper-buy-{int(time.time())}", qty, px)
 
     def close_position(self, symbol: str) -> str:
@@ -1,6 +1,6 @@
 #config.py
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 def _b(v, default=False):
     s = str(os.getenv(v, "1" if default else "0")).strip().lower()
@@ -27,10 +27,65 @@ class Settings:
     finnhub_key: str = os.getenv("FINNHUB_KEY", "")
     mysql_url: str = os.getenv("MYSQL_URL", "")
 
+    # llm backend: GEMINI (live) | RULES | RECORD | REPLAY | STUB (see core/llm_backends.py)
+    llm_backend: str = os.getenv("LLM_BACKEND", "GEMINI").upper()
+    llm_stub_latency_ms: float = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))
+    llm_stub_jitter_ms: float = float(os.getenv("LLM_STUB_JITTER_MS", "200"))
+
     # strategy thresholds
     mean_confidence_to_act: float = float(os.getenv("MEAN_CONF_TH", "0.60"))
     exit_confidence_to_act: float = float(os.getenv("EXIT_CONF_TH", "0.45"))
 
+    # pre-LLM vote gate: reuse an agent's last vote while its inputs barely moved
+    gate_enable: bool = _b("GATE_ENABLE", default=True)
+    gate_rsi_delta: float = float(os.getenv("GATE_RSI_DELTA", "3.0"))        # RSI points
+    gate_close_pct: float = float(os.getenv("GATE_CLOSE_PCT", "0.005"))      # 0.5% price move
+    gate_max_age_min: float = float(os.getenv("GATE_MAX_AGE_MIN", "120"))    # force a fresh vote after this
+
+    # background news ingestion into SemanticMemory (core/news_ingest.py, run_scheduler.py)
+    news_ingest_enable: bool = _b("NEWS_INGEST_ENABLE", default=True)
+    news_ingest_minutes: int = int(os.getenv("NEWS_INGEST_MINUTES", "15"))
+    news_lookback_days: int = int(os.getenv("NEWS_LOOKBACK_DAYS", "7"))     # first fetch per symbol
+    news_encode_batch: int = int(os.getenv("NEWS_ENCODE_BATCH", "256"))
+
+    # cycle executor (autonomous_runner.TradingEngine.run_cycle)
+    bar_minutes: int = int(os.getenv("BAR_MINUTES", "30"))
+    cycle_workers: int = int(os.getenv("CYCLE_WORKERS", "8"))
+    cycle_deadline_margin_s: float = float(os.getenv("CYCLE_DEADLINE_MARGIN_S", "90"))  # finish this long before the bar closes
+
+    # EVENT: cycles fire when the data layer confirms a closed bar (core/bar_trigger.py).
+    # CRON: the old fixed :02/:32 offsets.
+    trigger_mode: str = os.getenv("TRIGGER_MODE", "EVENT").upper()
+    bar_poll_s: float = float(os.getenv("BAR_POLL_S", "10"))          # poll interval while a bar is due
+    bar_debounce_s: float = float(os.getenv("BAR_DEBOUNCE_S", "15"))  # gather symbols closing the same bar
+    bar_settle_s: float = float(os.getenv("BAR_SETTLE_S", "60"))      # no next bar from the provider: take the close on the clock
+
+    # LOCAL: the scheduler runs cycles itself. COORDINATOR: it only enqueues jobs
+    # (core/work_queue.py) for run_worker.py processes to claim.
+    run_mode: str = os.getenv("RUN_MODE", "LOCAL").upper()
+    worker_procs: int = int(os.getenv("WORKER_PROCS", "2"))
+    worker_lease_s: float = float(os.getenv("WORKER_LEASE_S", "300"))
+    worker_poll_s: float = float(os.getenv("WORKER_POLL_S", "1.0"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # run log persistence (core/run_writer.py): flush after this many records or seconds
+    run_log_batch: int = int(os.getenv("RUN_LOG_BATCH", "200"))
+    run_log_flush_s: float = float(os.getenv("RUN_LOG_FLUSH_S", "1.0"))
+    run_log_keep_days: int = int(os.getenv("RUN_LOG_KEEP_DAYS", "365"))  # daily segments under state/runs/; 0 = keep all
+
+    # order policy (core/policy.py)
+    CASH_FLOOR_PCT: float = float(os.getenv("CASH_FLOOR_PCT", "0.40"))                 # keep >= 40% of equity in cash
+    HORIZON_TRADE_CAP_PCT: dict = field(default_factory=lambda: {
+        "short": float(os.getenv("TRADE_CAP_SHORT_PCT", "0.02")),
+        "mid":   float(os.getenv("TRADE_CAP_MID_PCT", "0.03")),
+        "long":  float(os.getenv("TRADE_CAP_LONG_PCT", "0.05")),
+    })
+    PER_SYMBOL_EXPOSURE_CAP_PCT: float = float(os.getenv("PER_SYMBOL_EXPOSURE_CAP_PCT", "0.10"))
+    MAX_SHARES_PER_BUY: float = float(os.getenv("MAX_SHARES_PER_BUY", "100"))
+    MAX_SHARES_PER_SYMBOL: float = float(os.getenv("MAX_SHARES_PER_SYMBOL", "500"))
+    REBUY_COOLDOWN_MINUTES: float = float(os.getenv("REBUY_COOLDOWN_MINUTES", "60"))
+    DAILY_BUY_LIMIT_PER_SYMBOL: int = int(os.getenv("DAILY_BUY_LIMIT_PER_SYMBOL", "2"))
+
     # data manager lookbacks (reuse your old defaults)
     short_interval: str = "30m"
     short_period: str = "60d"
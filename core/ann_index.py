@@ -0,0 +1,154 @@
+# core/ann_index.py
+from __future__ import annotations
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Below this many vectors an exact scan (matrix @ q + argpartition) is faster
+# than probing an index, so the IVF only kicks in for larger stores.
+ANN_MIN_ITEMS = int(os.getenv("SEMMEM_ANN_MIN", "20000"))
+# Lists probed per query (of ~sqrt(N) lists): higher = better recall, slower.
+# Measure the trade-off on your own data with scripts/bench_ann.py.
+ANN_NPROBE = int(os.getenv("SEMMEM_ANN_NPROBE", "16"))
+
+
+def topk_dot(matrix: np.ndarray, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k by dot product (== cosine for normalized vectors)."""
+    if len(matrix) == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return topk_scores(np.asarray(matrix @ q, dtype=np.float32).reshape(-1), k)
+
+
+def topk_scores(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions and values of the k largest scores, best first.
+    argpartition is O(N); only the k winners get sorted.
+    """
+    n = len(sims)
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    k = min(k, n)
+    part = np.argpartition(-sims, k - 1)[:k] if k < n else np.arange(n)
+    order = part[np.argsort(-sims[part], kind="stable")]
+    return order.astype(np.int64), sims[order]
+
+
+def _kmeans(x: np.ndarray, n_clusters: int, iters: int = 12, seed: int = 0) -> np.ndarray:
+    """Spherical k-means (cosine) on the rows of x; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    cent = x[rng.choice(len(x), size=n_clusters, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(x @ cent.T, axis=1)
+        sums = np.zeros_like(cent)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():  # re-seed empty clusters from random points
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        cent = (sums / np.maximum(norms, 1e-12)).astype(np.float32)
+    return cent
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over a row-major embedding matrix it does not own
+    (the VectorStore memmap or SemanticMemory's buffer). It only stores a
+    coarse-centroid assignment per row:
+
+      - sync(matrix): assigns rows added since the last sync (incremental);
+        (re)trains centroids when the matrix has grown 4x past the last training
+      - search(matrix, q, k, nprobe): scores only the rows in the nprobe
+        lists nearest to q, exact top-k among those
+
+    Recall/latency are tuned with nprobe (SEMMEM_ANN_NPROBE).
+    """
+
+    def __init__(self, nprobe: int = ANN_NPROBE, seed: int = 0):
+        self.nprobe = int(nprobe)
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.assign = np.zeros(0, dtype=np.int32)
+        self.trained_on = 0
+        self._lists: Optional[list] = None  # per-centroid row ids, rebuilt lazily after inserts
+
+    def __len__(self) -> int:
+        return len(self.assign)
+
+    @staticmethod
+    def _nlist_for(n: int) -> int:
+        return int(max(16, min(4096, np.sqrt(n))))
+
+    def train(self, matrix: np.ndarray, sample: int = 32768) -> None:
+        n = len(matrix)
+        nlist = min(self._nlist_for(n), n)
+        rng = np.random.default_rng(self.seed)
+        idx = np.sort(rng.choice(n, size=min(n, max(sample, 64 * nlist)), replace=False))
+        self.centroids = _kmeans(np.asarray(matrix[idx], dtype=np.float32), nlist, seed=self.seed)
+        self.trained_on = n
+        self.assign = np.zeros(0, dtype=np.int32)
+        self._lists = None
+
+    def _assign_rows(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty(len(rows), dtype=np.int32)
+        step = 8192  # bound the (rows x nlist) temp matrix
+        for s in range(0, len(rows), step):
+            out[s:s + step] = np.argmax(np.asarray(rows[s:s + step], dtype=np.float32) @ self.centroids.T, axis=1)
+        return out
+
+    def sync(self, matrix: np.ndarray) -> int:
+        """Index rows not seen yet; returns how many were added (retrain counts as all)."""
+        n = len(matrix)
+        if self.centroids is None or n > 4 * max(1, self.trained_on) or len(self.assign) > n:
+            self.train(matrix)
+        start = len(self.assign)
+        if n <= start:
+            return 0
+        self.assign = np.concatenate([self.assign, self._assign_rows(matrix[start:n])])
+        self._lists = None
+        return n - start
+
+    def _build_lists(self) -> list:
+        order = np.argsort(self.assign, kind="stable")
+        counts = np.bincount(self.assign, minlength=len(self.centroids))
+        return np.split(order.astype(np.int64), np.cumsum(counts)[:-1])
+
+    def search(self, matrix: np.ndarray, q: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if self.centroids is None or not len(self.assign):
+            return topk_dot(matrix, q, k)
+        if self._lists is None:
+            self._lists = self._build_lists()
+        nprobe = min(int(nprobe or self.nprobe), len(self.centroids))
+        csims = self.centroids @ q
+        probe = np.argpartition(-csims, nprobe - 1)[:nprobe] if nprobe < len(csims) else np.arange(len(csims))
+        cand = np.concatenate([self._lists[c] for c in probe])
+        if not len(cand):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        cand.sort()  # sequential-ish reads from the memmap
+        idx, scores = topk_dot(matrix[cand], q, k)
+        return cand[idx], scores
+
+    # ---- persistence (next to the VectorStore so reopening skips re-assignment) ----
+
+    def save(self, path: str) -> None:
+        if self.centroids is None:
+            return
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, centroids=self.centroids, assign=self.assign, trained_on=np.int64(self.trained_on))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = ANN_NPROBE) -> Optional["IVFIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            z = np.load(path)
+            ix = cls(nprobe=nprobe)
+            ix.centroids = z["centroids"].astype(np.float32)
+            ix.assign = z["assign"].astype(np.int32)
+            ix.trained_on = int(z["trained_on"])
+            return ix
+        except Exception as e:
+            print(f"[IVFIndex] could not load {path} ({e}); rebuilding.")
+            return None
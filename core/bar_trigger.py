@@ -0,0 +1,168 @@
+# core/bar_trigger.py
+from __future__ import annotations
+import json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+STATE_DIR = "state"
+
+
+def last_closed_bar(df: pd.DataFrame, bar_minutes: int, now: float, settle_s: float = 60.0) -> Optional[float]:
+    """
+    Start (epoch seconds) of the newest bar in `df` confirmed closed by `now`.
+    Providers return the still-forming bar as the last row, so its values can
+    lag the close; a bar counts as closed once the provider has opened the
+    next one, or (quiet symbol, last bar of the session) settle_s after its
+    nominal close.
+    """
+    if df is None or df.empty or "time" not in df.columns:
+        return None
+    span = max(1, int(bar_minutes)) * 60
+    # naive timestamps are local time, as the providers return them
+    starts = [pd.Timestamp(t).to_pydatetime().timestamp() for t in df["time"].tolist()[-3:]]
+    for i in range(len(starts) - 1, -1, -1):
+        close = starts[i] + span
+        if close > now:
+            continue
+        if i + 1 < len(starts) or close + settle_s <= now:
+            return starts[i]
+    return None
+
+
+class BarCloseTrigger:
+    """
+    Fires cycles when the data layer confirms a new closed bar, instead of at
+    fixed cron offsets after the expected close:
+
+      poll()     refreshes bars (fetch(symbol), normally
+                 DataManager.refresh_intraday, which also rewrites the cache
+                 the cycle then reads) for symbols whose bar is due; a due
+                 symbol is polled every poll_s until last_closed_bar() sees
+                 its bar closed, then left alone until the next close. Still
+                 missing max_wait_s after the expected close (market shut,
+                 provider outage) -> polled every idle_poll_s instead.
+      confirm()  records a closed bar for a symbol; the entry point for a
+                 streaming source too. Each (symbol, bar) counts once.
+      flush()    symbols that confirmed the same bar are debounced for
+                 debounce_s (or until the whole watchlist is in) and handed
+                 to on_bars(symbols, bar_start) as one cycle.
+
+    The last bar seen per symbol persists in state/bar_trigger_<name>.json,
+    so a restart never fires a bar twice. Bars that closed more than one bar
+    length ago (first start, overnight) only set the baseline.
+    """
+
+    def __init__(self, name: str, symbols: List[str], on_bars: Callable[[List[str], float], Any],
+                 fetch: Callable[[str], pd.DataFrame], bar_minutes: int = 30, poll_s: float = 10.0,
+                 debounce_s: float = 15.0, settle_s: float = 60.0, max_wait_s: Optional[float] = None,
+                 idle_poll_s: float = 300.0, max_workers: int = 8, state_path: Optional[str] = None):
+        self.name = name
+        self.symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        self.on_bars = on_bars
+        self.fetch = fetch
+        self.span = max(1, int(bar_minutes)) * 60
+        self.poll_s = float(poll_s)
+        self.debounce_s = float(debounce_s)
+        self.settle_s = float(settle_s)
+        self.max_wait_s = float(self.span if max_wait_s is None else max_wait_s)
+        self.idle_poll_s = float(idle_poll_s)
+        self.max_workers = max(1, int(max_workers))
+        self.state_path = state_path or os.path.join(STATE_DIR, f"bar_trigger_{name}.json")
+        self._lock = threading.Lock()
+        self._last: Dict[str, float] = {}                 # symbol -> start of last bar seen
+        self._due: Dict[str, float] = {}                  # symbol -> next poll (epoch)
+        self._pending: Dict[float, Dict[str, Any]] = {}   # bar start -> {"first": t, "symbols": [...]}
+        self._dirty = False
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    self._last = {k: float(v) for k, v in (json.load(f) or {}).items()}
+            except Exception:
+                self._last = {}
+
+    def _save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._last)
+        try:
+            os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+            tmp = self.state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.state_path)
+        except Exception as e:
+            print(f"[BarTrigger] {self.name}: save failed: {e}")
+
+    def _schedule(self, sym: str, now: float) -> None:
+        last = self._last.get(sym)
+        next_close = None if last is None else last + 2 * self.span
+        if next_close is not None and next_close > now:
+            self._due[sym] = next_close
+        elif next_close is not None and now - next_close < self.max_wait_s:
+            self._due[sym] = now + self.poll_s
+        else:
+            self._due[sym] = now + self.idle_poll_s
+
+    def _fetch(self, sym: str) -> Optional[pd.DataFrame]:
+        try:
+            return self.fetch(sym)
+        except Exception as e:
+            print(f"[BarTrigger] {self.name}: fetch failed for {sym}: {e}")
+            return None
+
+    # --------------------------- sources ---------------------------
+
+    def confirm(self, symbol: str, bar_start: float, now: Optional[float] = None) -> bool:
+        """Record a closed bar; True if it is new for this symbol (old or repeated bars are ignored)."""
+        now = time.time() if now is None else now
+        sym = symbol.upper()
+        with self._lock:
+            if bar_start <= self._last.get(sym, float("-inf")):
+                return False
+            self._last[sym] = bar_start
+            self._dirty = True
+            self._schedule(sym, now)
+            if now - (bar_start + self.span) > self.span:
+                return True  # baseline only: too old to trade on
+            batch = self._pending.setdefault(bar_start, {"first": now, "symbols": []})
+            batch["symbols"].append(sym)
+        return True
+
+    def poll(self, now: Optional[float] = None) -> List[Tuple[float, List[str]]]:
+        """Fetch the due symbols, confirm what closed, flush ready batches. Returns the batches fired."""
+        t = time.time() if now is None else now
+        due = [s for s in self.symbols if self._due.get(s, 0.0) <= t]
+        if due:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(due)), thread_name_prefix="bars") as ex:
+                frames = list(ex.map(self._fetch, due))
+            t = time.time() if now is None else now
+            for sym, df in zip(due, frames):
+                bar = last_closed_bar(df, self.span // 60, t, self.settle_s)
+                if bar is None or not self.confirm(sym, bar, t):
+                    with self._lock:
+                        self._schedule(sym, t)
+        return self.flush(t)
+
+    # --------------------------- dispatch ---------------------------
+
+    def flush(self, now: Optional[float] = None) -> List[Tuple[float, List[str]]]:
+        now = time.time() if now is None else now
+        ready: List[Tuple[float, List[str]]] = []
+        with self._lock:
+            for bar, batch in sorted(self._pending.items()):
+                if now - batch["first"] >= self.debounce_s or set(self.symbols) <= set(batch["symbols"]):
+                    ready.append((bar, batch["symbols"]))
+                    del self._pending[bar]
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self._save()
+        for bar, syms in ready:
+            lag = now - (bar + self.span)
+            print(f"[BarTrigger] {self.name}: bar {time.strftime('%H:%M', time.localtime(bar))} closed "
+                  f"for {len(syms)} symbol(s), firing {lag:.0f}s after close")
+            try:
+                self.on_bars(syms, bar)
+            except Exception as e:
+                print(f"[BarTrigger] {self.name}: on_bars failed: {e}")
+        return ready
@@ -0,0 +1,129 @@
+# core/cycle_planner.py
+from __future__ import annotations
+import json, os, statistics, threading, time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+STATE_DIR = "state"
+PLANNER_PATH = os.path.join(STATE_DIR, "cycle_planner.json")
+
+# EWMA weight of the newest per-symbol run time, and the cost assumed for a
+# symbol never seen before (until any symbol has been measured).
+COST_ALPHA = float(os.getenv("CYCLE_COST_ALPHA", "0.3"))
+DEFAULT_COST_S = float(os.getenv("CYCLE_DEFAULT_COST_S", "10"))
+
+# Priority tiers, lower runs first. Tier 0 is never shed.
+TIER_EXIT = 0     # open position, or its timebox expires before the next cycle
+TIER_SIGNAL = 1   # last decision was BUY/SELL or differs from the one before
+TIER_REST = 2
+TIER_NAMES = {TIER_EXIT: "held", TIER_SIGNAL: "signal", TIER_REST: "rest"}
+
+
+def _epoch(ts_iso: Optional[str]) -> Optional[float]:
+    if not ts_iso:
+        return None
+    try:
+        return datetime.fromisoformat(str(ts_iso).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class CyclePlanner:
+    """
+    Orders a cycle's symbols by priority and sheds what will not fit:
+
+      plan(symbols, ledger, budget_s, workers)
+          tiers: held / expiring timebox -> recent signal change -> the rest;
+          within a tier, symbols deferred most often go first, then cheapest.
+          Projected cycle time = sum of per-symbol cost / workers; once it
+          passes budget_s, tier 1-2 symbols are deferred. Tier 0 always runs.
+      observe(symbol, seconds, action)
+          updates the symbol's EWMA cost and its recent decisions.
+
+    State (costs, last two actions, deferral counts) persists in
+    state/cycle_planner.json so priorities survive scheduler restarts.
+    """
+
+    def __init__(self, path: str = PLANNER_PATH, alpha: float = COST_ALPHA, default_cost_s: float = DEFAULT_COST_S):
+        self.path = path
+        self.alpha = float(alpha)
+        self.default_cost_s = float(default_cost_s)
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {"cost": {}, "actions": {}, "deferred": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    loaded = json.load(f) or {}
+                for k in self._state:
+                    self._state[k].update(loaded.get(k) or {})
+            except Exception:
+                pass
+
+    # --------------------------- estimates ---------------------------
+
+    def cost(self, symbol: str) -> float:
+        c = self._state["cost"].get(symbol)
+        if c is not None:
+            return float(c)
+        known = list(self._state["cost"].values())
+        return float(statistics.median(known)) if known else self.default_cost_s
+
+    def tier(self, symbol: str, ledger: Dict[str, Any], horizon_s: float) -> int:
+        row = ledger.get(symbol) or {}
+        if float(row.get("qty", 0.0) or 0.0) > 0.0:
+            return TIER_EXIT
+        until = _epoch(row.get("timebox_until"))
+        if until is not None and until <= time.time() + horizon_s:
+            return TIER_EXIT
+        acts = self._state["actions"].get(symbol) or []
+        if acts and (acts[-1] in ("BUY", "SELL") or (len(acts) > 1 and acts[-1] != acts[-2])):
+            return TIER_SIGNAL
+        return TIER_REST
+
+    # --------------------------- planning ---------------------------
+
+    def plan(self, symbols: List[str], ledger: Dict[str, Any], budget_s: float, workers: int = 1,
+             horizon_s: float = 3600.0) -> Dict[str, Any]:
+        """{'run': [...priority order], 'deferred': [...], 'tiers': {sym: tier}, 'projected_s', 'budget_s'}"""
+        workers = max(1, int(workers))
+        with self._lock:
+            tiers = {s: self.tier(s, ledger, horizon_s) for s in symbols}
+            deferred_n = self._state["deferred"]
+            order = sorted(symbols, key=lambda s: (tiers[s], -int(deferred_n.get(s, 0)), self.cost(s)))
+            run: List[str] = []
+            deferred: List[str] = []
+            work = 0.0
+            for s in order:
+                c = self.cost(s)
+                if tiers[s] == TIER_EXIT or (work + c) / workers <= budget_s:
+                    run.append(s)
+                    work += c
+                else:
+                    deferred.append(s)
+            for s in run:
+                deferred_n.pop(s, None)
+            for s in deferred:
+                deferred_n[s] = int(deferred_n.get(s, 0)) + 1
+        return {"run": run, "deferred": deferred, "tiers": tiers,
+                "projected_s": round(work / workers, 1), "budget_s": round(budget_s, 1)}
+
+    def observe(self, symbol: str, seconds: float, action: Optional[str] = None) -> None:
+        with self._lock:
+            prev = self._state["cost"].get(symbol)
+            self._state["cost"][symbol] = round(
+                float(seconds) if prev is None else (1 - self.alpha) * float(prev) + self.alpha * float(seconds), 3)
+            if action:
+                acts = (self._state["actions"].get(symbol) or [])[-1:] + [action]
+                self._state["actions"][symbol] = acts
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._state)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[CyclePlanner] save failed: {e}")
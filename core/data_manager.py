@@ -63,6 +63,19 @@ class DataManager:
     def get_intraday_short(self, symbol: str) -> pd.DataFrame:
         return self._fetch(symbol, settings.short_interval, lookback_days=60, max_age_min=15, kind=settings.short_interval)
 
+    def refresh_intraday(self, symbol: str, is_crypto: bool = False) -> pd.DataFrame:
+        """
+        Fetch short-interval bars now, bypassing the cache age check, and
+        rewrite the cache. Raw bars (no indicators); the bar-close trigger
+        uses this, so the cycle it fires reads the bar that was just confirmed.
+        """
+        sym = symbol.replace("/", "-") if is_crypto else symbol
+        kind = f"CRYPTO_{settings.short_interval}" if is_crypto else settings.short_interval
+        df = self.provider.get_bars(sym, interval=settings.short_interval, lookback_days=60)
+        if df is not None and not df.empty:
+            df.to_parquet(self._cache_path(sym, kind), index=False)
+        return df
+
     def get_daily_mid(self, symbol: str) -> pd.DataFrame:
         return self._fetch(symbol, "1d", lookback_days=5*365, max_age_min=1440, kind="1d")
 
@@ -0,0 +1,160 @@
+# core/embedder.py
+from __future__ import annotations
+import os, threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Try to import sentence-transformers, but never hard-crash if the stack isn't healthy
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception as _e:
+    SentenceTransformer = None  # type: ignore
+
+DEFAULT_MODEL = os.getenv("SEMMEM_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# "host:port" of a running scripts/embed_worker.py; empty = encode in this process
+WORKER_ADDR = os.getenv("SEMMEM_WORKER", "").strip()
+WORKER_KEY = os.getenv("SEMMEM_WORKER_KEY", "semmem").encode("utf-8")
+
+
+class LocalEncoder:
+    """
+    SentenceTransformer loaded on first use (CPU only, see SemanticMemory notes).
+    One per model per process; load is guarded so concurrent first callers
+    wait for a single load instead of each loading their own copy.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self._model: Any = None
+        self._failed: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return SentenceTransformer is not None and self._failed is None
+
+    def _load(self) -> Any:
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None and self._failed is None:
+                if SentenceTransformer is None:
+                    self._failed = "sentence-transformers unavailable"
+                else:
+                    try:
+                        self._model = SentenceTransformer(self.model_name, device="cpu")  # type: ignore[arg-type]
+                        print(f"[Embedder] Loaded model on CPU: {self.model_name}")
+                    except Exception as e:
+                        # remembered, so later callers don't pay the load attempt again
+                        self._failed = str(e)
+                        print(f"[Embedder] Model init failed ({e}).")
+        if self._model is None:
+            raise RuntimeError(f"encoder unavailable: {self._failed}")
+        return self._model
+
+    def dim(self) -> int:
+        return int(self._load().get_sentence_embedding_dimension())
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, batch_size: int = 64) -> np.ndarray:
+        vecs = self._load().encode(texts, normalize_embeddings=normalize_embeddings, batch_size=batch_size)
+        return np.asarray(vecs, dtype=np.float32)
+
+
+class RemoteEncoder:
+    """
+    Client for the embedding worker process (scripts/embed_worker.py), so the
+    scheduler, Streamlit and any workers share one loaded model.
+    Same encode()/dim() surface as LocalEncoder.
+    """
+
+    def __init__(self, address: str, model_name: str = DEFAULT_MODEL, authkey: bytes = WORKER_KEY):
+        host, _, port = address.rpartition(":")
+        self.address: Tuple[str, int] = (host or "127.0.0.1", int(port))
+        self.model_name = model_name
+        self.authkey = authkey
+        self._conn: Any = None
+        self._failed: Optional[str] = None
+        self._lock = threading.Lock()  # a Connection is not safe for concurrent use
+
+    @property
+    def available(self) -> bool:
+        return self._failed is None
+
+    def _call(self, req: Tuple[Any, ...]) -> Any:
+        from multiprocessing.connection import Client
+        with self._lock:
+            for attempt in (0, 1):  # reconnect once if the worker restarted
+                try:
+                    if self._conn is None:
+                        self._conn = Client(self.address, authkey=self.authkey)
+                    self._conn.send(req)
+                    ok, payload = self._conn.recv()
+                    break
+                except (EOFError, OSError) as e:
+                    self._conn = None
+                    if attempt:
+                        self._failed = f"worker {self.address} unreachable: {e}"
+                        raise RuntimeError(self._failed)
+        if not ok:
+            raise RuntimeError(f"embedding worker error: {payload}")
+        return payload
+
+    def dim(self) -> int:
+        return int(self._call(("dim", self.model_name)))
+
+    def encode(self, texts: List[str], normalize_embeddings: bool = True, batch_size: int = 64) -> np.ndarray:
+        return np.asarray(self._call(("encode", self.model_name, list(texts), bool(normalize_embeddings), int(batch_size))),
+                          dtype=np.float32)
+
+
+_ENCODERS: Dict[str, Any] = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def get_encoder(model_name: str = DEFAULT_MODEL) -> Any:
+    """Process-wide encoder for `model_name` (remote if SEMMEM_WORKER is set). Nothing loads until first encode."""
+    with _ENCODERS_LOCK:
+        enc = _ENCODERS.get(model_name)
+        if enc is None:
+            enc = RemoteEncoder(WORKER_ADDR, model_name) if WORKER_ADDR else LocalEncoder(model_name)
+            _ENCODERS[model_name] = enc
+        return enc
+
+
+def serve(address: str = "127.0.0.1:7601", authkey: bytes = WORKER_KEY) -> None:
+    """
+    Embedding worker loop: one thread per client connection, all sharing the
+    process's LocalEncoders. Requests:
+      ("dim", model)                               -> int
+      ("encode", model, texts, normalize, batch)   -> float32 ndarray
+    Replies are (ok: bool, payload).
+    """
+    from multiprocessing.connection import Listener
+    host, _, port = address.rpartition(":")
+    listener = Listener((host or "127.0.0.1", int(port)), authkey=authkey)
+    print(f"[Embedder] worker listening on {address}")
+
+    def _handle(conn: Any) -> None:
+        with conn:
+            while True:
+                try:
+                    req = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    op, model = req[0], req[1]
+                    with _ENCODERS_LOCK:
+                        enc = _ENCODERS.setdefault(model, LocalEncoder(model))
+                    if op == "dim":
+                        conn.send((True, enc.dim()))
+                    elif op == "encode":
+                        conn.send((True, enc.encode(req[2], normalize_embeddings=req[3], batch_size=req[4])))
+                    else:
+                        conn.send((False, f"unknown op {op!r}"))
+                except Exception as e:
+                    conn.send((False, str(e)))
+
+    while True:
+        conn = listener.accept()
+        threading.Thread(target=_handle, args=(conn,), daemon=True).start()
@@ -0,0 +1,51 @@
+# core/file_lock.py
+from __future__ import annotations
+import os, threading
+
+try:
+    import fcntl  # POSIX
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None  # type: ignore
+
+
+class FileLock:
+    """Inter-process exclusive lock on a lock file (plus a thread lock for this process)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tlock = threading.Lock()
+        self._fh = None
+
+    def __enter__(self):
+        self._tlock.acquire()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fh = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+        except BaseException:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._tlock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+            self._tlock.release()
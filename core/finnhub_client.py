@@ -1,15 +1,106 @@
 # core/finnhub_client.py
 from __future__ import annotations
+import os, threading, time
 import requests
 import datetime as dt
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from requests.adapters import HTTPAdapter
+
+from core.rate_limit import TokenBucket
 
 FINNHUB_BASE = "https://finnhub.io/api/v1"
 
+# Free tier is 60 calls/min per key; the bucket is shared by every client in the process.
+FINNHUB_RPM = int(os.getenv("FINNHUB_RPM", "60"))
+FINNHUB_RETRIES = int(os.getenv("FINNHUB_RETRIES", "3"))
+FINNHUB_CACHE_TTL = float(os.getenv("FINNHUB_CACHE_TTL", "300"))  # seconds; 0 disables
+# Longest Retry-After we sleep through; beyond it the call serves a stale cache entry or fails.
+FINNHUB_MAX_WAIT = float(os.getenv("FINNHUB_MAX_WAIT", "60"))
+_CACHE_MAX = 512
+
+_session: Optional[requests.Session] = None
+_limiter = TokenBucket.per_minute(FINNHUB_RPM)
+_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, Any]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """One pooled keep-alive session per process (connections reused across clients/threads)."""
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+def _retry_after(r: requests.Response, attempt: int) -> float:
+    try:
+        return max(0.5, float(r.headers.get("Retry-After", "")))
+    except ValueError:
+        return min(30.0, 2.0 ** attempt)
+
+
 class FinnhubClient:
     def __init__(self, api_key: str):
         self.api_key = api_key
 
+    def _get(self, path: str, params: Dict[str, Any], ttl: float = FINNHUB_CACHE_TTL) -> Any:
+        """
+        GET {FINNHUB_BASE}{path} -> parsed JSON, through the shared session and limiter.
+        - responses cached for `ttl` seconds, keyed by path + params (+ key)
+        - 429: waits Retry-After (or exponential backoff) and drains the bucket;
+          a wait longer than FINNHUB_MAX_WAIT is not slept through: the last
+          cached response is returned even if expired, else the 429 is raised
+        - 5xx / connection errors: exponential backoff, FINNHUB_RETRIES attempts
+        Raises like requests would once retries are exhausted.
+        """
+        key = (self.api_key, path, tuple(sorted(params.items())))
+        now = time.monotonic()
+        with _lock:
+            hit = _cache.get(key)
+            if ttl > 0 and hit and hit[0] > now:
+                _cache.move_to_end(key)
+                return hit[1]
+
+        sess = _get_session()
+        for attempt in range(FINNHUB_RETRIES + 1):
+            _limiter.take()
+            try:
+                r = sess.get(f"{FINNHUB_BASE}{path}", params={**params, "token": self.api_key}, timeout=20)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= FINNHUB_RETRIES:
+                    raise
+                time.sleep(min(30.0, 2.0 ** attempt))
+                continue
+            if r.status_code == 429 or r.status_code >= 500:
+                if attempt >= FINNHUB_RETRIES:
+                    r.raise_for_status()
+                if r.status_code == 429:
+                    _limiter.drain()  # the server says we're over quota; stop other callers too
+                wait = _retry_after(r, attempt)
+                if wait > FINNHUB_MAX_WAIT:
+                    if hit:
+                        return hit[1]  # stale beats blocking the caller (UI threads included)
+                    r.raise_for_status()
+                time.sleep(wait)
+                continue
+            r.raise_for_status()
+            data = r.json()
+            break
+
+        if ttl > 0:
+            with _lock:
+                _cache[key] = (time.monotonic() + ttl, data)
+                _cache.move_to_end(key)
+                while len(_cache) > _CACHE_MAX:
+                    _cache.popitem(last=False)
+        return data
+
     # --------- News Sentiment (NEW) ---------
     def news_sentiment(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
@@ -23,11 +114,7 @@ class FinnhubClient:
         }
         """
         try:
-            url = f"{FINNHUB_BASE}/news-sentiment"
-            params = {"symbol": symbol.upper(), "token": self.api_key}
-            r = requests.get(url, params=params, timeout=20)
-            r.raise_for_status()
-            data = r.json()
+            data = self._get("/news-sentiment", {"symbol": symbol.upper()})
             if isinstance(data, dict):
                 return data
         except Exception:
@@ -38,11 +125,8 @@ class FinnhubClient:
     def company_news(self, symbol: str, days: int = 30) -> List[str]:
         end = dt.date.today()
         start = end - dt.timedelta(days=days)
-        url = f"{FINNHUB_BASE}/company-news"
-        params = {"symbol": symbol.upper(), "from": start.isoformat(), "to": end.isoformat(), "token": self.api_key}
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        items = r.json() if isinstance(r.json(), list) else []
+        data = self._get("/company-news", {"symbol": symbol.upper(), "from": start.isoformat(), "to": end.isoformat()})
+        items = data if isinstance(data, list) else []
         out = []
         for it in items[:50]:
             headline = (it.get("headline") or "").strip()
@@ -52,13 +136,10 @@ class FinnhubClient:
         return out
 
     def crypto_news(self, max_items: int = 50) -> List[str]:
-        url = f"{FINNHUB_BASE}/news"
         for category in ("crypto", "general"):
             try:
-                params = {"category": category, "token": self.api_key}
-                r = requests.get(url, params=params, timeout=20)
-                r.raise_for_status()
-                items = r.json() if isinstance(r.json(), list) else []
+                data = self._get("/news", {"category": category})
+                items = data if isinstance(data, list) else []
                 out = []
                 for it in items[:max_items]:
                     headline = (it.get("headline") or "").strip()
@@ -75,11 +156,8 @@ class FinnhubClient:
     def company_news_struct(self, symbol: str, days: int = 7, max_items: int = 50) -> List[Dict]:
         end = dt.date.today()
         start = end - dt.timedelta(days=days)
-        url = f"{FINNHUB_BASE}/company-news"
-        params = {"symbol": symbol.upper(), "from": start.isoformat(), "to": end.isoformat(), "token": self.api_key}
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        items = r.json() if isinstance(r.json(), list) else []
+        data = self._get("/company-news", {"symbol": symbol.upper(), "from": start.isoformat(), "to": end.isoformat()})
+        items = data if isinstance(data, list) else []
         out: List[Dict] = []
         for it in items[:max_items]:
             out.append({
@@ -93,11 +171,8 @@ class FinnhubClient:
         return out
 
     def general_news_struct(self, max_items: int = 50) -> List[Dict]:
-        url = f"{FINNHUB_BASE}/news"
-        params = {"category": "general", "token": self.api_key}
-        r = requests.get(url, params=params, timeout=20)
-        r.raise_for_status()
-        items = r.json() if isinstance(r.json(), list) else []
+        data = self._get("/news", {"category": "general"})
+        items = data if isinstance(data, list) else []
         out: List[Dict] = []
         for it in items[:max_items]:
             out.append({
@@ -106,17 +181,15 @@ class FinnhubClient:
                 "source": it.get("source"),
                 "url": it.get("url"),
                 "datetime": it.get("datetime"),
+                "related": it.get("related"),  # comma-separated tickers, often empty
             })
         return out
 
     def crypto_news_struct(self, max_items: int = 50) -> List[Dict]:
         for category in ("crypto", "general"):
             try:
-                url = f"{FINNHUB_BASE}/news"
-                params = {"category": category, "token": self.api_key}
-                r = requests.get(url, params=params, timeout=20)
-                r.raise_for_status()
-                items = r.json() if isinstance(r.json(), list) else []
+                data = self._get("/news", {"category": category})
+                items = data if isinstance(data, list) else []
                 out: List[Dict] = []
                 for it in items[:max_items]:
                     out.append({
@@ -125,6 +198,7 @@ class FinnhubClient:
                         "source": it.get("source"),
                         "url": it.get("url"),
                         "datetime": it.get("datetime"),
+                        "related": it.get("related"),
                         "category": category,
                     })
                 if out:
@@ -0,0 +1,158 @@
+# core/key_pool.py
+from __future__ import annotations
+import os, threading, time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.rate_limit import TokenBucket
+
+# Per-key quota (set these to your tier's limits for the primary model).
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+# How long a call may sit in the queue when every key is exhausted.
+QUEUE_TIMEOUT_S = float(os.getenv("GEMINI_QUEUE_TIMEOUT", "120"))
+# Back-off applied to a key that got a 429 anyway (quota shared with other apps, etc.).
+COOLDOWN_429_S = float(os.getenv("GEMINI_429_COOLDOWN", "30"))
+
+
+class QuotaTimeout(RuntimeError):
+    """Raised when no key frees up budget within the queue timeout."""
+
+
+class KeySlot:
+    """One API key with its own request/token buckets and lazily-built client."""
+
+    def __init__(self, key: str, rpm: float, tpm: float):
+        self.key = key
+        self.requests = TokenBucket.per_minute(rpm)
+        self.tokens = TokenBucket.per_minute(tpm)
+        self.cooldown_until = 0.0
+        self.client: Any = None  # set by core.llm on first use
+
+    @property
+    def label(self) -> str:
+        return f"...{self.key[-4:]}" if len(self.key) >= 4 else "key"
+
+    def wait_time(self, est_tokens: float, now: float) -> float:
+        if now < self.cooldown_until:
+            return self.cooldown_until - now
+        return max(self.requests.wait_time(1), self.tokens.wait_time(est_tokens))
+
+
+class KeyPool:
+    """
+    Assigns each Gemini call to the key with the most remaining budget.
+    When every key is out of budget, callers queue (FIFO) until one refills.
+
+        slot = pool.acquire(est_tokens)
+        ... call with slot.client ...
+        pool.settle(slot, est_tokens, actual_tokens)   # or pool.penalize(slot) on 429
+    """
+
+    def __init__(self, keys: List[str], rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM):
+        if not keys:
+            raise RuntimeError("KeyPool needs at least one API key.")
+        self.slots = [KeySlot(k, rpm, tpm) for k in keys]
+        self._cond = threading.Condition()
+        self._queue: deque = deque()  # waiting tickets, head goes first
+        self._next_ticket = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def client(self, slot: KeySlot, build: Callable[[], Any]) -> Any:
+        """slot's API client, built by `build` on first use; concurrent first calls build it once."""
+        if slot.client is None:
+            with self._cond:
+                if slot.client is None:
+                    slot.client = build()
+        return slot.client
+
+    def _pick(self, est_tokens: float) -> Tuple[Optional[KeySlot], float]:
+        """Best slot that can take the call now, else (None, shortest wait)."""
+        now = time.monotonic()
+        best: Optional[KeySlot] = None
+        best_room = -1.0
+        min_wait = float("inf")
+        for s in self.slots:
+            w = s.wait_time(est_tokens, now)
+            if w > 0:
+                min_wait = min(min_wait, w)
+                continue
+            # fraction of the tighter budget left after this call
+            room = min(
+                (s.requests.available() - 1) / s.requests.capacity,
+                (s.tokens.available() - est_tokens) / s.tokens.capacity,
+            )
+            if room > best_room:
+                best, best_room = s, room
+        return best, min_wait
+
+    def acquire(self, est_tokens: float, timeout: float = QUEUE_TIMEOUT_S) -> KeySlot:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append(ticket)
+            try:
+                while True:
+                    if self._queue[0] == ticket:
+                        slot, wait = self._pick(est_tokens)
+                        if slot is not None and slot.requests.try_take(1):
+                            slot.tokens.adjust(-est_tokens)
+                            return slot
+                    else:
+                        wait = 0.25  # not our turn yet; woken by notify_all
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise QuotaTimeout(f"all {len(self.slots)} Gemini key(s) exhausted for {timeout:.0f}s")
+                    self._cond.wait(min(wait, left, 1.0))
+            finally:
+                # success or timeout, leave the line so the next caller gets its turn
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def settle(self, slot: KeySlot, est_tokens: float, actual_tokens: Optional[float]) -> None:
+        """Correct the token bucket once the real usage is known."""
+        if actual_tokens:
+            slot.tokens.adjust(float(est_tokens) - float(actual_tokens))
+        with self._cond:
+            self._cond.notify_all()
+
+    def penalize(self, slot: KeySlot, seconds: float = COOLDOWN_429_S) -> None:
+        """Key got rate-limited server-side: bench it and empty its buckets."""
+        slot.cooldown_until = time.monotonic() + seconds
+        slot.requests.drain()
+        print(f"[KeyPool] 429 on key {slot.label}; cooling down {seconds:.0f}s")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [{
+            "key": s.label,
+            "requests_left": round(s.requests.available(), 1),
+            "tokens_left": int(s.tokens.available()),
+            "cooldown_s": round(max(0.0, s.cooldown_until - now), 1),
+        } for s in self.slots]
+
+
+_POOLS: Dict[Tuple[str, ...], KeyPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def pool_keys(explicit_key: Optional[str] = None) -> List[str]:
+    """GEMINI_API_KEYS (comma list) + explicit key / GEMINI_API_KEY, de-duplicated."""
+    keys = [k.strip() for k in os.getenv("GEMINI_API_KEYS", "").split(",") if k.strip()]
+    single = (explicit_key or os.getenv("GEMINI_API_KEY") or "").strip()
+    if single:
+        keys.insert(0, single)
+    return list(dict.fromkeys(keys))
+
+
+def get_key_pool(explicit_key: Optional[str] = None) -> KeyPool:
+    """Process-wide pool per key set, so every LCTraderLLM shares the same budgets."""
+    keys = tuple(pool_keys(explicit_key))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(keys)
+        if pool is None:
+            pool = _POOLS[keys] = KeyPool(list(keys))
+        return pool
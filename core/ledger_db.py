@@ -0,0 +1,283 @@
+# core/ledger_db.py
+from __future__ import annotations
+import json, os, sqlite3, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+STATE_DIR = "state"
+LEDGER_DB = os.path.join(STATE_DIR, "ledger.db")
+LEDGER_JSON = os.path.join(STATE_DIR, "positions.json")
+PAPER_ACCOUNT_JSON = os.path.join(STATE_DIR, "paper_account.json")
+
+_COLS = ("symbol", "horizon", "qty", "entry_price", "notional", "entered_at", "timebox_until")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    symbol        TEXT PRIMARY KEY,
+    horizon       TEXT,
+    qty           REAL NOT NULL DEFAULT 0,
+    entry_price   REAL NOT NULL DEFAULT 0,
+    notional      REAL NOT NULL DEFAULT 0,
+    entered_at    TEXT,
+    timebox_until TEXT,
+    extra         TEXT            -- any other keys of the row, as JSON
+);
+CREATE INDEX IF NOT EXISTS positions_horizon ON positions(horizon);
+CREATE INDEX IF NOT EXISTS positions_timebox ON positions(timebox_until);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00","Z")
+
+
+def _row_out(r: sqlite3.Row) -> Dict[str, Any]:
+    d = {k: r[k] for k in _COLS if r[k] is not None}
+    if r["extra"]:
+        try:
+            d.update(json.loads(r["extra"]))
+        except Exception:
+            pass
+    return d
+
+
+def _row_in(symbol: str, info: Dict[str, Any]) -> tuple:
+    extra = {k: v for k, v in info.items() if k not in _COLS}
+    return (symbol.upper(), info.get("horizon"), float(info.get("qty", 0.0) or 0.0),
+            float(info.get("entry_price", 0.0) or 0.0), float(info.get("notional", 0.0) or 0.0),
+            info.get("entered_at"), info.get("timebox_until"), json.dumps(extra) if extra else None)
+
+
+class LedgerDB:
+    """
+    Position ledger (and the paper account's cash) on SQLite in WAL mode,
+    replacing whole-file rewrites of state/positions.json:
+
+      get / upsert / remove      one row, O(1) by primary key
+      by_horizon / expiring      indexed lookups
+      buy / sell                 cash + position in one transaction (paper fills)
+      book_buy                   a live fill merged + timeboxed in one transaction
+      all / replace_all          the dict shape read_ledger()/write_ledger() always had
+      export_json                positions.json for tools that still read the file
+
+    Writers use BEGIN IMMEDIATE, so concurrent scheduler / worker / UI writes
+    serialize instead of losing updates. Within a process every write goes
+    through one connection, so its data_version() only moves when another
+    connection (a worker, the UI) commits. The first open imports an existing
+    positions.json and paper_account.json.
+    """
+
+    def __init__(self, path: str = LEDGER_DB, busy_timeout_s: float = 30.0):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._busy_timeout_s = busy_timeout_s
+        self._tls = threading.local()
+        self._wlock = threading.RLock()
+        self._wconn = self._open(check_same_thread=False)  # the writer; _wlock serializes its users
+        self._wconn.executescript(_SCHEMA)
+        self._import_json()
+
+    def _open(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        # autocommit mode; transactions are explicit BEGIN IMMEDIATE below
+        conn = sqlite3.connect(self.path, timeout=self._busy_timeout_s, isolation_level=None,
+                               check_same_thread=check_same_thread)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's reader connection."""
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            conn = self._tls.conn = self._open()
+        return conn
+
+    class _Tx:
+        def __init__(self, db: "LedgerDB"):
+            self.db = db
+
+        def __enter__(self) -> sqlite3.Connection:
+            self.db._wlock.acquire()
+            try:
+                self.db._wconn.execute("BEGIN IMMEDIATE")
+            except BaseException:
+                self.db._wlock.release()
+                raise
+            return self.db._wconn
+
+        def __exit__(self, exc_type, *exc) -> None:
+            try:
+                self.db._wconn.execute("ROLLBACK" if exc_type else "COMMIT")
+            finally:
+                self.db._wlock.release()
+
+    def tx(self) -> "LedgerDB._Tx":
+        return LedgerDB._Tx(self)
+
+    def data_version(self) -> int:
+        """SQLite's data_version on the writer: changes only when another connection has committed."""
+        with self._wlock:
+            return int(self._wconn.execute("PRAGMA data_version").fetchone()[0])
+
+    def _import_json(self) -> None:
+        with self.tx() as c:
+            if c.execute("SELECT 1 FROM meta WHERE key='imported'").fetchone():
+                return
+            if os.path.exists(LEDGER_JSON):
+                try:
+                    with open(LEDGER_JSON, "r", encoding="utf-8") as f:
+                        for sym, info in (json.load(f) or {}).items():
+                            c.execute("INSERT OR REPLACE INTO positions VALUES (?,?,?,?,?,?,?,?)", _row_in(sym, info))
+                except Exception as e:
+                    print(f"[LedgerDB] could not import {LEDGER_JSON}: {e}")
+            if os.path.exists(PAPER_ACCOUNT_JSON):
+                try:
+                    with open(PAPER_ACCOUNT_JSON, "r", encoding="utf-8") as f:
+                        cash = float((json.load(f) or {}).get("cash"))
+                    c.execute("INSERT OR REPLACE INTO meta VALUES ('paper_cash', ?)", (repr(cash),))
+                except Exception as e:
+                    print(f"[LedgerDB] could not import {PAPER_ACCOUNT_JSON}: {e}")
+            c.execute("INSERT INTO meta VALUES ('imported', ?)", (_now_iso(),))
+
+    # --------------------------- positions ---------------------------
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        r = self._conn().execute("SELECT * FROM positions WHERE symbol=?", (symbol.upper(),)).fetchone()
+        return _row_out(r) if r else None
+
+    def all(self) -> Dict[str, Dict[str, Any]]:
+        return {r["symbol"]: _row_out(r) for r in self._conn().execute("SELECT * FROM positions ORDER BY symbol")}
+
+    def by_horizon(self, horizon: str) -> List[Dict[str, Any]]:
+        return [_row_out(r) for r in self._conn().execute("SELECT * FROM positions WHERE horizon=?", (horizon,))]
+
+    def expiring(self, before_iso: str) -> List[Dict[str, Any]]:
+        """Rows with a timebox_until at or before `before_iso`, earliest first (the ISO strings sort by time)."""
+        rows = self._conn().execute("SELECT * FROM positions WHERE timebox_until IS NOT NULL AND timebox_until <= ? "
+                                    "ORDER BY timebox_until", (before_iso,))
+        return [_row_out(r) for r in rows]
+
+    def timeboxes(self) -> List[tuple]:
+        """(symbol, timebox_until) for every timeboxed position, read off the timebox index."""
+        return [(r["symbol"], r["timebox_until"]) for r in self._conn().execute(
+            "SELECT symbol, timebox_until FROM positions WHERE timebox_until IS NOT NULL")]
+
+    def upsert(self, symbol: str, info: Dict[str, Any]) -> None:
+        with self.tx() as c:
+            c.execute("INSERT OR REPLACE INTO positions VALUES (?,?,?,?,?,?,?,?)", _row_in(symbol, info))
+
+    def remove(self, symbol: str) -> None:
+        with self.tx() as c:
+            c.execute("DELETE FROM positions WHERE symbol=?", (symbol.upper(),))
+
+    def replace_all(self, data: Dict[str, Any]) -> None:
+        """Whole-ledger write (write_ledger compatibility), still one transaction."""
+        with self.tx() as c:
+            c.execute("DELETE FROM positions")
+            c.executemany("INSERT INTO positions VALUES (?,?,?,?,?,?,?,?)",
+                          [_row_in(sym, info) for sym, info in data.items()])
+
+    # --------------------------- paper account ---------------------------
+
+    @staticmethod
+    def _cash(c: sqlite3.Connection, default: float) -> float:
+        r = c.execute("SELECT value FROM meta WHERE key='paper_cash'").fetchone()
+        return float(r["value"]) if r else float(default)
+
+    def cash(self, default: float = 0.0) -> float:
+        return self._cash(self._conn(), default)
+
+    def buy(self, symbol: str, qty: float, px: float, horizon: str = "mid", starting_cash: float = 0.0) -> float:
+        """
+        Paper fill: debit cash and merge into the position atomically. Buys
+        what the cash allows if `qty` does not fit; returns the filled qty.
+        """
+        sym = symbol.upper()
+        with self.tx() as c:
+            cash = self._cash(c, starting_cash)
+            qty = min(float(qty), cash / px) if px > 0 else 0.0
+            cost = qty * px
+            c.execute("INSERT OR REPLACE INTO meta VALUES ('paper_cash', ?)", (repr(cash - cost),))
+            self._merge(c, sym, qty, px, horizon)
+        return qty
+
+    @staticmethod
+    def _merge(c: sqlite3.Connection, sym: str, qty: float, px: float, horizon: Optional[str]) -> None:
+        """Add a fill to the row (average entry price); creates it on first entry."""
+        cost = qty * px
+        r = c.execute("SELECT qty, notional FROM positions WHERE symbol=?", (sym,)).fetchone()
+        if r:
+            new_qty = float(r["qty"]) + qty
+            notional = float(r["notional"]) + cost
+            c.execute("UPDATE positions SET qty=?, notional=?, entry_price=?, "
+                      "horizon=COALESCE(horizon, ?), entered_at=COALESCE(entered_at, ?) WHERE symbol=?",
+                      (new_qty, notional, notional / max(new_qty, 1e-9), horizon, _now_iso(), sym))
+        else:
+            c.execute("INSERT INTO positions(symbol, horizon, qty, entry_price, notional, entered_at) "
+                      "VALUES (?,?,?,?,?,?)", (sym, horizon, qty, px, cost, _now_iso()))
+
+    def book_buy(self, symbol: str, qty: float, px: float, horizon: Optional[str], timebox_until: Optional[str],
+                 merge: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Record a live BUY fill in one transaction and return the row as stored:
+        merge qty / notional into the current row (skip with merge=False when the
+        broker's own fill already did, as the paper broker's buy() does), and on
+        the first timeboxed entry set horizon + timebox_until. Later adds keep the
+        earliest timebox. Nothing is read from a caller's copy of the row, so
+        concurrent writers never lose updates.
+        """
+        sym = symbol.upper()
+        with self.tx() as c:
+            if merge and qty > 0:
+                self._merge(c, sym, float(qty), float(px), horizon)
+            if timebox_until:
+                c.execute("UPDATE positions SET timebox_until=?, horizon=COALESCE(?, horizon) "
+                          "WHERE symbol=? AND timebox_until IS NULL", (timebox_until, horizon, sym))
+            r = c.execute("SELECT * FROM positions WHERE symbol=?", (sym,)).fetchone()
+        return _row_out(r) if r else None
+
+    def sell(self, symbol: str, qty: float, px: float, starting_cash: float = 0.0) -> float:
+        """Paper fill: credit cash and reduce / delete the position atomically; returns the sold qty."""
+        sym = symbol.upper()
+        with self.tx() as c:
+            r = c.execute("SELECT qty, entry_price FROM positions WHERE symbol=?", (sym,)).fetchone()
+            held = float(r["qty"]) if r else 0.0
+            qty = min(float(qty), held)
+            cash = self._cash(c, starting_cash)
+            c.execute("INSERT OR REPLACE INTO meta VALUES ('paper_cash', ?)", (repr(cash + qty * px),))
+            if r:
+                left = held - qty
+                if left <= 1e-12:
+                    c.execute("DELETE FROM positions WHERE symbol=?", (sym,))
+                else:
+                    # keep the same entry_price for the remainder
+                    c.execute("UPDATE positions SET qty=?, notional=? WHERE symbol=?",
+                              (left, left * float(r["entry_price"] or px), sym))
+        return qty
+
+    # --------------------------- export ---------------------------
+
+    def export_json(self, path: str = LEDGER_JSON) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.all(), f, indent=2)
+        os.replace(tmp, path)
+
+
+_DB: Optional[LedgerDB] = None
+_DB_LOCK = threading.Lock()
+
+
+def get_ledger_db() -> LedgerDB:
+    """Process-wide LedgerDB on state/ledger.db."""
+    global _DB
+    with _DB_LOCK:
+        if _DB is None:
+            _DB = LedgerDB()
+        return _DB
@@ -1,6 +1,6 @@
 # core/llm.py
 from __future__ import annotations
-import os, json, re
+import os, json, re, threading, time
 from typing import Tuple, Dict, Any, List, Optional
 
 import google.generativeai as genai
@@ -9,16 +9,84 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from core.key_pool import KeySlot, QuotaTimeout, get_key_pool, pool_keys
+from core.prompt_format import estimate_tokens
+from core.telemetry import TELEMETRY
+
+try:
+    from google.api_core.exceptions import ResourceExhausted
+except Exception:  # older/partial installs
+    ResourceExhausted = None  # type: ignore
+
+# Expected response size used when reserving TPM budget before a call
+# (2.5 models also bill thinking tokens, hence the headroom).
+RESPONSE_TOKEN_BUDGET = int(os.getenv("GEMINI_RESPONSE_TOKENS", "400"))
+
 
 def _configure_genai(explicit_key: Optional[str]) -> str:
     """
-    Configure Gemini once (explicit key > env).
+    Configure Gemini once (explicit key > env). The global config only backs
+    the SDK default client; pooled calls use per-key clients (_client_for).
+    """
+    keys = pool_keys(explicit_key)
+    if not keys:
+        raise RuntimeError("GEMINI_API_KEY missing (and no explicit api_key / GEMINI_API_KEYS provided).")
+    genai.configure(api_key=keys[0])
+    return keys[0]
+
+
+def _client_for(pool: Any, slot: KeySlot) -> Any:
+    """
+    genai.configure() is process-global, so per-key calls get their own
+    GenerativeServiceClient, built once per key (under the pool lock) and reused.
+    None when the SDK cannot take an injected client (see _bind_client).
     """
-    key = (explicit_key or os.getenv("GEMINI_API_KEY") or "").strip()
-    if not key:
-        raise RuntimeError("GEMINI_API_KEY missing (and no explicit api_key provided).")
-    genai.configure(api_key=key)
-    return key
+    if not _CLIENT_HOOK:
+        return None
+
+    def _build() -> Any:
+        from google.ai import generativelanguage as glm
+        return glm.GenerativeServiceClient(client_options={"api_key": slot.key})
+
+    return pool.client(slot, _build)
+
+
+# google-generativeai has no public way to hand GenerativeModel a client; it
+# builds one from the global config unless the private _client is already set.
+# That hook is only used on SDK versions it is known to exist in; anywhere else
+# every call goes through the globally configured (first) key instead.
+_CLIENT_HOOK_VERSIONS = ((0, 3), (1, 0))  # [min, max)
+
+
+def _sdk_version() -> Tuple[int, ...]:
+    return tuple(int(x) for x in re.findall(r"\d+", str(getattr(genai, "__version__", "")))[:2])
+
+
+def _client_hook_ok() -> bool:
+    lo, hi = _CLIENT_HOOK_VERSIONS
+    v = _sdk_version()
+    if not (v and lo <= v < hi):
+        print(f"[LLM] google-generativeai {getattr(genai, '__version__', '?')} not in the tested range; "
+              f"per-key clients disabled, all calls use the first key.")
+        return False
+    return True
+
+
+_CLIENT_HOOK = _client_hook_ok()
+
+
+def _bind_client(model: Any, client: Any) -> Any:
+    """The one place that touches the SDK's private GenerativeModel._client."""
+    if client is not None and _CLIENT_HOOK and hasattr(model, "_client"):
+        # GenerativeModel only builds the default (global-key) client when _client is unset
+        model._client = client
+    return model
+
+
+def _is_rate_limited(e: Exception) -> bool:
+    if ResourceExhausted is not None and isinstance(e, ResourceExhausted):
+        return True
+    return "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
 
 
 # Use model names your account actually supports (from your ListModels).
@@ -31,10 +99,16 @@ FALLBACK_MODELS: List[str] = [
 
 
 def _parse_vote(text: str) -> Tuple[str, float]:
+    vote, conf, _ = _parse_vote_path(text)
+    return vote, conf
+
+
+def _parse_vote_path(text: str) -> Tuple[str, float, str]:
     """
     Prefer strict JSON like:
       {"vote":"BUY|SELL|HOLD","confidence":0.73,"rationale":"..."}
     Fallback to: "VOTE: BUY ... CONFIDENCE: 0.73"
+    Also returns which path matched: json | regex | last_ditch | default.
     """
     text = (text or "").strip()
 
@@ -46,7 +120,7 @@ def _parse_vote(text: str) -> Tuple[str, float]:
             vote = str(obj.get("vote") or obj.get("decision") or obj.get("VOTE") or "").upper()
             conf = float(obj.get("confidence") or obj.get("CONFIDENCE") or 0.0)
             if vote in {"BUY", "SELL", "HOLD"} and 0.0 <= conf <= 1.0:
-                return vote, conf
+                return vote, conf, "json"
         except Exception:
             pass
 
@@ -56,33 +130,140 @@ def _parse_vote(text: str) -> Tuple[str, float]:
         text, re.IGNORECASE | re.DOTALL
     )
     if m:
-        return m.group(1).upper(), float(m.group(2))
+        return m.group(1).upper(), float(m.group(2)), "regex"
 
     # 3) Last-ditch: infer a vote word, neutral confidence
     m2 = re.search(r"\b(BUY|SELL|HOLD)\b", text, re.IGNORECASE)
     if m2:
-        return m2.group(1).upper(), 0.5
+        return m2.group(1).upper(), 0.5, "last_ditch"
+
+    return "HOLD", 0.5, "default"
+
+
+# Streaming is on by default; GEMINI_STREAM=0 goes back to waiting for the full response.
+STREAM_DEFAULT = os.getenv("GEMINI_STREAM", "1").strip().lower() in ("1", "true", "yes", "on")
 
-    return "HOLD", 0.5
+# A field only counts as "complete" once a delimiter follows it, so a half-streamed
+# "0.7" is never mistaken for the final "0.75".
+_EARLY_VOTE_RE = re.compile(r'"(?:vote|decision)"\s*:\s*"(BUY|SELL|HOLD)"', re.IGNORECASE)
+_EARLY_CONF_RE = re.compile(r'"confidence"\s*:\s*"?(\d+(?:\.\d+)?|\.\d+)"?\s*[,}\s]', re.IGNORECASE)
+_EARLY_TEXT_RE = re.compile(
+    r"VOTE\s*:\s*(BUY|SELL|HOLD)\b.*?CONFIDENCE\s*:\s*([01](?:\.\d+)?)[,;\s]",
+    re.IGNORECASE | re.DOTALL,
+)
 
 
-def _gen_content(model_name: str, system_msg: str, user_text: str) -> str:
+def _early_vote(buf: str) -> Optional[Tuple[str, float]]:
+    """
+    Incremental check on a partially streamed response.
+    Returns (vote, confidence) once both fields are fully present, else None.
+    """
+    mv = _EARLY_VOTE_RE.search(buf)
+    mc = _EARLY_CONF_RE.search(buf)
+    if mv and mc:
+        try:
+            conf = float(mc.group(1))
+        except ValueError:
+            conf = -1.0
+        if 0.0 <= conf <= 1.0:
+            return mv.group(1).upper(), conf
+
+    # plain "VOTE: X, CONFIDENCE: y" format (SuggestionsAgent)
+    mt = _EARLY_TEXT_RE.search(buf)
+    if mt:
+        return mt.group(1).upper(), float(mt.group(2))
+    return None
+
+
+def _usage(resp: Any) -> Dict[str, int]:
+    """Token counts from usage_metadata (empty dict if the SDK/response has none)."""
+    um = getattr(resp, "usage_metadata", None)
+    if not um:
+        return {}
+    out: Dict[str, int] = {}
+    p = getattr(um, "prompt_token_count", None)
+    c = getattr(um, "candidates_token_count", None)
+    if p:
+        out["prompt_tokens"] = int(p)
+    if c:
+        out["response_tokens"] = int(c)
+    return out
+
+
+def _model(model_name: str, system_msg: str, client: Any = None) -> Any:
+    return _bind_client(genai.GenerativeModel(model_name, system_instruction=system_msg), client)
+
+
+def _gen_content(model_name: str, system_msg: str, user_text: str, client: Any = None) -> Tuple[str, Dict[str, int]]:
     """
     Gemini 2.x: put the prompt in system_instruction at model construction,
     then pass a single user string to generate_content().
+    Returns (text, usage).
     """
-    model = genai.GenerativeModel(model_name, system_instruction=system_msg)
+    model = _model(model_name, system_msg, client)
     resp = model.generate_content(user_text)
+    usage = _usage(resp)
 
     # Standard path
     if getattr(resp, "text", None):
-        return resp.text
+        return resp.text, usage
 
     # Older SDK fallbacks
     try:
-        return resp.candidates[0].content.parts[0].text
+        return resp.candidates[0].content.parts[0].text, usage
+    except Exception:
+        return "", usage
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.text or ""
     except Exception:
-        return ""
+        # chunks without text parts (e.g. the final finish_reason chunk) raise on .text
+        try:
+            return "".join(p.text for p in chunk.candidates[0].content.parts)
+        except Exception:
+            return ""
+
+
+def _close_stream(resp: Any) -> None:
+    """Cancel a generate_content(stream=True) response that is abandoned mid-stream (best effort)."""
+    # the SDK keeps the gRPC call (cancel()) as its private _iterator; close() covers plain generators
+    for it in (getattr(resp, "_iterator", None), resp):
+        for meth in ("cancel", "close"):
+            fn = getattr(it, meth, None)
+            if callable(fn):
+                try:
+                    fn()
+                    return
+                except Exception:
+                    pass
+
+
+def _gen_content_stream(
+    model_name: str, system_msg: str, user_text: str, client: Any = None
+) -> Tuple[str, Optional[Tuple[str, float]], Dict[str, int]]:
+    """
+    Streaming variant of _gen_content. Consumes generate_content(stream=True)
+    chunks and stops reading as soon as vote + confidence are complete, so the
+    rationale is kept only if it had already arrived.
+    Returns (text_so_far, (vote, confidence) | None, usage).
+    """
+    model = _model(model_name, system_msg, client)
+    resp = model.generate_content(user_text, stream=True)
+
+    buf = ""
+    usage: Dict[str, int] = {}
+    for chunk in resp:
+        buf += _chunk_text(chunk)
+        # every chunk carries the prompt count; the response count grows as we go
+        usage = _usage(chunk) or usage
+        early = _early_vote(buf)
+        if early:
+            # stop the server stream now rather than whenever the response is collected
+            _close_stream(resp)
+            return buf, early, usage
+    return buf, None, usage
 
 
 class LCTraderLLM:
@@ -91,8 +272,12 @@ class LCTraderLLM:
       -> (decision: 'BUY'|'SELL'|'HOLD', confidence: float [0..1], raw_text: str)
     """
 
-    def __init__(self, model: str | None = None, api_key: Optional[str] = None, **_: Any):
+    def __init__(self, model: str | None = None, api_key: Optional[str] = None,
+                 stream: Optional[bool] = None, **_: Any):
         _configure_genai(api_key)
+        self.pool = get_key_pool(api_key)
+        self.stream = STREAM_DEFAULT if stream is None else bool(stream)
+        self._tls = threading.local()
         # call order with fallbacks
         self.model_chain: List[str] = []
         if model:
@@ -101,6 +286,11 @@ class LCTraderLLM:
             if m not in self.model_chain:
                 self.model_chain.append(m)
 
+    @property
+    def last_usage(self) -> Dict[str, int]:
+        """Token usage of the most recent vote_structured() call on this thread."""
+        return getattr(self._tls, "usage", {})
+
     def vote_structured(
         self,
         system_msg: str,
@@ -109,17 +299,63 @@ class LCTraderLLM:
     ) -> Tuple[str, float, str]:
         user_text = user_template.format(**variables)
         errors: List[str] = []
+        self._tls.usage = {}
+
+        est = estimate_tokens(system_msg) + estimate_tokens(user_text) + RESPONSE_TOKEN_BUDGET
+        t0 = time.perf_counter()
+        hops = 0  # failed attempts (429 retries + model fallbacks) before the answer
+
+        def _record(model: Optional[str], path: str, usage: Dict[str, int], queue_ms: float) -> None:
+            TELEMETRY.record({
+                "model": model,
+                "latency_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+                "queue_ms": round(queue_ms, 1),
+                "prompt_tokens": usage.get("prompt_tokens") or (est - RESPONSE_TOKEN_BUDGET),
+                "response_tokens": usage.get("response_tokens", 0),
+                "fallback_hops": hops,
+                "parse_path": path,
+            })
 
+        queue_ms = 0.0
         for m in self.model_chain:
-            try:
-                raw = _gen_content(m, system_msg, user_text)
-                vote, conf = _parse_vote(raw)
-                # normalize & clamp
-                vote = vote if vote in {"BUY", "SELL", "HOLD"} else "HOLD"
-                conf = max(0.0, min(1.0, float(conf)))
-                return vote, conf, f"[model={m}] {raw}"
-            except Exception as e:
-                errors.append(f"{m}: {e}")
+            # a 429 moves the call to another key before falling back to the next model
+            for _ in range(len(self.pool)):
+                tq = time.perf_counter()
+                try:
+                    slot = self.pool.acquire(est)
+                except QuotaTimeout as e:
+                    # the budget is shared by every model in the chain; queueing again won't help
+                    errors.append(f"{m}: {e}")
+                    _record(None, "unavailable", {}, queue_ms + (time.perf_counter() - tq) * 1000.0)
+                    return "HOLD", 0.5, "LLM unavailable: " + " | ".join(errors)
+                queue_ms += (time.perf_counter() - tq) * 1000.0
+                try:
+                    client = _client_for(self.pool, slot)
+                    if self.stream:
+                        raw, early, usage = _gen_content_stream(m, system_msg, user_text, client)
+                        if early:
+                            (vote, conf), path = early, "stream_early"
+                        else:
+                            vote, conf, path = _parse_vote_path(raw)
+                    else:
+                        raw, usage = _gen_content(m, system_msg, user_text, client)
+                        vote, conf, path = _parse_vote_path(raw)
+                    self.pool.settle(slot, est, sum(usage.values()) or None)
+                    self._tls.usage = usage
+                    _record(m, path, usage, queue_ms)
+                    # normalize & clamp
+                    vote = vote if vote in {"BUY", "SELL", "HOLD"} else "HOLD"
+                    conf = max(0.0, min(1.0, float(conf)))
+                    return vote, conf, f"[model={m}] {raw}"
+                except Exception as e:
+                    errors.append(f"{m}: {e}")
+                    hops += 1
+                    if _is_rate_limited(e):
+                        self.pool.penalize(slot)
+                        continue
+                    self.pool.settle(slot, est, None)
+                    break
 
         # total failure → safe default
+        _record(None, "unavailable", {}, queue_ms)
         return "HOLD", 0.5, "LLM unavailable: " + " | ".join(errors or ["unknown"])
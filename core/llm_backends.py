@@ -0,0 +1,272 @@
+# core/llm_backends.py
+from __future__ import annotations
+import hashlib, json, os, random, re, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import settings
+from core.prompt_format import estimate_tokens
+from core.telemetry import TELEMETRY
+
+# Offline LLM backends that satisfy agents.base_agent.LLMProtocol with zero network:
+#   RULES  - rule-based voter reading the indicator table out of the prompt
+#   RECORD - wraps Gemini and writes every answer to a cassette (JSONL)
+#   REPLAY - answers from a cassette; misses go to the rules voter (or HOLD)
+#   STUB   - deterministic pseudo-random votes after a configurable delay
+# Pick one with LLM_BACKEND; get_llm() is what the runner and UI call.
+
+CASSETTE_PATH = os.getenv("LLM_CASSETTE", os.path.join("state", "llm_cassette.jsonl"))
+
+
+# "[model=...] " tag every backend puts in front of its raw answer
+_MODEL_TAG = re.compile(r"\[model=[^\]]*\]\s*")
+
+
+def _strip_model_tag(raw: str) -> str:
+    return _MODEL_TAG.sub("", raw or "", count=1) if (raw or "").startswith("[model=") else (raw or "")
+
+
+def _prompt_key(system_msg: str, user_text: str) -> str:
+    # model tags echoed into a prompt (earlier raw answers) differ between record and replay
+    return hashlib.sha1((_MODEL_TAG.sub("", system_msg) + "\x00" + _MODEL_TAG.sub("", user_text)).encode("utf-8")).hexdigest()
+
+
+class _OfflineBase:
+    """Shared bookkeeping: prompt rendering, usage estimate and telemetry."""
+
+    model_label = "offline"
+
+    def __init__(self) -> None:
+        self._tls = threading.local()
+
+    @property
+    def last_usage(self) -> Dict[str, int]:
+        return getattr(self._tls, "usage", {})
+
+    def _answer(self, system_msg: str, user_text: str) -> Tuple[str, float, str, str]:
+        """Return (vote, confidence, raw_text, parse_path)."""
+        raise NotImplementedError
+
+    def vote_structured(
+        self,
+        system_msg: str,
+        user_template: str,
+        variables: Dict[str, Any],
+    ) -> Tuple[str, float, str]:
+        user_text = user_template.format(**variables)
+        t0 = time.perf_counter()
+        vote, conf, raw, path = self._answer(system_msg, user_text)
+        vote = vote if vote in {"BUY", "SELL", "HOLD"} else "HOLD"
+        conf = max(0.0, min(1.0, float(conf)))
+        usage = {
+            "prompt_tokens": estimate_tokens(system_msg) + estimate_tokens(user_text),
+            "response_tokens": estimate_tokens(raw),
+        }
+        self._tls.usage = usage
+        TELEMETRY.record({
+            "model": self.model_label,
+            "latency_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+            "queue_ms": 0.0,
+            "fallback_hops": 0,
+            "parse_path": path,
+            **usage,
+        })
+        return vote, conf, f"[model={self.model_label}] {raw}"
+
+
+# ---------------------------------------------------------------- rules
+
+def _parse_prompt_table(text: str) -> List[Dict[str, float]]:
+    """
+    Rows of the compact CSV table (core.prompt_format.compact_table) embedded
+    in a prompt: the first line that names both close and rsi is the header.
+    """
+    lines = text.splitlines()
+    for i, line in enumerate(lines):
+        cols = [c.strip() for c in line.split(",")]
+        if "close" in cols and "rsi" in cols:
+            rows: List[Dict[str, float]] = []
+            for row in lines[i + 1:]:
+                cells = row.split(",")
+                if len(cells) != len(cols):
+                    break
+                try:
+                    rows.append({c: float(v) for c, v in zip(cols, cells)})
+                except ValueError:
+                    break
+            return rows
+    return []
+
+
+def _metric(text: str, name: str) -> Optional[float]:
+    m = re.search(rf"{re.escape(name)}\s*:\s*(-?[\d.]+)", text)
+    try:
+        return float(m.group(1)) if m else None
+    except ValueError:
+        return None
+
+
+def rule_vote(user_text: str) -> Tuple[str, float, str]:
+    """
+    Deterministic stand-in for an LLM vote, driven by the same numbers the
+    agents send: RSI extremes, MACD side/cross, band breaks and MA5/MA20.
+    Suggestion prompts (no table) are scored on bullish vs bearish percent.
+    """
+    rows = _parse_prompt_table(user_text)
+    score = 0.0
+    why: List[str] = []
+    if rows:
+        last = rows[-1]
+        rsi = last.get("rsi")
+        if rsi is not None:
+            if rsi < 35: score += 1.0; why.append("RSI oversold")
+            elif rsi > 65: score -= 1.0; why.append("RSI overbought")
+        if "macd" in last and "macd_signal" in last:
+            diff = last["macd"] - last["macd_signal"]
+            score += 0.5 if diff >= 0 else -0.5
+            if len(rows) >= 2:
+                prev = rows[-2]["macd"] - rows[-2]["macd_signal"]
+                if prev <= 0 < diff: score += 1.0; why.append("MACD bull cross")
+                elif prev >= 0 > diff: score -= 1.0; why.append("MACD bear cross")
+        if "upper_band" in last and last["close"] > last["upper_band"]:
+            score -= 0.5; why.append("above upper band")
+        if "lower_band" in last and last["close"] < last["lower_band"]:
+            score += 0.5; why.append("below lower band")
+        if "ma5" in last and "ma20" in last:
+            score += 0.5 if last["ma5"] >= last["ma20"] else -0.5
+    else:
+        bull = _metric(user_text, "bullishPercent")
+        bear = _metric(user_text, "bearishPercent")
+        if bull is not None and bear is not None:
+            score = (bull - bear) * 5.0
+            why.append(f"bull {bull:.2f} vs bear {bear:.2f}")
+
+    if score >= 1.0: vote = "BUY"
+    elif score <= -1.0: vote = "SELL"
+    else: vote = "HOLD"
+    conf = round(min(0.95, 0.5 + 0.15 * abs(score)), 2)
+    return vote, conf, "; ".join(why) or "no strong signal"
+
+
+class RuleBasedLLM(_OfflineBase):
+    model_label = "offline-rules"
+
+    def _answer(self, system_msg: str, user_text: str) -> Tuple[str, float, str, str]:
+        vote, conf, why = rule_vote(user_text)
+        raw = json.dumps({"vote": vote, "confidence": conf, "rationale": why})
+        return vote, conf, raw, "rules"
+
+
+# ---------------------------------------------------------------- stub
+
+class StubLLM(_OfflineBase):
+    """
+    Fixed-latency stand-in for load tests: sleeps latency_ms +/- jitter_ms,
+    then returns a vote derived from the prompt hash (same prompt, same vote).
+    """
+
+    model_label = "offline-stub"
+
+    def __init__(self, latency_ms: float | None = None, jitter_ms: float | None = None):
+        super().__init__()
+        self.latency_ms = settings.llm_stub_latency_ms if latency_ms is None else float(latency_ms)
+        self.jitter_ms = settings.llm_stub_jitter_ms if jitter_ms is None else float(jitter_ms)
+
+    def _answer(self, system_msg: str, user_text: str) -> Tuple[str, float, str, str]:
+        rng = random.Random(_prompt_key(system_msg, user_text))
+        delay = self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000.0)
+        vote = rng.choice(["BUY", "SELL", "HOLD", "HOLD"])
+        conf = round(rng.uniform(0.4, 0.9), 2)
+        raw = json.dumps({"vote": vote, "confidence": conf, "rationale": "stub"})
+        return vote, conf, raw, "stub"
+
+
+# ---------------------------------------------------------------- cassette
+
+class CassetteLLM(_OfflineBase):
+    """
+    Record/replay keyed by sha1(system_msg + user_text).
+    - record mode: delegates to `inner` (normally LCTraderLLM) and appends the answer.
+    - replay mode: serves recorded answers; misses fall back to the rules voter
+      (LLM_CASSETTE_MISS=rules, default) or a neutral HOLD (=hold).
+    """
+
+    model_label = "offline-cassette"
+
+    def __init__(self, path: str = CASSETTE_PATH, inner: Any = None, record: bool = False):
+        super().__init__()
+        self.path = path
+        self.inner = inner
+        self.record = bool(record)
+        self.miss_mode = os.getenv("LLM_CASSETTE_MISS", "rules").strip().lower()
+        self._lock = threading.Lock()
+        self._tape: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ent = json.loads(line)
+                        self._tape[ent["key"]] = ent
+                    except Exception:
+                        continue
+        if self.record and self.inner is None:
+            raise RuntimeError("CassetteLLM(record=True) needs an inner LLM to record from.")
+
+    @property
+    def last_usage(self) -> Dict[str, int]:
+        if self.record and self.inner is not None:
+            return getattr(self.inner, "last_usage", {})
+        return super().last_usage
+
+    def vote_structured(self, system_msg: str, user_template: str, variables: Dict[str, Any]) -> Tuple[str, float, str]:
+        if not self.record:
+            return super().vote_structured(system_msg, user_template, variables)
+        # record: the inner LLM does the real call (and its own telemetry)
+        user_text = user_template.format(**variables)
+        vote, conf, raw = self.inner.vote_structured(system_msg, user_template, variables)
+        ent = {"key": _prompt_key(system_msg, user_text), "vote": vote, "confidence": float(conf), "raw": raw}
+        with self._lock:
+            self._tape[ent["key"]] = ent
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(ent) + "\n")
+        return vote, conf, raw
+
+    def _answer(self, system_msg: str, user_text: str) -> Tuple[str, float, str, str]:
+        ent = self._tape.get(_prompt_key(system_msg, user_text))
+        if ent:
+            self.hits += 1
+            # recorded raw carries the live model's tag; vote_structured adds the cassette's own
+            return ent["vote"], float(ent["confidence"]), _strip_model_tag(ent.get("raw", "")), "replay"
+        self.misses += 1
+        if self.miss_mode == "rules":
+            vote, conf, why = rule_vote(user_text)
+            return vote, conf, json.dumps({"vote": vote, "confidence": conf, "rationale": f"cassette miss; {why}"}), "replay_miss"
+        return "HOLD", 0.5, "(cassette miss)", "replay_miss"
+
+
+# ---------------------------------------------------------------- factory
+
+BACKENDS = ("GEMINI", "RULES", "RECORD", "REPLAY", "STUB")
+
+
+def get_llm(api_key: Optional[str] = None, backend: Optional[str] = None) -> Any:
+    """LLM for the configured backend (LLM_BACKEND=GEMINI|RULES|RECORD|REPLAY|STUB)."""
+    backend = (backend or settings.llm_backend).strip().upper()
+    if backend not in BACKENDS:
+        # never fall through to live calls on a typo
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend == "RULES":
+        return RuleBasedLLM()
+    if backend == "STUB":
+        return StubLLM()
+    if backend == "REPLAY":
+        return CassetteLLM()
+    # Gemini import stays lazy so offline runs need neither the SDK nor a key
+    from core.llm import LCTraderLLM
+    llm = LCTraderLLM(api_key=api_key)
+    if backend == "RECORD":
+        return CassetteLLM(inner=llm, record=True)
+    return llm
@@ -0,0 +1,153 @@
+# core/news_ingest.py
+from __future__ import annotations
+import json, os, re, threading, time
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from core.semantic_memory import SemanticMemory, content_hash
+
+STATE_DIR = "state"
+INGEST_STATE = os.path.join(STATE_DIR, "news_ingest.json")
+
+
+def _text(it: Dict[str, Any]) -> str:
+    headline = " ".join(str(it.get("headline") or "").split())
+    summary = " ".join(str(it.get("summary") or "").split())
+    return (headline + (": " if headline and summary else "") + summary).strip()
+
+
+def _crypto_tags(it: Dict[str, Any], crypto: List[str]) -> List[str]:
+    """Watchlist pairs whose base asset (BTC in BTC/USD) is named in the item."""
+    words = set(re.findall(r"[A-Z0-9]+", f"{it.get('headline') or ''} {it.get('related') or ''}".upper()))
+    return [c for c in crypto if c.split("/")[0] in words]
+
+
+class NewsIngestor:
+    """
+    Scheduled news -> SemanticMemory pipeline, so agent votes only ever read
+    the memory and never wait on Finnhub or the encoder:
+
+      collect(): company news per watchlist stock (since that symbol's last
+                 ingest, first run NEWS_LOOKBACK_DAYS), general news and, when
+                 crypto is enabled, crypto news tagged to watchlist pairs
+      run():     normalize + dedupe (content hash, same key SemanticMemory uses),
+                 then add() in NEWS_ENCODE_BATCH-sized batches with
+                 {symbol, source, ts, url} metadata
+
+    Per-symbol progress lives in state/news_ingest.json.
+    """
+
+    def __init__(self, fh: Any, sm: Optional[SemanticMemory] = None, state_path: str = INGEST_STATE):
+        self.fh = fh
+        self.sm = sm if sm is not None else SemanticMemory()
+        self.state_path = state_path
+        self._state: Dict[str, float] = {}
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f) or {}
+            except Exception:
+                self._state = {}
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(tmp, self.state_path)
+
+    def _days_for(self, key: str, now: float) -> int:
+        last = self._state.get(key)
+        if not last:
+            return settings.news_lookback_days
+        # finnhub filters by calendar date; +1 covers the day boundary
+        return max(1, min(settings.news_lookback_days, int((now - float(last)) // 86400) + 1))
+
+    def collect(self, stocks: List[str], crypto: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Raw items as {text, meta}; one failing source never stops the others."""
+        now = time.time()
+        out: List[Dict[str, Any]] = []
+
+        def _push(it: Dict[str, Any], symbols: List[str]) -> None:
+            text = _text(it)
+            if text:
+                out.append({"text": text, "meta": {
+                    "symbols": symbols, "source": str(it.get("source") or ""),
+                    "ts": float(it.get("datetime") or now), "url": it.get("url") or "",
+                }})
+
+        for sym in stocks:
+            try:
+                for it in self.fh.company_news_struct(sym, days=self._days_for(sym, now), max_items=100):
+                    _push(it, [sym])
+                self._state[sym] = now
+            except Exception as e:
+                print(f"[NewsIngest] company news failed for {sym}: {e}")
+
+        try:
+            for it in self.fh.general_news_struct(max_items=100):
+                related = {r.strip() for r in str(it.get("related") or "").upper().split(",")}
+                _push(it, [s for s in stocks if s in related])
+        except Exception as e:
+            print(f"[NewsIngest] general news failed: {e}")
+
+        if crypto:
+            try:
+                for it in self.fh.crypto_news_struct(max_items=100):
+                    _push(it, _crypto_tags(it, crypto))
+            except Exception as e:
+                print(f"[NewsIngest] crypto news failed: {e}")
+        return out
+
+    def run(self, stocks: List[str], crypto: Optional[List[str]] = None) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        items = self.collect(stocks, crypto)
+
+        # dedupe before encoding; a story filed under several symbols keeps all its tags
+        uniq: Dict[str, Dict[str, Any]] = {}
+        for it in items:
+            h = content_hash(it["text"])
+            if h in uniq:
+                tags = uniq[h]["meta"]["symbols"]
+                tags.extend(s for s in it["meta"]["symbols"] if s not in tags)
+            else:
+                uniq[h] = it
+        rows = list(uniq.values())
+
+        added = 0
+        step = max(1, settings.news_encode_batch)
+        for i in range(0, len(rows), step):
+            chunk = rows[i:i + step]
+            added += self.sm.add([r["text"] for r in chunk], [r["meta"] for r in chunk], batch_size=step)
+        self._save_state()
+
+        stats = {"fetched": len(items), "unique": len(rows), "added": added,
+                 "ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+        print(f"[NewsIngest] {stats}")
+        return stats
+
+
+_INGESTOR: Optional[NewsIngestor] = None
+_INGESTOR_LOCK = threading.Lock()
+
+
+def get_ingestor(sm: Optional[SemanticMemory] = None) -> NewsIngestor:
+    """
+    Process-wide ingestor, so its SemanticMemory (and the row indexes it has
+    already folded in) lives across runs: each run then reads only the items
+    appended since the last one. `sm` is only used on first construction.
+    """
+    global _INGESTOR
+    with _INGESTOR_LOCK:
+        if _INGESTOR is None:
+            from core.finnhub_client import FinnhubClient
+            _INGESTOR = NewsIngestor(FinnhubClient(api_key=settings.finnhub_key), sm)
+        return _INGESTOR
+
+
+def run_ingest(stocks: List[str], crypto: Optional[List[str]] = None,
+               sm: Optional[SemanticMemory] = None) -> Dict[str, Any]:
+    """Scheduler entry point: one pass over the watchlist (no-op without FINNHUB_KEY)."""
+    if not settings.finnhub_key:
+        return {"skipped": "no FINNHUB_KEY"}
+    return get_ingestor(sm).run(stocks, crypto)
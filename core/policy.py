@@ -1,7 +1,7 @@
 # core/policy.py
 from __future__ import annotations
-from datetime import datetime, timezone
-from typing import List
+import time
+from typing import Optional
 from config import settings
 
 # ----- $ caps -----
@@ -35,34 +35,12 @@ def clamp_qty_by_share_caps(desired_qty: float, current_qty: float) -> float:
     remaining = max(0.0, float(settings.MAX_SHARES_PER_SYMBOL) - float(current_qty or 0.0))
     return max(0.0, min(desired_qty, remaining))
 
-def too_soon_since_last_buy(symbol: str, runs_for_symbol: List[dict]) -> bool:
-    """Cooldown to avoid back-to-back buys."""
-    now = datetime.now(timezone.utc)
-    for r in runs_for_symbol:
-        if r.get("action") != "BUY":
-            continue
-        try:
-            last = datetime.fromisoformat(r["when"].replace("Z","+00:00"))
-        except Exception:
-            continue
-        if (now - last).total_seconds() / 60.0 < float(settings.REBUY_COOLDOWN_MINUTES):
-            return True
-        break
-    return False
+def too_soon_since_last_buy(symbol: str, last_buy_at: Optional[float]) -> bool:
+    """Cooldown to avoid back-to-back buys (last_buy_at: epoch of the latest BUY, see core/run_index.py)."""
+    if last_buy_at is None:
+        return False
+    return (time.time() - float(last_buy_at)) / 60.0 < float(settings.REBUY_COOLDOWN_MINUTES)
 
-def hit_daily_buy_limit(symbol: str, runs_for_symbol: List[dict]) -> bool:
+def hit_daily_buy_limit(symbol: str, buys_today: int) -> bool:
     """No more than N buy executions per symbol per UTC day."""
-    today = datetime.now(timezone.utc).date()
-    buys = 0
-    for r in runs_for_symbol:
-        if r.get("action") != "BUY":
-            continue
-        try:
-            day = datetime.fromisoformat(r["when"].replace("Z","+00:00")).date()
-        except Exception:
-            continue
-        if day == today:
-            buys += 1
-            if buys >= int(settings.DAILY_BUY_LIMIT_PER_SYMBOL):
-                return True
-    return False
+    return int(buys_today) >= int(settings.DAILY_BUY_LIMIT_PER_SYMBOL)
@@ -0,0 +1,67 @@
+# core/portfolio.py
+from __future__ import annotations
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from core.positions import read_ledger, merge_entry
+
+
+class PortfolioSnapshot:
+    """
+    Account + ledger + last prices for one cycle, fetched once up front
+    (one account_balances(), one batched last_prices(), one ledger read)
+    and shared by every symbol of the cycle, so broker traffic does not grow
+    with the watchlist.
+
+    The order phase updates it in place (apply_buy / apply_sell) so later
+    symbols in the same cycle size against the cash that is actually left.
+    Mutations happen under the engine's order lock; the snapshot itself does
+    no locking.
+    """
+
+    def __init__(self, acct: Dict[str, float], ledger: Dict[str, Any], prices: Dict[str, Optional[float]]):
+        self.acct = dict(acct)
+        self.ledger = ledger
+        self.prices = {k.upper(): v for k, v in prices.items()}
+        self.fetched_at = time.time()
+
+    @classmethod
+    def fetch(cls, broker: Any, symbols: Iterable[str]) -> "PortfolioSnapshot":
+        ledger = read_ledger()
+        syms = list(dict.fromkeys([s.upper() for s in symbols] + list(ledger)))
+        prices = broker.last_prices(syms) if syms else {}
+        # the paper broker values its positions; let it reuse these quotes instead of pricing them again
+        at = getattr(broker, "account_balances_at", None)
+        acct = at(prices, ledger) if at is not None else broker.account_balances()
+        return cls(acct, ledger, prices)
+
+    # --------------------------- reads ---------------------------
+
+    @property
+    def cash(self) -> float:
+        return float(self.acct.get("cash", 0.0))
+
+    @property
+    def equity(self) -> float:
+        return float(self.acct.get("equity", 0.0))
+
+    def price(self, symbol: str) -> float:
+        return float(self.prices.get(symbol.upper()) or 0.0)
+
+    def held_qty(self, symbol: str) -> float:
+        return float((self.ledger.get(symbol.upper(), {}) or {}).get("qty", 0.0))
+
+    def symbol_mv(self, symbol: str) -> float:
+        return self.held_qty(symbol) * self.price(symbol)
+
+    # --------------------------- in-cycle updates ---------------------------
+
+    def apply_buy(self, symbol: str, horizon: Optional[str], qty: float, px: float) -> None:
+        merge_entry(self.ledger, symbol, horizon, qty, px, qty * px, reset_timebox=False)
+        self.acct["cash"] = self.cash - qty * px
+        self.prices[symbol.upper()] = px
+
+    def apply_sell(self, symbol: str) -> None:
+        """Full close at the snapshot price (the engine only ever closes whole positions)."""
+        row = self.ledger.pop(symbol.upper(), None) or {}
+        self.acct["cash"] = self.cash + float(row.get("qty", 0.0)) * self.price(symbol)
@@ -1,9 +1,11 @@
 # core/positions.py
 from __future__ import annotations
-import json, os
+import os
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta, timezone
 
+from core.ledger_db import get_ledger_db
+
 STATE_DIR   = "state"
 LEDGER_PATH = os.path.join(STATE_DIR, "positions.json")
 
@@ -11,32 +13,29 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00","Z")
 
 def read_ledger() -> Dict[str, Any]:
-    os.makedirs(STATE_DIR, exist_ok=True)
-    if not os.path.exists(LEDGER_PATH):
-        return {}
-    try:
-        with open(LEDGER_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return get_ledger_db().all()
 
 def write_ledger(data: Dict[str, Any]) -> None:
-    os.makedirs(STATE_DIR, exist_ok=True)
-    with open(LEDGER_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    """Replace the whole ledger (one transaction). Prefer upsert_position / remove_position."""
+    get_ledger_db().replace_all(data)
 
 def get_position(symbol: str) -> Optional[Dict[str, Any]]:
-    return read_ledger().get(symbol.upper())
+    return get_ledger_db().get(symbol)
 
 def upsert_position(symbol: str, info: Dict[str, Any]) -> None:
-    data = read_ledger()
-    data[symbol.upper()] = info
-    write_ledger(data)
+    get_ledger_db().upsert(symbol, info)
 
 def remove_position(symbol: str) -> None:
-    data = read_ledger()
-    data.pop(symbol.upper(), None)
-    write_ledger(data)
+    get_ledger_db().remove(symbol)
+
+def book_buy(symbol: str, qty: float, px: float, horizon: Optional[str], timebox_until: Optional[str],
+             merge: bool = True) -> Optional[Dict[str, Any]]:
+    """Merge a BUY fill and start its timebox on first entry, atomically; returns the stored row."""
+    return get_ledger_db().book_buy(symbol, qty, px, horizon, timebox_until, merge=merge)
+
+def export_ledger_json(path: str = LEDGER_PATH) -> None:
+    """positions.json snapshot of the SQLite ledger, for tools that still read the file."""
+    get_ledger_db().export_json(path)
 
 # ---- timeboxing ----
 HORIZON_TIMEBOX = {
@@ -45,12 +44,15 @@ HORIZON_TIMEBOX = {
     "long":  timedelta(days=60),  # ~3 months
 }
 
+def timebox_for(horizon: str) -> str:
+    """ISO UTC expiry for a position entered now with this horizon."""
+    dur = HORIZON_TIMEBOX.get(horizon, timedelta(days=7))
+    return (datetime.now(timezone.utc) + dur).replace(microsecond=0).isoformat().replace("+00:00","Z")
+
 def set_timebox_on_entry(symbol: str, horizon: str, qty: float, entry_price: float, notional: float):
     """Create a new ledger row with timebox for first entry of a symbol."""
-    ledger = read_ledger()
-    dur = HORIZON_TIMEBOX.get(horizon, timedelta(days=7))
-    timebox_until = (datetime.now(timezone.utc) + dur).replace(microsecond=0).isoformat().replace("+00:00","Z")
-    ledger[symbol.upper()] = {
+    timebox_until = timebox_for(horizon)
+    upsert_position(symbol, {
         "symbol": symbol.upper(),
         "horizon": horizon,
         "qty": float(qty),
@@ -58,8 +60,7 @@ def set_timebox_on_entry(symbol: str, horizon: str, qty: float, entry_price: flo
         "notional": float(notional),
         "entered_at": _now_iso(),
         "timebox_until": timebox_until,
-    }
-    write_ledger(ledger)
+    })
     return timebox_until
 
 def merge_entry(ledger: dict, symbol: str, horizon: str, add_qty: float, add_price: float, add_notional: float, reset_timebox: bool=False):
@@ -0,0 +1,56 @@
+# core/prompt_format.py
+from __future__ import annotations
+import math
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# 5 significant figures keeps NSE prices to the paisa up to ~999.99 and to the
+# rupee above that, which is more than the agents can make use of.
+DEFAULT_SIG = 5
+
+
+def fmt_num(v, sig: int = DEFAULT_SIG) -> str:
+    """Fixed significant-figure rendering; no padding, no trailing zeros."""
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return str(v)
+    if math.isnan(f):
+        return "nan"
+    if f == 0.0:
+        return "0"
+    if abs(f) >= 10 ** sig:
+        # large prices (crypto) as plain integers rather than 1.2346e+05
+        return f"{f:.0f}"
+    return f"{f:.{sig}g}"
+
+
+def compact_table(df: pd.DataFrame, cols: Optional[List[str]] = None, sig: int = DEFAULT_SIG) -> str:
+    """
+    CSV-like rendering for prompts: one shared header line, then one comma-joined
+    row per bar. Replaces DataFrame.to_string(), which pads every cell to the
+    widest value and prints full float64 precision.
+    """
+    if df is None or df.empty:
+        return "(empty)"
+    cols = cols or list(df.columns)
+    lines = [",".join(cols)]
+    for row in df[cols].itertuples(index=False, name=None):
+        lines.append(",".join(fmt_num(v, sig) for v in row))
+    return "\n".join(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~4 chars/token for Gemini on mixed text/numbers).
+    Used only when the API response carries no usage metadata.
+    """
+    return int(math.ceil(len(text or "") / 4.0))
+
+
+def prompt_tokens(system_msg: str, user_text: str, usage: Optional[Dict[str, int]] = None) -> int:
+    """Measured prompt tokens if the LLM reported them, else the estimate."""
+    if usage and usage.get("prompt_tokens"):
+        return int(usage["prompt_tokens"])
+    return estimate_tokens(system_msg) + estimate_tokens(user_text)
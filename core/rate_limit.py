@@ -0,0 +1,64 @@
+# core/rate_limit.py
+from __future__ import annotations
+import threading, time
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` tokens and refills at
+    `rate` tokens/second. Thread-safe; never blocks by itself.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(1e-9, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, n: float) -> "TokenBucket":
+        """Bucket matching an 'n per minute' quota (burst up to n)."""
+        return cls(rate=float(n) / 60.0, capacity=float(n))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def wait_time(self, n: float = 1.0) -> float:
+        """Seconds until `n` tokens would be available (0 if available now)."""
+        with self._lock:
+            self._refill()
+            n = min(float(n), self.capacity)
+            return max(0.0, (n - self._tokens) / self.rate)
+
+    def try_take(self, n: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            n = min(float(n), self.capacity)
+            if self._tokens >= n:
+                self._tokens -= n
+                return True
+            return False
+
+    def take(self, n: float = 1.0) -> None:
+        """Blocking take: sleeps until `n` tokens are available."""
+        while not self.try_take(n):
+            time.sleep(max(0.01, self.wait_time(n)))
+
+    def adjust(self, delta: float) -> None:
+        """Give back (delta > 0) or charge extra (delta < 0) tokens; may go negative."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + float(delta))
+
+    def drain(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
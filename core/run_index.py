@@ -0,0 +1,83 @@
+# core/run_index.py
+from __future__ import annotations
+import threading, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config import settings
+from core.run_log import RunLog
+
+
+def _epoch(ts_iso: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(ts_iso).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def _utc_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+class RecentBuys:
+    """
+    Per-symbol BUY history for the policy throttles, answered in O(1):
+
+      last_buy(symbol)    epoch of the latest BUY, or None
+      buys_today(symbol)  BUYs on the current UTC day
+
+    Built at startup from the run log since the start of the window (today,
+    or the rebuy cooldown if that reaches further back), via the segment
+    index rather than a file scan. note() records this process's BUYs the
+    moment they are logged; refresh() picks up what other processes appended
+    (RunLog.follow, O(new records)). A BUY seen both ways counts once.
+    """
+
+    def __init__(self, log: Optional[RunLog] = None, now: Optional[float] = None):
+        self.log = log or RunLog()
+        self._lock = threading.Lock()
+        self._last: Dict[str, float] = {}
+        self._today: Dict[str, Tuple[str, int]] = {}   # symbol -> (utc day, count)
+        self._seen: Set[Tuple[str, str]] = set()        # (symbol, when) already counted
+        now = time.time() if now is None else now
+        day_start = datetime.fromtimestamp(now, timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = min(day_start.timestamp(), now - float(settings.REBUY_COOLDOWN_MINUTES) * 60.0)
+        self._cursor = self.log.cursor_at(start)
+        self.refresh()
+
+    def note(self, line: Dict[str, Any]) -> None:
+        if line.get("action") != "BUY":
+            return
+        sym = str(line.get("symbol") or "").upper()
+        ts = _epoch(line.get("when"))
+        if not sym or ts is None:
+            return
+        with self._lock:
+            key = (sym, str(line.get("when")))
+            if key in self._seen:
+                return
+            self._seen.add(key)
+            if len(self._seen) > 4096:  # only recent BUYs can show up twice
+                horizon = ts - 2 * 86400
+                self._seen = {k for k in self._seen if (_epoch(k[1]) or 0.0) >= horizon}
+            self._last[sym] = max(ts, self._last.get(sym, ts))
+            day = _utc_day(ts)
+            cur_day, n = self._today.get(sym, (day, 0))
+            if day > cur_day:
+                self._today[sym] = (day, 1)
+            elif day == cur_day:
+                self._today[sym] = (day, n + 1)
+
+    def refresh(self) -> int:
+        """Fold in run-log records appended since the last call; returns how many were read."""
+        recs, self._cursor = self.log.follow(self._cursor)
+        for r in recs:
+            self.note(r)
+        return len(recs)
+
+    def last_buy(self, symbol: str) -> Optional[float]:
+        return self._last.get(symbol.upper())
+
+    def buys_today(self, symbol: str, now: Optional[float] = None) -> int:
+        day, n = self._today.get(symbol.upper(), ("", 0))
+        return n if day == _utc_day(time.time() if now is None else now) else 0
@@ -0,0 +1,258 @@
+# core/run_log.py
+from __future__ import annotations
+import bisect, json, os, struct, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.file_lock import FileLock
+
+STATE_DIR = "state"
+RUN_DIR = os.path.join(STATE_DIR, "runs")
+LEGACY_LOG = os.path.join(STATE_DIR, "auto_runs.jsonl")
+
+# sidecar index record per line: byte offset in the segment, append time (epoch)
+_REC = struct.Struct("<qd")
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _epoch(ts_iso: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(ts_iso).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def _parse(chunk: bytes) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for line in chunk.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            out.append(json.loads(line))
+        except Exception:
+            pass  # a line still being written by another process
+    return out
+
+
+class RunLog:
+    """
+    The automation run log as daily (UTC) segments under state/runs/:
+
+      auto_runs-YYYY-MM-DD.jsonl   the records, one JSON object per line
+      auto_runs-YYYY-MM-DD.idx     16 bytes per line: (offset, append time)
+
+    Readers never scan a whole file:
+      tail(n)                 newest n records (oldest first), reading only
+                              the last n index entries and the bytes they span
+      iter_reverse()          newest -> oldest, segment by segment
+      read_range(start, end)  records appended in [start, end): only the
+                              segments for those days, bisected on the index
+      follow(cursor)          records appended since the cursor, by any process
+
+    Appends take a cross-process file lock (append time in the index is
+    therefore non-decreasing). Segments older than `keep_days` are deleted
+    when a new day's segment is started. A pre-rotation state/auto_runs.jsonl
+    is split into segments once, by each record's "when".
+    """
+
+    def __init__(self, root: str = RUN_DIR, prefix: str = "auto_runs", keep_days: int = 0,
+                 legacy_path: Optional[str] = LEGACY_LOG):
+        self.root = root
+        self.prefix = prefix
+        self.keep_days = int(keep_days)
+        os.makedirs(root, exist_ok=True)
+        self._lock = FileLock(os.path.join(root, f"{prefix}.lock"))
+        if legacy_path and os.path.exists(legacy_path):
+            self._import_legacy(legacy_path)
+
+    # --------------------------- layout ---------------------------
+
+    def _paths(self, day: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, f"{self.prefix}-{day}")
+        return base + ".jsonl", base + ".idx"
+
+    def days(self) -> List[str]:
+        """Segment days present, oldest first."""
+        head, tail = f"{self.prefix}-", ".jsonl"
+        return sorted(f[len(head):-len(tail)] for f in os.listdir(self.root)
+                      if f.startswith(head) and f.endswith(tail))
+
+    def _index(self, day: str) -> List[Tuple[int, float]]:
+        with open(self._paths(day)[1], "rb") as f:
+            data = f.read()
+        return [_REC.unpack_from(data, i) for i in range(0, len(data) - len(data) % _REC.size, _REC.size)]
+
+    # --------------------------- writing ---------------------------
+
+    def append(self, lines: List[str], now: Optional[float] = None) -> None:
+        """Append serialized records (no trailing newline) to today's segment."""
+        if not lines:
+            return
+        with self._lock:
+            # stamped under the lock, never before the day's last entry: index times stay sorted for bisect
+            now = time.time() if now is None else now
+            day = _day(now)
+            seg, idx = self._paths(day)
+            new_day = not os.path.exists(seg)
+            if not new_day:
+                now = max(now, self._last_time(idx))
+            self._write(seg, idx, lines, [now] * len(lines))
+            if new_day and self.keep_days > 0:
+                self._prune(now)
+
+    @staticmethod
+    def _last_time(idx: str) -> float:
+        try:
+            with open(idx, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < _REC.size:
+                    return 0.0
+                f.seek(size - size % _REC.size - _REC.size)
+                return _REC.unpack(f.read(_REC.size))[1]
+        except OSError:
+            return 0.0
+
+    def _write(self, seg: str, idx: str, lines: List[str], times: List[float]) -> None:
+        recs = bytearray()
+        with open(seg, "ab") as f:
+            off = f.seek(0, os.SEEK_END)
+            payload = bytearray()
+            for line, ts in zip(lines, times):
+                b = line.encode("utf-8") + b"\n"
+                recs += _REC.pack(off + len(payload), ts)
+                payload += b
+            f.write(payload)
+        # index after data: a crash in between only hides the tail lines from
+        # the index, and they are still read as part of the previous entry's span
+        with open(idx, "ab") as f:
+            f.write(recs)
+
+    def _prune(self, now: float) -> None:
+        cutoff = _day(now - self.keep_days * 86400)
+        for day in self.days():
+            if day < cutoff:
+                for p in self._paths(day):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+
+    def _import_legacy(self, path: str) -> None:
+        with self._lock:
+            if not os.path.exists(path):
+                return  # another process got here first
+            by_day: Dict[str, Tuple[List[str], List[float]]] = {}
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        ts = _epoch(json.loads(line).get("when")) or os.path.getmtime(path)
+                    except Exception:
+                        continue
+                    lines, times = by_day.setdefault(_day(ts), ([], []))
+                    lines.append(line)
+                    times.append(ts)
+            for day in sorted(by_day):
+                lines, times = by_day[day]
+                order = sorted(range(len(lines)), key=lambda i: times[i])
+                self._write(*self._paths(day), [lines[i] for i in order], [times[i] for i in order])
+            os.replace(path, path + ".migrated")
+            print(f"[RunLog] split {path} into {len(by_day)} daily segment(s)")
+
+    # --------------------------- reading ---------------------------
+
+    def _read_from(self, day: str, offset: int, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        with open(self._paths(day)[0], "rb") as f:
+            f.seek(offset)
+            return _parse(f.read() if end is None else f.read(end - offset))
+
+    def tail(self, n: int = 300) -> List[Dict[str, Any]]:
+        """The newest n records, oldest first (the order they were appended)."""
+        out: List[Dict[str, Any]] = []
+        for day in reversed(self.days()):
+            need = n - len(out)
+            if need <= 0:
+                break
+            seg, idx = self._paths(day)
+            try:
+                count = os.path.getsize(idx) // _REC.size
+                with open(idx, "rb") as f:
+                    f.seek(max(0, count - need) * _REC.size)
+                    first = _REC.unpack(f.read(_REC.size))[0] if count else 0
+                recs = self._read_from(day, first)
+            except OSError:
+                continue
+            out = recs[-need:] + out
+        return out
+
+    def iter_reverse(self) -> Iterator[Dict[str, Any]]:
+        """Newest -> oldest; holds at most one segment in memory, so stop early when you can."""
+        for day in reversed(self.days()):
+            try:
+                recs = self._read_from(day, 0)
+            except OSError:
+                continue
+            yield from reversed(recs)
+
+    def cursor_at(self, ts: float) -> Tuple[str, int]:
+        """Position of the first record appended at or after `ts`, for follow()."""
+        day = _day(ts)
+        if not os.path.exists(self._paths(day)[1]):
+            return day, 0
+        return day, bisect.bisect_left([t for _, t in self._index(day)], ts)
+
+    def follow(self, cursor: Tuple[str, int]) -> Tuple[List[Dict[str, Any]], Tuple[str, int]]:
+        """
+        Records appended after `cursor` (by any process) and the cursor to pass
+        next time. Reads only index entries past the cursor and the lines they
+        cover, so polling it costs O(new records).
+        """
+        day0, n0 = cursor
+        out: List[Dict[str, Any]] = []
+        for day in self.days():
+            if day < day0:
+                continue
+            start = n0 if day == day0 else 0
+            seg, idx = self._paths(day)
+            try:
+                count = os.path.getsize(idx) // _REC.size
+                if count <= start:
+                    cursor = (day, max(count, start))
+                    continue
+                with open(idx, "rb") as f:
+                    f.seek(start * _REC.size)
+                    first = _REC.unpack(f.read(_REC.size))[0]
+                with open(seg, "rb") as f:
+                    f.seek(first)
+                    # only the lines the index already covers; data is written before its index
+                    lines = f.read().split(b"\n")[:count - start]
+            except OSError:
+                continue
+            out += _parse(b"\n".join(lines))
+            cursor = (day, count)
+        return out, cursor
+
+    def read_range(self, start: float, end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Records appended in [start, end) (epoch seconds), oldest first."""
+        end = time.time() + 1.0 if end is None else end
+        lo_day, hi_day = _day(start), _day(end)
+        out: List[Dict[str, Any]] = []
+        for day in self.days():
+            if not (lo_day <= day <= hi_day):
+                continue
+            try:
+                index = self._index(day)
+            except OSError:
+                continue
+            times = [ts for _, ts in index]
+            i, j = bisect.bisect_left(times, start), bisect.bisect_left(times, end)
+            if i >= j:
+                continue
+            out += self._read_from(day, index[i][0], index[j][0] if j < len(index) else None)
+        return out
+
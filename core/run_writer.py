@@ -0,0 +1,136 @@
+# core/run_writer.py
+from __future__ import annotations
+import atexit, json, queue, threading, time
+from typing import Any, Dict, List, Optional
+
+from config import settings
+from core.run_log import RunLog
+
+# failed DB rows kept for the next attempt; beyond this the oldest are dropped
+MAX_DB_BACKLOG = 10000
+# after a failed insert the DB is left alone for 5s, doubling per further failure up to this
+MAX_DB_RETRY_S = 300.0
+
+
+class RunWriter:
+    """
+    Background persistence for run-log records, so the order path never
+    waits on disk or MySQL:
+
+      write(line)  serializes the record (a snapshot; the caller may keep
+                   mutating its dict) and enqueues it - no I/O
+      writer thread  drains the queue and flushes once `batch` records are
+                   waiting or `flush_s` has passed since the oldest one:
+                   one RunLog.append (today's segment + index, under its
+                   cross-process lock) and one bulk INSERT
+                   (core.store.save_runs_bulk)
+      flush()      blocks until everything written so far is persisted
+      close()      flush + stop; registered with atexit
+
+    The DB side stays best-effort: a failed batch is kept (up to
+    MAX_DB_BACKLOG rows) and retried with exponential backoff, so an
+    unreachable MySQL costs one attempt and one log line per backoff step,
+    not one per flush.
+    """
+
+    def __init__(self, log: Optional[RunLog] = None, batch: Optional[int] = None, flush_s: Optional[float] = None,
+                 db: bool = True):
+        self.log = log or RunLog(keep_days=settings.run_log_keep_days)
+        self.batch = max(1, int(batch or settings.run_log_batch))
+        self.flush_s = float(settings.run_log_flush_s if flush_s is None else flush_s)
+        self.db = db
+        self._q: "queue.Queue[Any]" = queue.Queue()
+        self._db_backlog: List[Dict[str, Any]] = []
+        self._db_retry_at = 0.0   # monotonic time before which the DB is not tried again
+        self._db_backoff = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="run-writer", daemon=True)
+        self._thread.start()
+
+    # --------------------------- producer side ---------------------------
+
+    def write(self, line: Dict[str, Any]) -> None:
+        if self._closed:
+            raise RuntimeError("RunWriter is closed")
+        self._q.put(json.dumps(line))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record written before this call is persisted. False on timeout."""
+        if not self._thread.is_alive():
+            return self._q.empty()
+        done = threading.Event()
+        self._q.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    # --------------------------- writer thread ---------------------------
+
+    def _loop(self) -> None:
+        buf: List[str] = []
+        first = 0.0
+        while True:
+            wait = None if not buf else max(0.0, first + self.flush_s - time.monotonic())
+            try:
+                item = self._q.get(timeout=wait)
+            except queue.Empty:
+                item = False  # timer expired
+            if isinstance(item, str):
+                if not buf:
+                    first = time.monotonic()
+                buf.append(item)
+                if len(buf) < self.batch:
+                    continue
+            self._persist(buf)
+            buf = []
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is None:
+                return
+
+    def _persist(self, buf: List[str]) -> None:
+        if buf:
+            try:
+                self.log.append(buf)
+            except Exception as e:
+                print(f"[RunWriter] run log append failed ({len(buf)} lines): {e}")
+        if not self.db:
+            return
+        rows = self._db_backlog + [json.loads(s) for s in buf]
+        if not rows:
+            return
+        if time.monotonic() < self._db_retry_at:
+            self._db_backlog = rows[-MAX_DB_BACKLOG:]  # still backing off
+            return
+        try:
+            from core.store import save_runs_bulk
+            save_runs_bulk(rows)
+            if self._db_backoff:
+                print(f"[RunWriter] DB insert recovered ({len(rows)} rows written)")
+            self._db_backlog, self._db_backoff, self._db_retry_at = [], 0.0, 0.0
+        except Exception as e:
+            self._db_backlog = rows[-MAX_DB_BACKLOG:]
+            self._db_backoff = min(MAX_DB_RETRY_S, self._db_backoff * 2 or 5.0)
+            self._db_retry_at = time.monotonic() + self._db_backoff
+            print(f"[RunWriter] DB insert failed ({len(self._db_backlog)} rows pending, "
+                  f"next try in {self._db_backoff:.0f}s): {e}")
+
+
+_WRITER: Optional[RunWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_run_writer() -> RunWriter:
+    """Process-wide writer for the run log (state/runs/), flushed at interpreter exit."""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = RunWriter()
+            atexit.register(_WRITER.close)
+        return _WRITER
@@ -1,20 +1,68 @@
 # core/semantic_memory.py
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
-import os
+from typing import List, Dict, Any, Optional, Set
+import hashlib, os, re, threading, time
 
-# Numpy + cosine for a lightweight CPU-only path
+# Numpy only: vectors are L2-normalized, so cosine similarity is a dot product
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 
-# Try to import sentence-transformers, but never hard-crash if the stack isn't healthy
-try:
-    from sentence_transformers import SentenceTransformer
-except Exception as _e:
-    SentenceTransformer = None  # type: ignore
+from core.ann_index import ANN_MIN_ITEMS, IVFIndex, topk_dot, topk_scores
+from core.embedder import DEFAULT_MODEL, SentenceTransformer, WORKER_ADDR, get_encoder
+from core.vector_store import VectorStore
 
+# Persistent store root; each embedding model gets its own sub-directory.
+SEMMEM_DIR = os.getenv("SEMMEM_DIR", os.path.join("state", "semmem"))
+SEMMEM_PERSIST = os.getenv("SEMMEM_PERSIST", "1") == "1"
+# Retention: items older than MAX_AGE_DAYS are never returned and get evicted;
+# past MAX_ITEMS the oldest are evicted. 0 disables either rule.
+SEMMEM_MAX_AGE_DAYS = float(os.getenv("SEMMEM_MAX_AGE_DAYS", "0"))
+SEMMEM_MAX_ITEMS = int(os.getenv("SEMMEM_MAX_ITEMS", "0"))
+# Default recency decay for search(): score *= 0.5 ** (age / half-life). 0 = off.
+SEMMEM_HALF_LIFE_DAYS = float(os.getenv("SEMMEM_HALF_LIFE_DAYS", "0"))
 
-DEFAULT_MODEL = os.getenv("SEMMEM_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+def _store_dir(root: str, model_name: str) -> str:
+    return os.path.join(root, model_name.replace("/", "__"))
+
+
+def content_hash(text: str) -> str:
+    """Dedup key: case/whitespace-insensitive, so re-published headlines collapse."""
+    norm = re.sub(r"\s+", " ", text).strip().lower()
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()
+
+
+def _grow_append(buf: Optional[np.ndarray], n: int, rows: np.ndarray) -> np.ndarray:
+    """Write rows at buf[n:], doubling capacity when full (amortized O(1) per row)."""
+    need = n + len(rows)
+    if buf is None or need > len(buf):
+        cap = max(need, 2 * (len(buf) if buf is not None else 0), 256)
+        new = np.empty((cap,) + rows.shape[1:], dtype=rows.dtype)
+        if buf is not None:
+            new[:n] = buf[:n]
+        buf = new
+    buf[n:need] = rows
+    return buf
+
+
+def _norm_meta(meta: Optional[Dict[str, Any]], text: str) -> Dict[str, Any]:
+    """
+    Stored per-item metadata: symbols (upper-cased list, from 'symbol' or
+    'symbols'), source, ts (published time, epoch seconds; defaults to now)
+    and the content hash. Other keys are kept as-is.
+    """
+    m = dict(meta or {})
+    sym = m.pop("symbol", None)
+    syms = m.get("symbols") or ([] if sym is None else sym)
+    if isinstance(syms, str):
+        syms = syms.split(",")
+    m["symbols"] = sorted({str(x).strip().upper() for x in syms if str(x).strip()})
+    m["source"] = str(m.get("source") or "")
+    try:
+        m["ts"] = float(m.get("ts") or time.time())
+    except (TypeError, ValueError):
+        m["ts"] = time.time()
+    m["hash"] = content_hash(text)
+    return m
 
 
 class SemanticMemory:
@@ -22,102 +70,372 @@ class SemanticMemory:
     Tiny in-process vector store for news/reflections with a *safe* CPU init.
 
     - Forces device="cpu" to avoid the PyTorch 'meta tensor' crash on some Windows/GPU setups.
+    - The encoder is the process-wide one from core.embedder.get_encoder(): it is loaded
+      lazily on the first add/search and shared by every instance (or served by the
+      embedding worker when SEMMEM_WORKER is set), so constructing this is free.
     - If sentence-transformers cannot load or SEMMEM_DISABLE=1 is set, runs in 'disabled' mode:
       it will store raw texts and return most-recent hits instead of vector search.
+    - With persist=True (SEMMEM_PERSIST=1, default) texts + embeddings live in a
+      VectorStore under SEMMEM_DIR, so every process (scheduler, Streamlit) and
+      every instance sees the same memory and nothing is re-encoded on restart.
+    - Every item carries metadata (symbols, source, ts). A symbol -> rows inverted
+      index and a ts column let search() pre-filter by symbol / time window before
+      any vector is scored; retention (SEMMEM_MAX_AGE_DAYS / SEMMEM_MAX_ITEMS)
+      evicts old rows by compacting the store.
     """
 
-    def __init__(self, model_name: str = DEFAULT_MODEL):
+    def __init__(self, model_name: str = DEFAULT_MODEL, path: Optional[str] = None,
+                 persist: Optional[bool] = None):
         # allow turning this off from .env quickly
         self.disabled = os.getenv("SEMMEM_DISABLE", "0") == "1"
+        self.persist = SEMMEM_PERSIST if persist is None else bool(persist)
 
         self._texts: List[str] = []
-        self._emb: Optional[np.ndarray] = None  # NxD numpy array (when enabled)
-        self._model: Optional[SentenceTransformer] = None
+        self._metas: List[Dict[str, Any]] = []  # in-memory mode; the store keeps its own
+        self._emb: Optional[np.ndarray] = None  # capacity x D buffer (when enabled, in-memory mode)
+        self._n = 0  # rows of _emb in use
+        # row-level indexes, both modes (store mode: rebuilt from the item log)
+        self._seen: Set[str] = set()  # content hashes of everything already stored
+        self._ts: Optional[np.ndarray] = None  # capacity float64 buffer of published times
+        self._by_symbol: Dict[str, List[int]] = {}
+        self._rows = 0  # rows folded into the indexes above
+        self._gen = 0  # store generation the indexes belong to
+        self._retained_at = 0.0
+        self._model: Any = None  # shared encoder (LocalEncoder / RemoteEncoder), bound on first use
+        self._store: Optional[VectorStore] = None
+        self._index: Optional[IVFIndex] = None  # only built once the store passes ANN_MIN_ITEMS
+        self._index_saved = 0
+        self._model_name = model_name
+        self._path = path
+        self._ready = False
+        self._init_lock = threading.Lock()
 
         if self.disabled:
             print("[SemanticMemory] Disabled via SEMMEM_DISABLE=1")
             return
 
-        if SentenceTransformer is None:
+        if SentenceTransformer is None and not WORKER_ADDR:
             print("[SemanticMemory] sentence-transformers unavailable; running disabled.")
             self.disabled = True
+
+    def _ensure(self) -> None:
+        """Bind the shared encoder (loading it if nobody has yet) and open the store."""
+        if self._ready or self.disabled:
             return
+        with self._init_lock:
+            if self._ready or self.disabled:
+                return
+            enc = get_encoder(self._model_name)
+            try:
+                dim = enc.dim()  # first call in the process pays the model load
+            except Exception as e:
+                print(f"[SemanticMemory] Model init failed ({e}); running disabled.")
+                self.disabled = True
+                return
 
-        # Force CPU to avoid GPU meta-tensor issues
-        try:
-            # SentenceTransformer supports device='cpu' in recent versions
-            self._model = SentenceTransformer(model_name, device="cpu")  # type: ignore[arg-type]
-            print(f"[SemanticMemory] Loaded model on CPU: {model_name}")
-        except Exception as e:
-            print(f"[SemanticMemory] Model init failed ({e}); running disabled.")
-            self.disabled = True
-            self._model = None
+            if self.persist:
+                try:
+                    self._store = VectorStore(self._path or _store_dir(SEMMEM_DIR, self._model_name), dim)
+                except Exception as e:
+                    print(f"[SemanticMemory] Persistent store unavailable ({e}); keeping memory in-process.")
+                    self._store = None
+            self._model = enc
+            self._ready = True
+
+    # --------------------------- internals ---------------------------
+
+    def __bool__(self) -> bool:
+        # an instance is always "present"; __len__ alone would make a store that
+        # has not been opened yet (or is still empty) look falsy to callers
+        return True
+
+    def __len__(self) -> int:
+        self._ensure()
+        if self._store is not None:
+            return len(self._store)
+        return len(self._texts)
+
+    def _matrix(self) -> Optional[np.ndarray]:
+        if self._store is not None:
+            self._store.refresh()  # pick up appends from other processes
+            return self._store.embeddings if len(self._store) else None
+        return self._emb[:self._n] if self._emb is not None and self._n else None
+
+    def _index_rows(self, metas: List[Dict[str, Any]]) -> None:
+        """Fold the next len(metas) rows into the hash / ts / symbol indexes."""
+        start = self._rows
+        for j, m in enumerate(metas):
+            self._seen.add(m.get("hash") or "")
+            for sym in m.get("symbols") or []:
+                self._by_symbol.setdefault(sym, []).append(start + j)
+        self._ts = _grow_append(self._ts, start, np.asarray([float(m.get("ts") or 0.0) for m in metas], dtype=np.float64))
+        self._rows = start + len(metas)
+
+    def _reset_rows(self) -> None:
+        self._seen, self._by_symbol, self._ts, self._rows = set(), {}, None, 0
+        self._index, self._index_saved = None, 0
+
+    def _sync_rows(self) -> None:
+        """Store mode: fold rows appended since the last call (by any process) into the indexes."""
+        if self._store is None:
+            return
+        self._store.refresh()
+        n = len(self._store)
+        if self._store.gen != self._gen or n < self._rows:  # compacted: row ids changed
+            self._reset_rows()
+            self._gen = self._store.gen
+        if n <= self._rows:
+            return
+        # full sequential scan once per process, then only the new tail
+        new = self._store.iter_items() if not self._rows else self._store.items(list(range(self._rows, n)))
+        metas = []
+        for it in new:
+            m = it.get("meta") or {}
+            metas.append({"hash": m.get("hash") or content_hash(it.get("text", "")),
+                          "symbols": m.get("symbols") or [], "ts": m.get("ts") or 0.0})  # pre-metadata rows: ts 0
+        self._index_rows(metas)
+
+    def _unseen(self, texts: List[str], metas: List[Dict[str, Any]]):
+        """Drop texts already stored and repeats within the batch."""
+        self._sync_rows()
+        keep_t: List[str] = []
+        keep_m: List[Dict[str, Any]] = []
+        batch: Set[str] = set()
+        for t, m in zip(texts, metas):
+            h = m["hash"]
+            if h not in self._seen and h not in batch:
+                batch.add(h)
+                keep_t.append(t)
+                keep_m.append(m)
+        return keep_t, keep_m
+
+    def _index_path(self) -> Optional[str]:
+        if self._store is None:
+            return None
+        name = f"ivf.{self._store.gen}.npz" if self._store.gen else "ivf.npz"  # ids are per generation
+        return os.path.join(self._store.path, name)
+
+    def _topk(self, emb: np.ndarray, q: np.ndarray, k: int):
+        """Exact argpartition scan for small stores, IVF probe once the store is large."""
+        if len(emb) <= ANN_MIN_ITEMS:
+            return topk_dot(emb, q, k)
+        with self._init_lock:
+            if self._index is None:
+                p = self._index_path()
+                self._index = (IVFIndex.load(p) if p else None) or IVFIndex()
+                self._index_saved = len(self._index)
+            self._index.sync(emb)  # incremental: only rows appended since the last query
+            p = self._index_path()
+            if p and len(self._index) - self._index_saved >= 1000:
+                self._index.save(p)
+                self._index_saved = len(self._index)
+            return self._index.search(emb, q, k)
+
+    def _floor(self) -> Optional[float]:
+        return time.time() - SEMMEM_MAX_AGE_DAYS * 86400.0 if SEMMEM_MAX_AGE_DAYS > 0 else None
+
+    def _candidates(self, symbol: Optional[str], since: Optional[float]) -> Optional[np.ndarray]:
+        """Row ids passing the symbol / time filters (inverted index first); None = no filter."""
+        if not symbol and since is None:
+            return None
+        floor = self._floor()
+        cutoff = since if floor is None else max(float(since or 0.0), floor)
+        if symbol:
+            ids = np.asarray(self._by_symbol.get(symbol.strip().upper(), []), dtype=np.int64)
+        else:
+            ids = np.arange(self._rows, dtype=np.int64)
+        if cutoff is not None and len(ids):
+            ids = ids[self._ts[ids] >= float(cutoff)]
+        return ids
+
+    def _hits(self, idx, scores) -> List[Dict[str, Any]]:
+        idx = [int(i) for i in idx]
+        if self._store is not None:
+            items = self._store.items(idx)
+        else:
+            items = [{"text": self._texts[i], "meta": self._metas[i] if i < len(self._metas) else {}} for i in idx]
+        out = []
+        for it, s in zip(items, scores):
+            m = it.get("meta") or {}
+            out.append({"text": it.get("text", ""), "score": float(s),
+                        "symbols": m.get("symbols") or [], "source": m.get("source", ""), "ts": m.get("ts")})
+        return out
+
+    def _recent(self, k: int, cand: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        if cand is not None:
+            order = cand[np.argsort(-self._ts[cand], kind="stable")][:k] if len(cand) else cand
+            return self._hits(order, [0.0] * len(order))
+        n = len(self)
+        return self._hits(range(n - 1, max(-1, n - 1 - k), -1), [0.0] * min(k, n))
 
     # --------------------------- Public API ---------------------------
 
-    def add(self, texts: List[str]) -> None:
+    def add(self, texts: List[str], metas: Optional[List[Dict[str, Any]]] = None,
+            batch_size: int = 64) -> int:
         """
-        Add a batch of texts. If enabled, we compute embeddings on CPU and
-        append to the numpy matrix; otherwise, we only store the raw texts.
+        Add a batch of texts, optionally with per-text metadata
+        {"symbol" | "symbols", "source", "ts" (epoch seconds)}. If enabled, we
+        compute embeddings on CPU and append to the numpy matrix; otherwise, we
+        only store the raw texts. Texts whose content hash is already stored are
+        skipped before encoding, so cost scales with new unique text only.
+        Returns how many texts were new.
         """
         if not texts:
-            return
+            return 0
 
         # normalize input
-        texts = [t for t in texts if isinstance(t, str) and t.strip()]
+        pairs = [(t, m) for t, m in zip(texts, metas or [None] * len(texts)) if isinstance(t, str) and t.strip()]
+        if not pairs:
+            return 0
+
+        self._ensure()
+        with self._init_lock:
+            texts, metas = self._unseen([t for t, _ in pairs], [_norm_meta(m, t) for t, m in pairs])
         if not texts:
-            return
+            return 0
 
-        self._texts.extend(texts)
+        vecs: Optional[np.ndarray] = None
+        if not (self.disabled or self._model is None):
+            try:
+                # encoded outside the lock; returns numpy array (D dims), normalize=True gives cosine-ready vectors
+                vecs = np.asarray(self._model.encode(texts, normalize_embeddings=True, batch_size=batch_size),
+                                  dtype=np.float32)
+                if self._store is not None:
+                    self._store.append(vecs, texts, metas)
+            except Exception as e:
+                print(f"[SemanticMemory] encode failed ({e}); switching to disabled mode.")
+                self.disabled = True
+                vecs = None
 
-        if self.disabled or self._model is None:
-            # store only raw texts
-            return
+        if self._store is None:
+            with self._init_lock:
+                # texts, metas and embedding rows move together, so row i is always the same item;
+                # re-check for duplicates another thread added while we were encoding
+                fresh = [j for j, m in enumerate(metas) if m["hash"] not in self._seen]
+                texts, metas = [texts[j] for j in fresh], [metas[j] for j in fresh]
+                if not texts:
+                    return 0
+                self._texts.extend(texts)
+                self._metas.extend(metas)
+                self._index_rows(metas)
+                if vecs is not None and not self.disabled:
+                    self._emb = _grow_append(self._emb, self._n, vecs[fresh])
+                    self._n += len(fresh)
+                else:
+                    self._emb, self._n = None, 0  # keep texts; search() will return recency
 
-        try:
-            # returns numpy array (D dims); normalize=True gives cosine-ready vectors
-            vecs = self._model.encode(texts, normalize_embeddings=True)
-            if self._emb is None:
-                self._emb = np.asarray(vecs, dtype=np.float32)
-            else:
-                self._emb = np.vstack([self._emb, np.asarray(vecs, dtype=np.float32)])
-        except Exception as e:
-            print(f"[SemanticMemory] encode failed ({e}); switching to disabled mode.")
-            self.disabled = True
-            self._emb = None  # keep texts; search() will return recency
+        if (SEMMEM_MAX_ITEMS and len(self) > SEMMEM_MAX_ITEMS * 1.1) or \
+                (SEMMEM_MAX_AGE_DAYS and time.time() - self._retained_at > 3600):
+            self.enforce_retention()
+        return len(texts)
 
-    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+    def search(self, query: str, k: int = 3, symbol: Optional[str] = None, since: Optional[float] = None,
+               half_life_days: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Cosine-similarity search (if enabled). In disabled mode, returns most-recent items.
+        - symbol / since (epoch seconds) restrict the candidates via the inverted
+          indexes before scoring; only those rows are scored, exactly.
+        - half_life_days (default SEMMEM_HALF_LIFE_DAYS) multiplies scores by
+          0.5 ** (age / half-life).
+        Unfiltered queries scan small stores exactly and use the IVF index past SEMMEM_ANN_MIN items.
         """
-        if not self._texts:
+        self._ensure()
+        emb = None if (self.disabled or self._model is None) else self._matrix()
+        with self._init_lock:
+            self._sync_rows()
+        if not len(self):
             return []
+        cand = self._candidates(symbol, since)
+        if cand is not None:
+            if emb is not None:
+                cand = cand[cand < len(emb)]  # rows another process appended after our refresh
+            if not len(cand):
+                return []
 
-        if self.disabled or self._model is None or self._emb is None:
+        if emb is None:
             # recency fallback
-            tail = self._texts[-k:]
-            tail = list(reversed(tail))
-            return [{"text": t, "score": 0.0} for t in tail]
+            return self._recent(k, cand)
 
+        hl = SEMMEM_HALF_LIFE_DAYS if half_life_days is None else float(half_life_days)
+        floor = self._floor()
         try:
-            q = self._model.encode([query], normalize_embeddings=True)
-            sims = cosine_similarity(q, self._emb)[0]  # shape: [N]
-            idx = sims.argsort()[::-1][:k]
-            return [{"text": self._texts[i], "score": float(sims[i])} for i in idx]
+            q = np.asarray(self._model.encode([query], normalize_embeddings=True), dtype=np.float32)[0]
+            if cand is None:
+                # unfiltered: exact/IVF top-k, over-fetched when decay or expiry can reorder/drop rows
+                idx, sims = self._topk(emb, q, k if not (hl or floor) else max(8 * k, 50))
+                if not (hl or floor):
+                    return self._hits(idx, sims)
+                known = idx < self._rows
+                idx, sims = idx[known], sims[known]
+                if floor is not None:
+                    live = self._ts[idx] >= floor
+                    idx, sims = idx[live], sims[live]
+            else:
+                idx = np.sort(cand)  # ascending ids = sequential reads from the memmap
+                sims = np.asarray(emb[idx] @ q, dtype=np.float32)
+            if hl > 0 and len(idx):
+                age_days = np.maximum(0.0, time.time() - self._ts[idx]) / 86400.0
+                sims = (sims * np.power(0.5, age_days / hl)).astype(np.float32)
+            order, scores = topk_scores(sims, k)
+            return self._hits(idx[order], scores)
         except Exception as e:
             print(f"[SemanticMemory] search failed ({e}); returning recency.")
-            tail = self._texts[-k:]
-            tail = list(reversed(tail))
-            return [{"text": t, "score": 0.0} for t in tail]
+            return self._recent(k, cand)
+
+    def enforce_retention(self, max_age_days: Optional[float] = None, max_items: Optional[int] = None) -> int:
+        """
+        Evict rows older than max_age_days and, past max_items, the oldest rows
+        (defaults: SEMMEM_MAX_AGE_DAYS / SEMMEM_MAX_ITEMS). Returns rows evicted.
+        Store mode compacts the VectorStore, which every process picks up on its next query.
+        """
+        max_age_days = SEMMEM_MAX_AGE_DAYS if max_age_days is None else float(max_age_days)
+        max_items = SEMMEM_MAX_ITEMS if max_items is None else int(max_items)
+        self._ensure()
+        with self._init_lock:
+            self._retained_at = time.time()
+            self._sync_rows()
+            n = self._rows
+            keep = np.arange(n, dtype=np.int64)
+            if max_age_days > 0 and n:
+                keep = keep[self._ts[:n] >= time.time() - max_age_days * 86400.0]
+            if max_items > 0 and len(keep) > max_items:
+                keep = np.sort(keep[np.argsort(self._ts[keep], kind="stable")[-max_items:]])
+            dropped = n - len(keep)
+            if not dropped:
+                return 0
+            if self._store is not None:
+                old = self._index_path()
+                # rows other processes append meanwhile are carried over by the store
+                if self._store.compact(keep, known=n, gen=self._gen) is None:
+                    self._sync_rows()  # someone else compacted first; their pass covered it
+                    return 0
+                self._reset_rows()
+                if old and os.path.exists(old):
+                    try:
+                        os.remove(old)
+                    except OSError:
+                        pass
+                self._sync_rows()
+            else:
+                texts, metas = self._texts, self._metas
+                emb = self._emb[:self._n][keep] if self._emb is not None and self._n else None
+                self._reset_rows()
+                self._texts = [texts[i] for i in keep]
+                self._metas = [metas[i] for i in keep]
+                self._index_rows(self._metas)
+                self._emb, self._n = (emb, len(emb)) if emb is not None else (None, 0)
+        print(f"[SemanticMemory] retention evicted {dropped} item(s); {len(self)} kept.")
+        return dropped
 
-    def search_memory(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+    def search_memory(self, query: str, k: int = 3, **filters: Any) -> List[Dict[str, Any]]:
         """
         Adapter to the signature you were using elsewhere.
-        Returns items with 'text' and 'distance' (distance = 1 - cosine_sim for display).
+        Returns items with 'text' and 'distance' (distance = 1 - cosine_sim for display),
+        plus the item's 'ts'. Keyword filters are passed through to search().
         """
-        hits = self.search(query, k=k)
+        hits = self.search(query, k=k, **filters)
         out: List[Dict[str, Any]] = []
         for h in hits:
             score = float(h.get("score", 0.0))
-            out.append({"text": h["text"], "distance": float(max(0.0, 1.0 - score))})
+            out.append({"text": h["text"], "distance": float(max(0.0, 1.0 - score)), "ts": h.get("ts")})
         return out
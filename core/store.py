@@ -1,7 +1,9 @@
 # core/store.py
 from __future__ import annotations
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from sqlalchemy import insert
 
 from core.db import SessionLocal
 from core.models import Run
@@ -20,12 +22,8 @@ def _as_dt(ts_iso: str) -> datetime:
         return datetime.now(timezone.utc)
 
 
-def save_run_dict(d: Dict[str, Any]) -> None:
-    """
-    Persist a 'run' dict (the same one you append to JSONL) into MySQL.
-    Designed to be best-effort: callers can swallow exceptions so trading never blocks.
-    """
-    r = Run(
+def _run_row(d: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(
         ts_utc=_as_dt(d.get("when")),
         symbol=(d.get("symbol") or "").upper(),
         trigger=d.get("trigger") or "",
@@ -38,6 +36,26 @@ def save_run_dict(d: Dict[str, Any]) -> None:
         account_cash=(d.get("account") or {}).get("cash"),
         account_equity=(d.get("account") or {}).get("equity"),
     )
+
+
+def save_run_dict(d: Dict[str, Any]) -> None:
+    """
+    Persist a 'run' dict (the same one you append to JSONL) into MySQL.
+    Designed to be best-effort: callers can swallow exceptions so trading never blocks.
+    """
+    with SessionLocal() as s:
+        s.add(Run(**_run_row(d)))
+        s.commit()
+
+
+def save_runs_bulk(rows: List[Dict[str, Any]]) -> int:
+    """
+    Many run dicts in one transaction: a single executemany INSERT rather
+    than one session + commit per row. Used by core/run_writer.py.
+    """
+    if not rows:
+        return 0
     with SessionLocal() as s:
-        s.add(r)
+        s.execute(insert(Run), [_run_row(d) for d in rows])
         s.commit()
+    return len(rows)
@@ -0,0 +1,146 @@
+# core/telemetry.py
+from __future__ import annotations
+import json, os, threading, time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+STATE_DIR = "state"
+METRICS_PATH = os.path.join(STATE_DIR, "llm_metrics.json")
+
+# Rolling window size (calls) the histograms are computed over.
+WINDOW = int(os.getenv("LLM_METRICS_WINDOW", "2000"))
+
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+TOKEN_BUCKETS = (100, 200, 400, 800, 1600, 3200, 6400)
+
+
+def histogram(values: Sequence[float], bounds: Sequence[float]) -> Dict[str, int]:
+    """Cumulative-free bucket counts: {'<=250': n, ..., '>32000': n}."""
+    counts = [0] * (len(bounds) + 1)
+    for v in values:
+        for i, b in enumerate(bounds):
+            if v <= b:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    out = {f"<={b}": c for b, c in zip(bounds, counts)}
+    out[f">{bounds[-1]}"] = counts[-1]
+    return out
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    vs = sorted(values)
+    return round(vs[min(len(vs) - 1, int(q * len(vs)))], 1)
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact per-run/per-cycle summary of a list of call records."""
+    live = [r for r in records if not r.get("cache_hit")]
+    lat = [float(r.get("latency_ms") or 0.0) for r in live]
+    return {
+        "calls": len(records),
+        "llm_calls": len(live),
+        "cache_hits": len(records) - len(live),
+        "latency_ms_total": round(sum(lat), 1),
+        "latency_ms_max": round(max(lat), 1) if lat else 0.0,
+        "prompt_tokens": sum(int(r.get("prompt_tokens") or 0) for r in live),
+        "response_tokens": sum(int(r.get("response_tokens") or 0) for r in live),
+        "fallback_hops": sum(int(r.get("fallback_hops") or 0) for r in live),
+        "parse_paths": dict(Counter(r.get("parse_path") or "?" for r in live)),
+        "models": dict(Counter(r.get("model") or "?" for r in live)),
+    }
+
+
+class LLMTelemetry:
+    """
+    Process-wide sink for per-call LLM records:
+      {ts, agent, model, latency_ms, queue_ms, prompt_tokens, response_tokens,
+       fallback_hops, parse_path, cache_hit}
+
+    - record(): called by the LLM backends (and by the vote gate for cache hits)
+    - tag(agent=...): labels the calls made on this thread inside the block
+    - collect(): captures this thread's records, e.g. for one run_once
+    - snapshot()/export(): rolling histograms over the last WINDOW calls
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self._recent: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._tls = threading.local()
+        self._export_lock = threading.Lock()  # concurrent cycle workers share one tmp file
+        self.total_calls = 0
+
+    def _collectors(self) -> List[List[Dict[str, Any]]]:
+        if not hasattr(self._tls, "collectors"):
+            self._tls.collectors = []
+        return self._tls.collectors
+
+    @contextmanager
+    def tag(self, **labels: Any) -> Iterator[None]:
+        prev = getattr(self._tls, "labels", {})
+        self._tls.labels = {**prev, **labels}
+        try:
+            yield
+        finally:
+            self._tls.labels = prev
+
+    @contextmanager
+    def collect(self) -> Iterator[List[Dict[str, Any]]]:
+        bucket: List[Dict[str, Any]] = []
+        self._collectors().append(bucket)
+        try:
+            yield bucket
+        finally:
+            self._collectors().remove(bucket)
+
+    def record(self, rec: Dict[str, Any]) -> None:
+        rec = {"ts": time.time(), "cache_hit": False, **getattr(self._tls, "labels", {}), **rec}
+        with self._lock:
+            self._recent.append(rec)
+            self.total_calls += 1
+        for bucket in self._collectors():
+            bucket.append(rec)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recs = list(self._recent)
+        live = [r for r in recs if not r.get("cache_hit")]
+        lat = [float(r.get("latency_ms") or 0.0) for r in live]
+        by_agent: Dict[str, List[Dict[str, Any]]] = {}
+        for r in recs:
+            by_agent.setdefault(str(r.get("agent") or "-"), []).append(r)
+        return {
+            "updated": time.time(),
+            "window": len(recs),
+            "total_calls": self.total_calls,
+            "latency_ms": {
+                "p50": _pct(lat, 0.50), "p90": _pct(lat, 0.90), "p99": _pct(lat, 0.99),
+                "hist": histogram(lat, LATENCY_BUCKETS_MS),
+            },
+            "prompt_tokens_hist": histogram([int(r.get("prompt_tokens") or 0) for r in live], TOKEN_BUCKETS),
+            "response_tokens_hist": histogram([int(r.get("response_tokens") or 0) for r in live], TOKEN_BUCKETS),
+            "fallback_hops": dict(Counter(int(r.get("fallback_hops") or 0) for r in live)),
+            "parse_paths": dict(Counter(r.get("parse_path") or "?" for r in live)),
+            "cache_hit_rate": round((len(recs) - len(live)) / len(recs), 3) if recs else 0.0,
+            "by_agent": {a: summarize(rs) for a, rs in by_agent.items()},
+        }
+
+    def export(self, path: str = METRICS_PATH) -> None:
+        """Best-effort dump for the Streamlit panel (scheduler and UI are separate processes)."""
+        try:
+            snap = self.snapshot()
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = path + ".tmp"
+            with self._export_lock:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(snap, f)
+                os.replace(tmp, path)
+        except Exception as e:
+            print(f"[LLMTelemetry] export failed: {e}")
+
+
+TELEMETRY = LLMTelemetry()
@@ -0,0 +1,140 @@
+# core/timebox.py
+from __future__ import annotations
+import heapq, threading, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.ledger_db import LedgerDB, get_ledger_db
+
+# a failed timebox close is retried after this long
+RETRY_S = 15 * 60.0
+
+
+def _epoch(ts_iso: Optional[str]) -> Optional[float]:
+    if not ts_iso:
+        return None
+    try:
+        return datetime.fromisoformat(str(ts_iso).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+class TimeboxHeap:
+    """
+    Min-heap of (timebox_until, symbol) over the ledger, so finding what has
+    expired costs O(log n) per expiry instead of a scan of every position:
+
+      next_due()        earliest expiry (epoch) or None - when to wake up
+      pop_due(now)      symbols whose timebox has passed, earliest first
+      note_entry/exit   keep the heap current as this process trades
+
+    Entries are invalidated lazily: a popped entry only counts if it still
+    matches the symbol's current expiry. This process's own ledger writes
+    reach the heap through note_entry / note_exit; writes by other
+    connections (worker processes, the UI) show up in LedgerDB.data_version()
+    and rebuild the heap from the ledger's timebox index.
+    """
+
+    def __init__(self, db: Optional[LedgerDB] = None):
+        self.db = db or get_ledger_db()
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, str]] = []
+        self._until: Dict[str, float] = {}     # symbol -> live expiry
+        self._version: Optional[int] = None
+
+    def _sync(self) -> None:
+        version = self.db.data_version()
+        if version == self._version:
+            return
+        self._version = version
+        self._until = {}
+        for sym, iso in self.db.timeboxes():
+            ts = _epoch(iso)
+            if ts is not None:
+                self._until[sym] = ts
+        self._heap = [(ts, sym) for sym, ts in self._until.items()]
+        heapq.heapify(self._heap)
+
+    def _push(self, symbol: str, ts: float) -> None:
+        sym = symbol.upper()
+        with self._lock:
+            if self._until.get(sym) == ts:
+                return  # already armed (an add to a position keeps its timebox)
+            self._until[sym] = ts
+            heapq.heappush(self._heap, (ts, sym))
+
+    def note_entry(self, symbol: str, until_iso: Optional[str]) -> None:
+        ts = _epoch(until_iso)
+        if ts is not None:
+            self._push(symbol, ts)
+
+    def note_exit(self, symbol: str) -> None:
+        with self._lock:
+            self._until.pop(symbol.upper(), None)  # its heap entry goes stale
+
+    def _top(self) -> Optional[Tuple[float, str]]:
+        while self._heap:
+            ts, sym = self._heap[0]
+            if self._until.get(sym) == ts:
+                return ts, sym
+            heapq.heappop(self._heap)  # stale: exited, or re-entered with a new expiry
+        return None
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            self._sync()
+            top = self._top()
+            return top[0] if top else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        out: List[str] = []
+        with self._lock:
+            self._sync()
+            while True:
+                top = self._top()
+                if top is None or top[0] > now:
+                    break
+                heapq.heappop(self._heap)
+                self._until.pop(top[1], None)
+                out.append(top[1])
+        return out
+
+    def retry_later(self, symbol: str, delay_s: float = RETRY_S) -> None:
+        """Re-arm a symbol whose close failed (a rebuild after a foreign write re-adds it as due now)."""
+        self._push(symbol, time.time() + delay_s)
+
+
+def close_expired(heap: TimeboxHeap, broker: Any, log: Callable[[Dict[str, Any]], None],
+                  now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Close every position whose timebox has passed, through the broker, and
+    drop it from the ledger. Callers hold the order lock. Each candidate is
+    re-checked against the ledger first (it may have been sold meanwhile);
+    a failed close is retried after RETRY_S.
+    """
+    now = time.time() if now is None else now
+    done: List[Dict[str, Any]] = []
+    for sym in heap.pop_due(now):
+        row = heap.db.get(sym)
+        until = _epoch((row or {}).get("timebox_until"))
+        if not row or until is None:
+            continue  # sold, or the timebox was cleared, meanwhile
+        if until > now:
+            heap.note_entry(sym, row["timebox_until"])  # extended meanwhile
+            continue
+        if float(row.get("qty", 0.0) or 0.0) <= 0.0:
+            heap.db.remove(sym)  # empty row: nothing to close, don't keep waking for it
+            continue
+        when = datetime.fromtimestamp(now, timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+        line: Dict[str, Any] = {"when": when, "symbol": sym, "trigger": "timebox",
+                                "timebox_until": row["timebox_until"], "qty": float(row.get("qty", 0.0))}
+        try:
+            line.update(action="TIMEBOX_EXIT", order_id=broker.close_position(sym))
+            heap.db.remove(sym)
+        except Exception as e:
+            line.update(action="TIMEBOX_EXIT_FAILED", error=str(e))
+            heap.retry_later(sym)
+        log(line)
+        done.append(line)
+    return done
@@ -0,0 +1,226 @@
+# core/vector_store.py
+from __future__ import annotations
+import json, os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.file_lock import FileLock
+
+
+class VectorStore:
+    """
+    On-disk embedding store shared by the scheduler and Streamlit.
+
+    Layout under `path`:
+      header.json  {"dim", "count", "items_bytes", "gen"} - the commit point
+      emb.f32      float32 row-major matrix, memory-mapped read-only
+      items.jsonl  append-only {"text", "meta"} log
+      offsets.i64  int64 byte offset of each line in items.jsonl
+
+    compact() rewrites the surviving rows into a new generation of the data
+    files (emb.<gen>.f32, ...) and commits it through the header, so readers
+    still on the previous generation keep a consistent view until they refresh.
+
+    append() writes the data files first and swaps header.json last
+    (os.replace), under an inter-process lock. A crash mid-append leaves
+    uncommitted bytes past the header's sizes; the next append truncates
+    them away. Opening only reads the header and maps the matrix, so it
+    costs milliseconds regardless of size and never re-encodes anything.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = int(dim)
+        os.makedirs(path, exist_ok=True)
+        self._header_path = os.path.join(path, "header.json")
+        self._lock = FileLock(os.path.join(path, ".lock"))
+        self._header_sig: Any = None
+        self.count = 0
+        self.items_bytes = 0
+        self.gen = 0
+        self._emb: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self.refresh()
+
+    # --------------------------- header ---------------------------
+
+    def _files(self, gen: int) -> Tuple[str, str, str]:
+        """(emb, items, offsets) paths of a generation; generation 0 keeps the original names."""
+        sfx = "" if not gen else f".{gen}"
+        return (os.path.join(self.path, f"emb{sfx}.f32"),
+                os.path.join(self.path, f"items{sfx}.jsonl"),
+                os.path.join(self.path, f"offsets{sfx}.i64"))
+
+    @property
+    def _emb_path(self) -> str:
+        return self._files(self.gen)[0]
+
+    @property
+    def _items_path(self) -> str:
+        return self._files(self.gen)[1]
+
+    @property
+    def _offsets_path(self) -> str:
+        return self._files(self.gen)[2]
+
+    def _read_header(self) -> Dict[str, Any]:
+        if not os.path.exists(self._header_path):
+            return {"dim": self.dim, "count": 0, "items_bytes": 0, "gen": 0}
+        with open(self._header_path, "r", encoding="utf-8") as f:
+            h = json.load(f)
+        if int(h.get("dim", self.dim)) != self.dim:
+            raise RuntimeError(f"VectorStore at {self.path} has dim={h.get('dim')}, expected {self.dim}")
+        return h
+
+    def _write_header(self, count: int, items_bytes: int, gen: int) -> None:
+        tmp = self._header_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "count": int(count), "items_bytes": int(items_bytes), "gen": int(gen)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._header_path)
+
+    def refresh(self) -> bool:
+        """Pick up appends made by other processes. Returns True if the view changed."""
+        try:
+            st = os.stat(self._header_path)
+            sig = (st.st_ino, st.st_mtime_ns, st.st_size)  # os.replace gives a new inode per commit
+        except OSError:
+            sig = None
+        if sig == self._header_sig and self._emb is not None:
+            return False
+        h = self._read_header()
+        self._header_sig = sig
+        self.count = int(h.get("count", 0))
+        self.items_bytes = int(h.get("items_bytes", 0))
+        self.gen = int(h.get("gen", 0))
+        self._map()
+        return True
+
+    def _map(self) -> None:
+        if self.count <= 0:
+            self._emb = np.zeros((0, self.dim), dtype=np.float32)
+            self._offsets = np.zeros(0, dtype=np.int64)
+            return
+        self._emb = np.memmap(self._emb_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        self._offsets = np.memmap(self._offsets_path, dtype=np.int64, mode="r", shape=(self.count,))
+
+    # --------------------------- read ---------------------------
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """(count, dim) float32 view; memory-mapped, so only touched pages are read."""
+        return self._emb if self._emb is not None else np.zeros((0, self.dim), dtype=np.float32)
+
+    def item(self, i: int) -> Dict[str, Any]:
+        """{'text', 'meta'} for row i (one seek + one line read)."""
+        with open(self._items_path, "rb") as f:
+            f.seek(int(self._offsets[i]))
+            return json.loads(f.readline().decode("utf-8"))
+
+    def items(self, idx: List[int]) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        with open(self._items_path, "rb") as f:
+            for i in idx:
+                f.seek(int(self._offsets[i]))
+                out.append(json.loads(f.readline().decode("utf-8")))
+        return out
+
+    def text(self, i: int) -> str:
+        return self.item(i).get("text", "")
+
+    def iter_items(self):
+        """Sequential scan of the committed log (used for rebuilding in-memory indexes)."""
+        if self.count <= 0:
+            return
+        with open(self._items_path, "rb") as f:
+            for _ in range(self.count):
+                yield json.loads(f.readline().decode("utf-8"))
+
+    # --------------------------- write ---------------------------
+
+    def append(self, vecs: np.ndarray, texts: List[str], metas: Optional[List[Dict[str, Any]]] = None) -> int:
+        """Atomically append rows; returns the id of the first new row."""
+        vecs = np.ascontiguousarray(vecs, dtype=np.float32).reshape(-1, self.dim)
+        if len(vecs) != len(texts):
+            raise ValueError("vecs and texts must have the same length")
+        metas = metas or [{} for _ in texts]
+        with self._lock:
+            h = self._read_header()  # another process may have appended since our last refresh
+            count, items_bytes, gen = int(h.get("count", 0)), int(h.get("items_bytes", 0)), int(h.get("gen", 0))
+            emb_path, items_path, offsets_path = self._files(gen)
+
+            lines = [(json.dumps({"text": t, "meta": m}, ensure_ascii=False) + "\n").encode("utf-8")
+                     for t, m in zip(texts, metas)]
+            offs = np.empty(len(lines), dtype=np.int64)
+            pos = items_bytes
+            for j, ln in enumerate(lines):
+                offs[j] = pos
+                pos += len(ln)
+
+            for p, size, payload in (
+                (emb_path, count * self.dim * 4, vecs.tobytes()),
+                (items_path, items_bytes, b"".join(lines)),
+                (offsets_path, count * 8, offs.tobytes()),
+            ):
+                with open(p, "ab") as f:
+                    f.truncate(size)  # drop anything a crashed writer left uncommitted
+                with open(p, "r+b") as f:
+                    f.seek(size)
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            self._write_header(count + len(lines), pos, gen)
+        self.refresh()
+        return count
+
+    def compact(self, keep: np.ndarray, known: Optional[int] = None, gen: Optional[int] = None) -> Optional[int]:
+        """
+        Rewrite only the rows in `keep` as a new generation; returns the new
+        count. `keep` was chosen from the caller's view of the first `known`
+        rows of generation `gen` (default: the current view): rows appended
+        after that (by any process, before the lock was taken) are always
+        carried over, and if another compaction got in first nothing is done
+        and None is returned. Row ids are renumbered 0..n-1 in `keep` order,
+        so callers must drop anything keyed by old ids. The files of the
+        generation before the previous one are deleted.
+        """
+        keep = np.asarray(keep, dtype=np.int64)
+        with self._lock:
+            self.refresh()
+            if gen is not None and gen != self.gen:
+                return None  # ids in `keep` belong to a generation that is gone
+            if known is not None and self.count > known:
+                keep = np.concatenate([keep, np.arange(known, self.count, dtype=np.int64)])
+            gen = self.gen + 1
+            emb_path, items_path, offsets_path = self._files(gen)
+            offs = np.empty(len(keep), dtype=np.int64)
+            pos = 0
+            with open(items_path, "wb") as f:
+                for j, it in enumerate(self.items(keep.tolist())):
+                    ln = (json.dumps(it, ensure_ascii=False) + "\n").encode("utf-8")
+                    offs[j] = pos
+                    f.write(ln)
+                    pos += len(ln)
+                f.flush()
+                os.fsync(f.fileno())
+            for p, payload in ((emb_path, np.ascontiguousarray(self.embeddings[keep]).tobytes()),
+                               (offsets_path, offs.tobytes())):
+                with open(p, "wb") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._write_header(len(keep), pos, gen)
+            if gen >= 2:
+                for p in self._files(gen - 2):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass  # still mapped elsewhere (Windows) - retried next compaction
+        self.refresh()
+        return self.count
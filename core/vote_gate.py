@@ -0,0 +1,130 @@
+# core/vote_gate.py
+from __future__ import annotations
+import json, math, os, threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from config import settings
+from core.screeners import rule_macd_cross, rule_rsi
+
+STATE_DIR = "state"
+GATE_PATH = os.path.join(STATE_DIR, "vote_gate.json")
+
+
+def _band_state(close: float, upper: float, lower: float) -> str:
+    if close > upper: return "ABOVE_UPPER"
+    if close < lower: return "BELOW_LOWER"
+    return "INSIDE"
+
+
+def bar_features(df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Cheap summary of the latest bar an agent looks at: the screener regimes
+    plus the raw levels we measure drift against. None if the frame is unusable.
+    """
+    if df is None or len(df) < 2:
+        return None
+    try:
+        last = df.iloc[-1]
+        if any(math.isnan(float(last[c])) for c in ("close", "rsi", "macd", "macd_signal", "upper_band", "lower_band")):
+            return None  # warm-up / gap bars: never a basis for reuse
+        close = float(last["close"])
+        return {
+            "rsi_regime": rule_rsi(df),
+            "macd_cross": rule_macd_cross(df),
+            "macd_side": "ABOVE" if float(last["macd"]) >= float(last["macd_signal"]) else "BELOW",
+            "band": _band_state(close, float(last["upper_band"]), float(last["lower_band"])),
+            "rsi": float(last["rsi"]),
+            "close": close,
+        }
+    except Exception:
+        return None
+
+
+def _unchanged(prev: Dict[str, Any], cur: Dict[str, Any]) -> bool:
+    """True when nothing material moved between the anchored vote and now."""
+    for k in ("rsi_regime", "macd_side", "band", "context"):
+        if prev.get(k) != cur.get(k):
+            return False
+    if cur.get("macd_cross") in ("MACD_BULL_CROSS", "MACD_BEAR_CROSS"):
+        return False
+    if not all(math.isfinite(float(d.get(k, "nan"))) for d in (prev, cur) for k in ("rsi", "close")):
+        return False
+    if abs(float(cur["rsi"]) - float(prev["rsi"])) >= settings.gate_rsi_delta:
+        return False
+    if abs(float(cur["close"]) / max(1e-9, float(prev["close"])) - 1.0) >= settings.gate_close_pct:
+        return False
+    return True
+
+
+class VoteGate:
+    """
+    Pre-LLM gate: remembers each agent's last real vote together with the
+    features it was made on, and hands it back while the features stay within
+    the thresholds (and the vote is younger than gate_max_age_min). Features
+    carry the agent's context_key() too, so e.g. new news forces a re-vote;
+    bars with NaN indicators are never gated.
+
+    The stored features are only replaced by a fresh LLM vote, so slow drift
+    accumulates against the anchor and eventually forces a re-vote.
+    """
+
+    def __init__(self, path: str = GATE_PATH, enabled: bool | None = None):
+        self.path = path
+        self.enabled = settings.gate_enable if enabled is None else bool(enabled)
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except Exception:
+                self._data = {}
+
+    @staticmethod
+    def _key(symbol: str, agent: str) -> str:
+        return f"{symbol.upper()}|{agent}"
+
+    def lookup(self, symbol: str, agent: str, feats: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Previous vote {'decision','confidence','raw','when'} if it can be reused, else None."""
+        if not self.enabled or not feats:
+            return None
+        with self._lock:
+            ent = self._data.get(self._key(symbol, agent))
+        if not ent:
+            return None
+        try:
+            age_min = (datetime.now(timezone.utc) - datetime.fromisoformat(ent["when"])).total_seconds() / 60.0
+        except Exception:
+            return None
+        if age_min >= settings.gate_max_age_min:
+            return None
+        if not _unchanged(ent["features"], feats):
+            return None
+        return ent["vote"] | {"when": ent["when"]}
+
+    def remember(self, symbol: str, agent: str, feats: Optional[Dict[str, Any]], vote: Dict[str, Any]) -> None:
+        if not feats:
+            return
+        ent = {
+            "when": datetime.now(timezone.utc).isoformat(),
+            "features": feats,
+            "vote": {"decision": vote["decision"], "confidence": float(vote["confidence"]), "raw": vote.get("raw", "")},
+        }
+        with self._lock:
+            self._data[self._key(symbol, agent)] = ent
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
@@ -0,0 +1,185 @@
+# core/work_queue.py
+from __future__ import annotations
+import json, os, sqlite3, threading, time
+from typing import Any, Dict, List, Optional
+
+STATE_DIR = "state"
+QUEUE_PATH = os.path.join(STATE_DIR, "work_queue.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol       TEXT    NOT NULL,
+    is_crypto    INTEGER NOT NULL DEFAULT 0,
+    trigger      TEXT    NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 2,
+    status       TEXT    NOT NULL DEFAULT 'queued',  -- queued|running|done|failed|expired
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before   REAL    NOT NULL DEFAULT 0,
+    deadline     REAL,
+    lease_until  REAL,
+    worker       TEXT,
+    enqueued_at  REAL    NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    result       TEXT,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, priority, id);
+CREATE INDEX IF NOT EXISTS jobs_symbol ON jobs(symbol, status);
+"""
+
+
+class WorkQueue:
+    """
+    Durable local job queue for (symbol, trigger) runs, on SQLite in WAL mode,
+    shared by a coordinator process and any number of worker processes.
+
+      enqueue()   coordinator side; a (symbol, trigger) already queued or
+                  running is not enqueued twice
+      claim()     atomically leases the best runnable job: lowest priority
+                  value, then oldest, skipping symbols that have a live lease
+                  (per-symbol exclusivity) and expiring jobs past their deadline
+      heartbeat() extends the lease while the job runs
+      complete()/fail()  only the lease holder may finish a job; failures are
+                  retried with backoff until max_attempts
+      last_attempt()  called right before a job sends orders: from then on
+                  it is never retried, so a failure after a fill cannot
+                  place the order a second time
+
+    A worker that dies simply stops heartbeating: once its lease lapses the
+    job is reclaimable (and its attempt counts) unless it had reached its
+    order phase, in which case it is marked failed.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, busy_timeout_s: float = 30.0):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._busy_timeout_s = busy_timeout_s
+        self._tls = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            # autocommit mode; transactions are explicit BEGIN IMMEDIATE below
+            conn = sqlite3.connect(self.path, timeout=self._busy_timeout_s, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._tls.conn = conn
+        return conn
+
+    class _Tx:
+        def __init__(self, conn: sqlite3.Connection):
+            self.conn = conn
+
+        def __enter__(self) -> sqlite3.Connection:
+            self.conn.execute("BEGIN IMMEDIATE")  # take the write lock up front: claims never race
+            return self.conn
+
+        def __exit__(self, exc_type, *exc) -> None:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _tx(self) -> "WorkQueue._Tx":
+        return WorkQueue._Tx(self._conn())
+
+    # --------------------------- coordinator ---------------------------
+
+    def enqueue(self, symbol: str, trigger: str, is_crypto: bool = False, priority: int = 2,
+                deadline: Optional[float] = None, max_attempts: int = 3) -> Optional[int]:
+        """Returns the new job id, or None if the same (symbol, trigger) is already pending (and not yet expired)."""
+        sym = symbol.upper()
+        now = time.time()
+        with self._tx() as c:
+            # a queued job past its deadline is dead: expire it rather than let it block this bar's job
+            c.execute("UPDATE jobs SET status='expired', finished_at=? "
+                      "WHERE symbol=? AND status='queued' AND deadline IS NOT NULL AND deadline < ?", (now, sym, now))
+            dup = c.execute("SELECT id FROM jobs WHERE symbol=? AND trigger=? AND status IN ('queued','running')",
+                            (sym, trigger)).fetchone()
+            if dup:
+                return None
+            cur = c.execute(
+                "INSERT INTO jobs(symbol, is_crypto, trigger, priority, deadline, max_attempts, enqueued_at) "
+                "VALUES (?,?,?,?,?,?,?)",
+                (sym, int(bool(is_crypto)), trigger, int(priority), deadline, int(max_attempts), now))
+            return int(cur.lastrowid)
+
+    # --------------------------- worker ---------------------------
+
+    def claim(self, worker: str, lease_s: float = 300.0) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._tx() as c:
+            # lapsed leases go back to the queue (or fail if out of attempts)
+            c.execute("UPDATE jobs SET status='queued', worker=NULL, lease_until=NULL "
+                      "WHERE status='running' AND lease_until < ? AND attempts < max_attempts", (now,))
+            c.execute("UPDATE jobs SET status='failed', finished_at=?, error='lease expired' "
+                      "WHERE status='running' AND lease_until < ?", (now, now))
+            c.execute("UPDATE jobs SET status='expired', finished_at=? "
+                      "WHERE status='queued' AND deadline IS NOT NULL AND deadline < ?", (now, now))
+            row = c.execute(
+                "SELECT * FROM jobs WHERE status='queued' AND not_before <= ? "
+                "AND symbol NOT IN (SELECT symbol FROM jobs WHERE status='running') "
+                "ORDER BY priority, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            c.execute("UPDATE jobs SET status='running', worker=?, lease_until=?, started_at=?, attempts=attempts+1 "
+                      "WHERE id=?", (worker, now + lease_s, now, row["id"]))
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def heartbeat(self, job_id: int, worker: str, lease_s: float = 300.0) -> bool:
+        """Extend the lease; False means it was lost (expired and reclaimed) - stop before trading."""
+        with self._tx() as c:
+            cur = c.execute("UPDATE jobs SET lease_until=? WHERE id=? AND worker=? AND status='running'",
+                            (time.time() + lease_s, job_id, worker))
+            return cur.rowcount == 1
+
+    def last_attempt(self, job_id: int, worker: str) -> bool:
+        """Use up the job's remaining attempts (fail() and lease expiry then end it); False if the lease is gone."""
+        with self._tx() as c:
+            cur = c.execute("UPDATE jobs SET max_attempts=attempts WHERE id=? AND worker=? AND status='running'",
+                            (job_id, worker))
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        with self._tx() as c:
+            cur = c.execute("UPDATE jobs SET status='done', finished_at=?, lease_until=NULL, result=? "
+                            "WHERE id=? AND worker=? AND status='running'",
+                            (time.time(), json.dumps(result or {}, default=str), job_id, worker))
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker: str, error: str, backoff_s: float = 30.0) -> bool:
+        """Requeue with exponential backoff, or mark failed once attempts are used up."""
+        now = time.time()
+        with self._tx() as c:
+            row = c.execute("SELECT attempts, max_attempts FROM jobs WHERE id=? AND worker=? AND status='running'",
+                            (job_id, worker)).fetchone()
+            if row is None:
+                return False
+            if row["attempts"] < row["max_attempts"]:
+                c.execute("UPDATE jobs SET status='queued', worker=NULL, lease_until=NULL, error=?, not_before=? "
+                          "WHERE id=?", (error, now + backoff_s * 2 ** (row["attempts"] - 1), job_id))
+            else:
+                c.execute("UPDATE jobs SET status='failed', finished_at=?, lease_until=NULL, error=? WHERE id=?",
+                          (now, error, job_id))
+            return True
+
+    # --------------------------- housekeeping ---------------------------
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {r["status"]: int(r["n"]) for r in rows}
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return [dict(r) for r in rows]
+
+    def purge(self, older_than_s: float = 7 * 86400.0) -> int:
+        """Drop finished jobs older than `older_than_s`."""
+        with self._tx() as c:
+            cur = c.execute("DELETE FROM jobs WHERE status IN ('done','failed','expired') AND finished_at < ?",
+                            (time.time() - older_than_s,))
+            return cur.rowcount
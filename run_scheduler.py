@@ -1,12 +1,17 @@
 # run_scheduler.py
 from __future__ import annotations
-import os, threading, time
-from typing import Dict
+import os, signal, sys, threading, time
+from datetime import datetime, time as dtime
+from typing import Dict, List
 from apscheduler.schedulers.blocking import BlockingScheduler
 from pytz import timezone
 from config import settings
 from brokers import get_broker
-from autonomous_runner import run_once
+from autonomous_runner import enforce_timeboxes, enqueue_cycle, get_engine, timebox_heap
+from core.bar_trigger import BarCloseTrigger
+from core.data_manager import DataManager
+from core.file_lock import FileLock
+from core.news_ingest import run_ingest
 
 ist = timezone("Asia/Kolkata")  # for indian time zone
 sched = BlockingScheduler(timezone=ist)
@@ -14,18 +19,115 @@ sched = BlockingScheduler(timezone=ist)
 WATCHLIST_STOCKS = [s.strip().upper() for s in settings.watchlist_stocks.split(",") if s.strip()]
 WATCHLIST_CRYPTO = [s.strip().upper() for s in settings.watchlist_crypto.split(",") if s.strip()]
 
-# Stock bar-close (09:30–15:30 IST) every 30 min at :02 and :32
-@sched.scheduled_job("cron", day_of_week="mon-fri", hour="9-15", minute="2,32")
-def stocks_halfhour():
-    for s in WATCHLIST_STOCKS:
-        print(run_once(s, is_crypto=False, trigger="bar_close_30m"))
+# RUN_MODE=COORDINATOR: cycles become queue jobs for run_worker.py processes
+COORDINATOR = settings.run_mode == "COORDINATOR"
+_queue = None
 
-# Optional crypto loop if enabled (YF only)
-if settings.enable_crypto:
-    @sched.scheduled_job("cron", minute="2,32")
-    def crypto_halfhour():
-        for c in WATCHLIST_CRYPTO:
-            print(run_once(c, is_crypto=True, trigger="bar_close_30m"))
+def _cycle(symbols, is_crypto: bool, trigger: str, deadline: float | None = None):
+    global _queue
+    if COORDINATOR:
+        if _queue is None:
+            from core.work_queue import WorkQueue
+            _queue = WorkQueue()
+        enqueue_cycle(_queue, symbols, is_crypto=is_crypto, trigger=trigger, deadline=deadline)
+    else:
+        engine = get_engine()
+        if not is_crypto:
+            engine.ensure_healthy()
+        for res in engine.run_cycle(symbols, is_crypto=is_crypto, trigger=trigger, deadline=deadline):
+            print(res)
+    _arm_timebox_wake()
+
+# Timebox expiries are batch-closed at the start of every cycle; between cycles a
+# one-off job is armed for the next expiry, so a position never outlives its box.
+_tb_broker = None
+
+def _timebox_wake():
+    global _tb_broker
+    try:
+        if COORDINATOR:
+            if _tb_broker is None:
+                _tb_broker = get_broker()
+            with FileLock(os.path.join("state", "orders.lock")):  # same lock the workers' order phase takes
+                closed = enforce_timeboxes(_tb_broker)
+        else:
+            closed = get_engine().enforce_timeboxes()
+        for line in closed:
+            print(line)
+    except Exception as e:
+        print(f"[Scheduler] timebox enforcement failed: {e}")
+    _arm_timebox_wake()
+
+def _arm_timebox_wake():
+    due = timebox_heap().next_due()
+    if due is not None:
+        sched.add_job(_timebox_wake, "date", run_date=datetime.fromtimestamp(max(due, time.time()), ist),
+                      id="timebox_wake", replace_existing=True)
+
+if settings.trigger_mode == "CRON":
+    # Stock bar-close (09:30–15:30 IST) every 30 min at :02 and :32
+    @sched.scheduled_job("cron", day_of_week="mon-fri", hour="9-15", minute="2,32")
+    def stocks_halfhour():
+        _cycle(WATCHLIST_STOCKS, is_crypto=False, trigger="bar_close_30m")
+
+    # Optional crypto loop if enabled (YF only)
+    if settings.enable_crypto:
+        @sched.scheduled_job("cron", minute="2,32")
+        def crypto_halfhour():
+            _cycle(WATCHLIST_CRYPTO, is_crypto=True, trigger="bar_close_30m")
+else:
+    # Event mode: poll for confirmed closed bars; each bar's cycle runs as its own
+    # one-off job so a long cycle never holds up the polling.
+    _dm = DataManager()
+
+    def _on_bars(is_crypto: bool):
+        def _fire(symbols: List[str], bar_start: float) -> None:
+            deadline = bar_start + 2 * settings.bar_minutes * 60 - settings.cycle_deadline_margin_s
+            sched.add_job(_cycle, args=[symbols, is_crypto, "bar_close_event"], kwargs={"deadline": deadline})
+        return _fire
+
+    def _trigger(name: str, symbols: List[str], is_crypto: bool) -> BarCloseTrigger:
+        return BarCloseTrigger(name, symbols, _on_bars(is_crypto),
+                               fetch=lambda s: _dm.refresh_intraday(s, is_crypto=is_crypto),
+                               bar_minutes=settings.bar_minutes, poll_s=settings.bar_poll_s,
+                               debounce_s=settings.bar_debounce_s, settle_s=settings.bar_settle_s,
+                               max_workers=settings.cycle_workers)
+
+    _stock_bars = _trigger("stocks", WATCHLIST_STOCKS, is_crypto=False)
+
+    def _nse_open() -> bool:
+        now = datetime.now(ist)
+        return now.weekday() < 5 and dtime(9, 15) <= now.time() <= dtime(16, 0)
+
+    @sched.scheduled_job("interval", seconds=max(1.0, settings.bar_poll_s / 2), max_instances=1, coalesce=True)
+    def stocks_bar_watch():
+        if _nse_open():
+            _stock_bars.poll()
+
+    if settings.enable_crypto:
+        _crypto_bars = _trigger("crypto", WATCHLIST_CRYPTO, is_crypto=True)
+
+        @sched.scheduled_job("interval", seconds=max(1.0, settings.bar_poll_s / 2), max_instances=1, coalesce=True)
+        def crypto_bar_watch():
+            _crypto_bars.poll()
+
+# News -> SemanticMemory on its own cadence; votes only read the memory.
+# max_instances=1 + coalesce: a slow pass is never stacked or queued behind itself.
+if settings.news_ingest_enable:
+    @sched.scheduled_job("interval", minutes=settings.news_ingest_minutes, max_instances=1, coalesce=True,
+                         next_run_time=datetime.now(ist))
+    def news_ingest():
+        # one long-lived ingestor; in local mode it writes through the engine's memory
+        run_ingest(WATCHLIST_STOCKS, WATCHLIST_CRYPTO if settings.enable_crypto else None,
+                   sm=None if COORDINATOR else get_engine().sm)
 
 if __name__ == "__main__":
+    if COORDINATOR:
+        print("[Scheduler] coordinator mode: cycles are enqueued for run_worker.py")
+    else:
+        # build broker/data/memory/LLM once up front so a bad config fails here, not at the first bar
+        print(f"[Scheduler] engine health: {get_engine().health()}")
+    # SIGTERM -> normal exit, so atexit hooks (run-log writer flush) still run
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    _arm_timebox_wake()
     sched.start()
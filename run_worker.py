@@ -0,0 +1,87 @@
+# run_worker.py
+from __future__ import annotations
+import argparse, multiprocessing as mp, os, signal, socket, sys, threading, time
+from typing import Any, Dict
+
+from config import settings
+from core.work_queue import QUEUE_PATH, WorkQueue
+
+
+def _run_job(engine: Any, q: WorkQueue, job: Dict[str, Any], worker: str, lease_s: float) -> None:
+    stop = threading.Event()
+
+    def _beat() -> None:
+        while not stop.wait(lease_s / 3.0):
+            if not q.heartbeat(job["id"], worker, lease_s):
+                print(f"[Worker {worker}] lost lease on job {job['id']} ({job['symbol']})")
+                return
+
+    hb = threading.Thread(target=_beat, daemon=True)
+    hb.start()
+    try:
+        res = engine.run_symbol(
+            job["symbol"], is_crypto=bool(job["is_crypto"]), trigger=job["trigger"],
+            deadline=job["deadline"],
+            # re-checked under the order lock: never trade a job another worker has taken over,
+            # and once orders may go out the job is not retried (no second fill on a late failure)
+            proceed=lambda: q.heartbeat(job["id"], worker, lease_s) and q.last_attempt(job["id"], worker),
+        )
+        q.complete(job["id"], worker, res)
+        print(f"[Worker {worker}] {job['symbol']} -> {res.get('action')}")
+    except Exception as e:
+        print(f"[Worker {worker}] {job['symbol']} failed (attempt {job['attempts']}): {e}")
+        q.fail(job["id"], worker, str(e))
+    finally:
+        stop.set()
+
+
+def worker_loop(index: int, queue_path: str = QUEUE_PATH) -> None:
+    """One worker process: its own TradingEngine, claiming jobs until killed."""
+    from autonomous_runner import TradingEngine  # heavy imports stay in the child
+    # the parent stops workers with SIGTERM; exit normally so atexit flushes the run-log writer
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    worker = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    lease_s = settings.worker_lease_s
+    q = WorkQueue(queue_path)
+    engine = TradingEngine()
+    print(f"[Worker {worker}] ready, health: {engine.health()}")
+    while True:
+        job = q.claim(worker, lease_s)
+        if job is None:
+            time.sleep(settings.worker_poll_s)
+            continue
+        _run_job(engine, q, job, worker, lease_s)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Claim and run (symbol, trigger) jobs enqueued by run_scheduler.py in RUN_MODE=COORDINATOR.")
+    ap.add_argument("--workers", type=int, default=settings.worker_procs, help="worker processes to start")
+    ap.add_argument("--queue", default=QUEUE_PATH, help="SQLite queue file (shared with the coordinator)")
+    args = ap.parse_args()
+
+    # SIGTERM to the supervisor: exit normally (atexit runs) and take the workers down with it
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    procs = [mp.Process(target=worker_loop, args=(i, args.queue), daemon=True) for i in range(max(1, args.workers))]
+    for p in procs:
+        p.start()
+    try:
+        while True:
+            for i, p in enumerate(procs):
+                if not p.is_alive():  # a crashed worker is replaced; its job's lease lapses and is retried
+                    print(f"[Workers] worker {i} exited ({p.exitcode}); restarting.")
+                    procs[i] = mp.Process(target=worker_loop, args=(i, args.queue), daemon=True)
+                    procs[i].start()
+            time.sleep(5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # a second SIGTERM must not cut the shutdown short
+        for p in procs:
+            if p.is_alive():
+                p.terminate()  # SIGTERM: each worker exits through its own handler and flushes
+        for p in procs:
+            p.join(30)
+            if p.is_alive():
+                p.kill()
+                p.join()
+        print("[Workers] stopped.")
@@ -0,0 +1,61 @@
+# bench_ann.py
+"""
+Usage:
+  python scripts/bench_ann.py [N] [DIM] [QUERIES]      (defaults 100000 384 200)
+
+Recall@10 and per-query latency of SemanticMemory's search paths on synthetic,
+clustered, unit-norm vectors (news embeddings are strongly clustered too):
+  - sklearn-style full sort (the old cosine_similarity + argsort path)
+  - exact scan with argpartition (small-store fast path)
+  - IVF at several nprobe settings
+"""
+import os, sys, time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from core.ann_index import IVFIndex, topk_dot
+
+
+def _data(n: int, dim: int, n_topics: int = 500, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    x = topics[rng.integers(0, n_topics, size=n)] + 2.0 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _timed(fn, queries):
+    out, t0 = [], time.perf_counter()
+    for q in queries:
+        out.append(fn(q))
+    return out, (time.perf_counter() - t0) * 1000.0 / len(queries)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    nq = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    k = 10
+    # queries come from the same topic mix as the corpus, like real "TICKER sentiment" lookups
+    data = _data(n + nq, dim)
+    x, queries = data[:n], data[n:]
+
+    truth, ms_full = _timed(lambda q: np.argsort(-(x @ q))[:k], queries)
+    _, ms_part = _timed(lambda q: topk_dot(x, q, k)[0], queries)
+
+    t0 = time.perf_counter()
+    ix = IVFIndex()
+    ix.sync(x)
+    build_s = time.perf_counter() - t0
+
+    print(f"N={n} dim={dim} queries={nq} k={k}  (IVF lists={len(ix.centroids)}, build {build_s:.2f}s)")
+    print(f"{'method':<24}{'recall@10':>10}{'ms/query':>10}")
+    print(f"{'full argsort':<24}{1.0:>10.3f}{ms_full:>10.2f}")
+    print(f"{'argpartition':<24}{1.0:>10.3f}{ms_part:>10.2f}")
+    for nprobe in (1, 4, 8, 16, 32):
+        res, ms = _timed(lambda q: ix.search(x, q, k, nprobe=nprobe)[0], queries)
+        recall = np.mean([len(set(r) & set(t)) / k for r, t in zip(res, truth)])
+        print(f"{'IVF nprobe=' + str(nprobe):<24}{recall:>10.3f}{ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+# embed_worker.py
+"""
+Usage:
+  1) python scripts/embed_worker.py [host:port]      (default 127.0.0.1:7601)
+  2) In the scheduler / Streamlit .env: SEMMEM_WORKER=127.0.0.1:7601
+     (and the same SEMMEM_WORKER_KEY on both sides if you changed it)
+Every SemanticMemory then encodes through this one process, so the model is
+loaded once for the whole machine instead of once per consumer.
+"""
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.pop("SEMMEM_WORKER", None)  # the worker itself always encodes locally
+
+from core.embedder import serve
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:7601")
@@ -0,0 +1,15 @@
+# tests/conftest.py
+from __future__ import annotations
+import os, sys
+
+import pytest
+
+# modules import as `core.x` from the repo root, the way the entry scripts run them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Run in an empty directory, so the relative state/ paths never touch a real one."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "state"
@@ -0,0 +1,80 @@
+# tests/test_ledger_db.py
+from __future__ import annotations
+import json
+
+import pytest
+
+from core.ledger_db import LedgerDB
+
+
+def _db(state_dir) -> LedgerDB:
+    return LedgerDB(str(state_dir / "ledger.db"))
+
+
+def test_buy_and_sell_move_cash_and_position_together(state_dir):
+    db = _db(state_dir)
+    assert db.buy("aapl", 10, 100.0, starting_cash=5000.0) == 10
+    assert db.cash() == pytest.approx(4000.0)
+    assert db.get("AAPL")["qty"] == 10 and db.get("AAPL")["entry_price"] == pytest.approx(100.0)
+
+    # more than the cash allows: fills what fits
+    assert db.buy("AAPL", 100, 200.0) == pytest.approx(20.0)
+    assert db.cash() == pytest.approx(0.0)
+    row = db.get("AAPL")
+    assert row["qty"] == pytest.approx(30.0) and row["entry_price"] == pytest.approx(5000.0 / 30)
+
+    assert db.sell("AAPL", 10, 150.0) == 10
+    assert db.cash() == pytest.approx(1500.0)
+    assert db.get("AAPL")["qty"] == pytest.approx(20.0)
+    # more than is held: sells the rest and drops the row
+    assert db.sell("AAPL", 50, 150.0) == pytest.approx(20.0)
+    assert db.cash() == pytest.approx(4500.0)
+    assert db.get("AAPL") is None
+
+
+def test_failed_buy_leaves_cash_untouched(state_dir, monkeypatch):
+    db = _db(state_dir)
+    db.buy("AAPL", 1, 100.0, starting_cash=1000.0)
+
+    def boom(*a, **k):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(LedgerDB, "_merge", staticmethod(boom))
+    with pytest.raises(RuntimeError):
+        db.buy("AAPL", 1, 100.0)
+    assert db.cash() == pytest.approx(900.0)
+    assert db.get("AAPL")["qty"] == 1
+
+
+def test_book_buy_merges_and_keeps_the_first_timebox(state_dir):
+    db = _db(state_dir)
+    row = db.book_buy("MSFT", 2, 10.0, "short", "2030-01-01T00:00:00Z")
+    assert row["qty"] == 2 and row["timebox_until"] == "2030-01-01T00:00:00Z" and row["horizon"] == "short"
+
+    row = db.book_buy("MSFT", 2, 20.0, "mid", "2031-01-01T00:00:00Z")
+    assert row["qty"] == 4 and row["entry_price"] == pytest.approx(15.0)
+    assert row["timebox_until"] == "2030-01-01T00:00:00Z" and row["horizon"] == "short"
+
+    # the paper broker already merged the fill: only the timebox is booked
+    db.buy("NVDA", 1, 10.0, horizon="short", starting_cash=100.0)
+    row = db.book_buy("NVDA", 1, 10.0, "short", "2030-01-01T00:00:00Z", merge=False)
+    assert row["qty"] == 1 and row["timebox_until"] == "2030-01-01T00:00:00Z"
+    assert db.cash() == pytest.approx(90.0)
+
+
+def test_json_ledger_is_imported_only_once(state_dir):
+    state_dir.mkdir()
+    (state_dir / "positions.json").write_text(json.dumps({"aapl": {"qty": 3, "entry_price": 10.0, "note": "x"}}))
+    (state_dir / "paper_account.json").write_text(json.dumps({"cash": 250.0}))
+
+    db = _db(state_dir)
+    assert db.get("AAPL") == {"symbol": "AAPL", "qty": 3.0, "entry_price": 10.0, "notional": 0.0, "note": "x"}
+    assert db.cash() == pytest.approx(250.0)
+
+    db.remove("AAPL")
+    (state_dir / "positions.json").write_text(json.dumps({"MSFT": {"qty": 1}}))
+    (state_dir / "paper_account.json").write_text(json.dumps({"cash": 999.0}))
+
+    db = _db(state_dir)
+    assert db.all() == {}
+    assert db.cash() == pytest.approx(250.0)
@@ -0,0 +1,95 @@
+# tests/test_run_log.py
+from __future__ import annotations
+import json
+from datetime import datetime, timezone
+
+from core.run_log import RunLog
+
+DAY1 = datetime(2026, 1, 1, 12, tzinfo=timezone.utc).timestamp()
+DAY2 = DAY1 + 86400
+DAY3 = DAY2 + 86400
+
+
+def _rec(i: int) -> str:
+    return json.dumps({"i": i})
+
+
+def _ids(recs) -> list:
+    return [r["i"] for r in recs]
+
+
+def _log(state_dir, **kw) -> RunLog:
+    return RunLog(str(state_dir / "runs"), **kw)
+
+
+def _fill(log: RunLog) -> None:
+    # 0-4 on day 1, 5-7 on day 2, 8-9 on day 3, one second apart
+    for i in range(10):
+        day = DAY1 if i < 5 else DAY2 if i < 8 else DAY3
+        log.append([_rec(i)], now=day + i)
+
+
+def test_tail_reads_back_across_segments(state_dir):
+    log = _log(state_dir)
+    _fill(log)
+    assert log.days() == ["2026-01-01", "2026-01-02", "2026-01-03"]
+    assert _ids(log.tail(1)) == [9]
+    assert _ids(log.tail(4)) == [6, 7, 8, 9]
+    assert _ids(log.tail(7)) == list(range(3, 10))
+    assert _ids(log.tail(100)) == list(range(10))
+    assert _ids(log.iter_reverse()) == list(range(9, -1, -1))
+
+
+def test_read_range_bisects_each_day(state_dir):
+    log = _log(state_dir)
+    _fill(log)
+    assert _ids(log.read_range(DAY1 + 3, DAY2 + 7)) == [3, 4, 5, 6]
+    assert _ids(log.read_range(DAY2, DAY3 + 100)) == [5, 6, 7, 8, 9]
+    assert _ids(log.read_range(DAY1 - 100, DAY1)) == []
+
+
+def test_follow_picks_up_new_records_and_new_days(state_dir):
+    log = _log(state_dir)
+    log.append([_rec(0), _rec(1)], now=DAY1)
+    cursor = log.cursor_at(DAY1)
+    recs, cursor = log.follow(cursor)
+    assert _ids(recs) == [0, 1]
+    assert log.follow(cursor)[0] == []
+
+    log.append([_rec(2)], now=DAY1 + 1)
+    log.append([_rec(3), _rec(4)], now=DAY2)
+    recs, cursor = log.follow(cursor)
+    assert _ids(recs) == [2, 3, 4] and cursor == ("2026-01-02", 2)
+
+    # a second reader starting mid-day only sees what came after its start
+    assert _ids(log.follow(log.cursor_at(DAY1 + 1))[0]) == [2, 3, 4]
+
+
+def test_append_times_never_go_backwards(state_dir):
+    log = _log(state_dir)
+    log.append([_rec(0)], now=DAY1 + 10)
+    log.append([_rec(1)], now=DAY1 + 5)  # a writer whose clock read was earlier
+    assert [t for _, t in log._index("2026-01-01")] == [DAY1 + 10, DAY1 + 10]
+    assert _ids(log.read_range(DAY1 + 10, DAY1 + 11)) == [0, 1]
+
+
+def test_legacy_log_is_split_into_segments_once(state_dir):
+    state_dir.mkdir()
+    legacy = state_dir / "auto_runs.jsonl"
+
+    def when(ts: float) -> str:
+        return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+    rows = [{"i": 1, "when": when(DAY2 + 5)}, {"i": 0, "when": when(DAY1)}, {"i": 2, "when": when(DAY2 + 1)}]
+    legacy.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+
+    log = _log(state_dir, legacy_path=str(legacy))
+    assert not legacy.exists() and (state_dir / "auto_runs.jsonl.migrated").exists()
+    assert log.days() == ["2026-01-01", "2026-01-02"]
+    # each day's records are ordered by "when", as the index needs
+    assert _ids(log.tail(10)) == [0, 2, 1]
+    assert _ids(log.read_range(DAY2, DAY2 + 2)) == [2]
+
+    # opening again (or from another process) does not import twice
+    log = _log(state_dir, legacy_path=str(legacy))
+    assert _ids(log.tail(10)) == [0, 2, 1]
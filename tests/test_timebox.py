@@ -0,0 +1,75 @@
+# tests/test_timebox.py
+from __future__ import annotations
+from datetime import datetime, timezone
+
+from core.ledger_db import LedgerDB
+from core.timebox import TimeboxHeap, close_expired
+
+T0 = datetime(2030, 1, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class _CountingDB(LedgerDB):
+    """LedgerDB that counts timebox-index reads, i.e. heap rebuilds."""
+    rebuilds = 0
+
+    def timeboxes(self):
+        self.rebuilds += 1
+        return super().timeboxes()
+
+
+def test_own_writes_do_not_rebuild(state_dir):
+    db = _CountingDB(str(state_dir / "ledger.db"))
+    heap = TimeboxHeap(db)
+    assert heap.next_due() is None and db.rebuilds == 1
+
+    db.book_buy("AAPL", 1, 10.0, "short", _iso(T0 + 60))
+    heap.note_entry("AAPL", _iso(T0 + 60))
+    db.book_buy("MSFT", 1, 10.0, "short", _iso(T0 + 30))
+    heap.note_entry("MSFT", _iso(T0 + 30))
+    assert heap.next_due() == T0 + 30
+    assert heap.pop_due(T0 + 45) == ["MSFT"]
+    assert heap.next_due() == T0 + 60
+    assert db.rebuilds == 1
+
+
+def test_foreign_write_rebuilds_from_the_ledger(state_dir):
+    path = str(state_dir / "ledger.db")
+    db = _CountingDB(path)
+    heap = TimeboxHeap(db)
+    db.book_buy("AAPL", 1, 10.0, "short", _iso(T0 + 60))
+    heap.note_entry("AAPL", _iso(T0 + 60))
+    assert heap.next_due() == T0 + 60 and db.rebuilds == 1
+
+    # a worker process (another connection) books an earlier timebox and closes AAPL
+    other = LedgerDB(path)
+    other.book_buy("NVDA", 1, 10.0, "short", _iso(T0 + 10))
+    other.remove("AAPL")
+
+    assert heap.next_due() == T0 + 10 and db.rebuilds == 2
+    assert heap.pop_due(T0 + 100) == ["NVDA"]
+    assert db.rebuilds == 2
+
+
+def test_close_expired_skips_positions_sold_meanwhile(state_dir):
+    db = LedgerDB(str(state_dir / "ledger.db"))
+    heap = TimeboxHeap(db)
+    for sym in ("AAPL", "MSFT"):
+        db.book_buy(sym, 2, 10.0, "short", _iso(T0))
+        heap.note_entry(sym, _iso(T0))
+    db.remove("MSFT")  # this process sold it without telling the heap
+
+    closed, logged = [], []
+
+    class Broker:
+        def close_position(self, sym):
+            closed.append(sym)
+            return f"ord-{sym}"
+
+    done = close_expired(heap, Broker(), logged.append, now=T0 + 1)
+    assert closed == ["AAPL"] and [d["action"] for d in done] == ["TIMEBOX_EXIT"]
+    assert logged == done and db.get("AAPL") is None
+    assert heap.next_due() is None
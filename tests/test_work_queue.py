@@ -0,0 +1,80 @@
+# tests/test_work_queue.py
+from __future__ import annotations
+import time
+
+from core.work_queue import WorkQueue
+
+
+def _queue(state_dir) -> WorkQueue:
+    return WorkQueue(str(state_dir / "work_queue.db"))
+
+
+def _status(q: WorkQueue, job_id: int) -> dict:
+    return next(r for r in q.recent(100) if r["id"] == job_id)
+
+
+def test_lapsed_lease_is_requeued_and_reclaimed(state_dir):
+    q = _queue(state_dir)
+    jid = q.enqueue("AAPL", "bar_close")
+    job = q.claim("w1", lease_s=-1.0)  # lease already lapsed: w1 "died"
+    assert job["id"] == jid and job["attempts"] == 1
+
+    again = q.claim("w2")
+    assert again["id"] == jid and again["attempts"] == 2
+    assert _status(q, jid)["worker"] == "w2"
+    # the dead worker lost the lease: it can neither heartbeat nor finish the job
+    assert not q.heartbeat(jid, "w1")
+    assert not q.complete(jid, "w1")
+    assert q.complete(jid, "w2")
+    assert _status(q, jid)["status"] == "done"
+
+
+def test_lapsed_lease_fails_once_attempts_are_used_up(state_dir):
+    q = _queue(state_dir)
+    jid = q.enqueue("AAPL", "bar_close", max_attempts=1)
+    q.claim("w1", lease_s=-1.0)
+    assert q.claim("w2") is None
+    row = _status(q, jid)
+    assert row["status"] == "failed" and row["error"] == "lease expired"
+
+
+def test_one_running_job_per_symbol(state_dir):
+    q = _queue(state_dir)
+    a1 = q.enqueue("AAPL", "bar_close", priority=1)
+    a2 = q.enqueue("AAPL", "news", priority=1)
+    m1 = q.enqueue("MSFT", "bar_close", priority=2)
+
+    assert q.claim("w1")["id"] == a1
+    # the other AAPL job outranks MSFT but must wait for the running AAPL job
+    assert q.claim("w2")["id"] == m1
+    assert q.claim("w3") is None
+
+    assert q.complete(a1, "w1")
+    assert q.claim("w3")["id"] == a2
+
+
+def test_no_retry_after_last_attempt(state_dir):
+    q = _queue(state_dir)
+    jid = q.enqueue("AAPL", "bar_close", max_attempts=3)
+    q.claim("w1")
+    assert q.last_attempt(jid, "w1")
+    assert q.fail(jid, "w1", "order rejected", backoff_s=0.0)
+    assert _status(q, jid)["status"] == "failed"
+    assert q.claim("w2") is None
+
+
+def test_lapsed_lease_after_last_attempt_is_not_reclaimed(state_dir):
+    q = _queue(state_dir)
+    jid = q.enqueue("AAPL", "bar_close", max_attempts=3)
+    q.claim("w1", lease_s=0.05)
+    assert q.last_attempt(jid, "w1")
+    time.sleep(0.1)  # w1 dies in its order phase
+    assert q.claim("w2") is None
+    assert _status(q, jid)["status"] == "failed"
+
+
+def test_last_attempt_needs_the_lease(state_dir):
+    q = _queue(state_dir)
+    jid = q.enqueue("AAPL", "bar_close")
+    q.claim("w1")
+    assert not q.last_attempt(jid, "w2")
@@ -1,16 +1,16 @@
 # ui/automation_panel.py
 from __future__ import annotations
 import os, json
-from datetime import datetime, timezone
-from typing import List, Dict, Any
+from datetime import datetime
 import pandas as pd
 import streamlit as st
 
 from core.positions import read_ledger
+from core.run_log import RunLog
 from brokers import get_broker
 from config import settings
 
-RUN_LOG_PATH = os.path.join("state", "auto_runs.jsonl")
+LLM_METRICS_PATH = os.path.join("state", "llm_metrics.json")
 
 def _to_local(ts_iso: str) -> str:
     try:
@@ -19,23 +19,13 @@ def _to_local(ts_iso: str) -> str:
     except Exception:
         return ts_iso
 
-def _read_last_jsonl(path: str, max_lines: int = 500) -> List[Dict[str, Any]]:
-    if not os.path.exists(path): return []
-    out: List[Dict[str, Any]] = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            try: out.append(json.loads(line))
-            except Exception: pass
-    return out[-max_lines:]
-
 def _positions_df():
     broker = get_broker()
     ledger = read_ledger()
+    prices = broker.last_prices(list(ledger)) if ledger else {}
     rows = []
     for sym, meta in ledger.items():
-        last = broker.last_price(sym) or None
+        last = prices.get(sym) or None
         qty = float(meta.get("qty", 0))
         entry = float(meta.get("entry_price", 0))
         mv = (last * qty) if (last and qty) else None
@@ -71,10 +61,30 @@ def render_automation_tab():
 
     st.divider()
     st.markdown("### 📜 Recent Automation Runs")
-    runs = _read_last_jsonl(RUN_LOG_PATH, 300)
+    runs = RunLog().tail(300)  # last index entries of the newest segment(s) only
     if runs:
         df = pd.DataFrame(runs).sort_values("when", ascending=False)
         view = ["when","symbol","trigger","action","decision","qty","entry_price","order_id","reason"]
         st.dataframe(df[[c for c in view if c in df.columns]], use_container_width=True, height=360)
     else:
         st.info("No runs yet.")
+
+    st.divider()
+    st.markdown("### ⏱️ LLM Calls (rolling window)")
+    if os.path.exists(LLM_METRICS_PATH):
+        try:
+            with open(LLM_METRICS_PATH, "r", encoding="utf-8") as f:
+                m = json.load(f)
+            lat = m.get("latency_ms", {})
+            c1, c2, c3, c4 = st.columns(4)
+            c1.metric("Calls in window", m.get("window", 0))
+            c2.metric("p50 latency (ms)", lat.get("p50") or "-")
+            c3.metric("p90 latency (ms)", lat.get("p90") or "-")
+            c4.metric("Reuse rate", f"{100 * float(m.get('cache_hit_rate', 0.0)):.0f}%")
+            st.bar_chart(pd.Series(lat.get("hist", {}), name="calls"))
+            st.write({"parse_paths": m.get("parse_paths"), "fallback_hops": m.get("fallback_hops")})
+            st.dataframe(pd.DataFrame(m.get("by_agent", {})).T, use_container_width=True)
+        except Exception as e:
+            st.warning(f"LLM metrics unreadable: {e}")
+    else:
+        st.info("No LLM metrics yet.")